@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# Dyskowy cache map wysokości i produktów pochodnych (normalne, piramidy
+# min/max, bufory wierzchołków, indeksy) dla zad5.0.py
+#
+# Klucz to skrót SHA-256 z nazwy generatora, jego parametrów i ziarna, więc
+# ciepły start z tymi samymi ustawieniami pomija generowanie i budowę siatki.
+# Każdy produkt to osobny plik .npy wczytywany leniwie przez np.memmap.
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'lab4_teren')
+CACHE_MAX_BYTES = 2 * 2 ** 30
+CACHE_FORMAT_VERSION = 1  # zmiana formatu plików unieważnia stare wpisy
+STALE_TMP_SECONDS = 3600  # plik .tmp starszy niż to został po zabitym procesie
+
+cache_dir = CACHE_DIR
+max_bytes = CACHE_MAX_BYTES
+
+
+def cache_key(generator, seed, **params):
+    description = json.dumps({'version': CACHE_FORMAT_VERSION, 'generator': generator,
+                              'seed': seed, 'params': params}, sort_keys=True)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+def entry_path(key, product):
+    return os.path.join(cache_dir, key + '_' + product + '.npy')
+
+
+def load(key, product):
+    # Zwraca tablicę tylko do odczytu (np.memmap) albo None, jeśli brak wpisu
+    path = entry_path(key, product)
+    try:
+        array = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    # Czas modyfikacji służy jako znacznik ostatniego użycia przy usuwaniu;
+    # w katalogu tylko do odczytu (wspólny cache) wpis i tak jest użyteczny
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return array
+
+
+def store(key, product, array):
+    # Zapis atomowy: plik tymczasowy w tym samym katalogu i os.replace,
+    # więc przerwany zapis nigdy nie zostawi uszkodzonego wpisu
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, entry_path(key, product))
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    evict(max_bytes)
+    return entry_path(key, product)
+
+
+def get_or_build(key, product, build):
+    # Wpis z cache albo wynik build() zapisany do cache. Nieudany zapis
+    # (katalog tylko do odczytu, brak miejsca) nie jest błędem - wynik
+    # jest zwracany bez zapisu, a plik tymczasowy usuwa store()
+    array = load(key, product)
+    if array is None:
+        array = build()
+        try:
+            store(key, product, array)
+        except OSError as error:
+            print("cache_terenu: nie zapisano {} ({})".format(product, error), file=sys.stderr)
+    return array
+
+
+def _cache_files():
+    # Wpisy .npy i pliki tymczasowe store(); te drugie zostają po procesie
+    # zabitym w trakcie zapisu (SIGKILL, brak zasilania) i też zajmują miejsce
+    try:
+        names = [n for n in os.listdir(cache_dir) if n.endswith(('.npy', '.tmp'))]
+    except FileNotFoundError:
+        return []
+
+    files = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    return files
+
+
+def evict(limit):
+    # Usuwa porzucone pliki tymczasowe, a potem najdawniej używane wpisy,
+    # aż rozmiar cache zmieści się w limicie. Świeże pliki .tmp mogą należeć
+    # do trwającego zapisu innego procesu - są liczone, ale nie usuwane.
+    stale = time.time() - STALE_TMP_SECONDS
+    entries = []
+    total = 0
+    for mtime, size, path in _cache_files():
+        if path.endswith('.tmp') and mtime < stale:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            continue
+        total += size
+        if path.endswith('.npy'):
+            entries.append((mtime, size, path))
+
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cache_size():
+    return sum(size for _, size, _ in _cache_files())
+
+
+if __name__ == '__main__':
+    # python cache_terenu.py [wyczysc]
+    if len(sys.argv) > 1 and sys.argv[1] == 'wyczysc':
+        evict(0)
+    print(f"Cache terenu: {cache_dir}, {cache_size() / 2 ** 20:.1f} MB"
+          f" (limit {max_bytes / 2 ** 20:.0f} MB)")
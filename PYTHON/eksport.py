@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# Eksport geometrii do plików: teren z mapy wysokości (zad5.0.py)
+# i example_object() z pozostałych zadań
+#
+# Formaty: binarny glTF (.glb), binarny PLY (.ply) i tekstowy OBJ (.obj).
+# Wierzchołki i trójkąty są zapisywane pasami prosto z tablic NumPy, więc
+# pamięć zależy od wysokości pasa, a nie od rozmiaru mapy. Nawet tekst OBJ
+# powstaje wektorowo (cyfry liczone na tablicach uint8), bez napisów Pythona
+# dla pojedynczych wierzchołków.
+#
+#   python eksport.py teren PLIK [ROZMIAR] [ZIARNO]   - mapa Diamond-Square
+#   python eksport.py obiekt PLIK                     - example_object()
+#   python eksport.py benchmark [ROZMIAR]             - czas i pamięć eksportu
+import os
+import sys
+import json
+import time
+import struct
+import tempfile
+import tracemalloc
+import numpy as np
+
+import teren
+import siatka
+import kamera
+
+BAND_ROWS = 256  # wierszy siatki w jednym pasie zapisu
+
+POSITION_DECIMALS = 4
+COLOR_DECIMALS = 3
+NORMAL_DECIMALS = 4
+
+
+# ŹRÓDŁA SIATEK
+#
+# Siatka to słownik z liczbą wierzchołków i trójkątów, zakresem pozycji
+# (glTF wymaga go w nagłówku) oraz funkcjami zwracającymi kolejne pasy:
+# wierzchołki (n, 9) float32 w układzie siatka.VERTEX_FLOATS i trójkąty
+# (m, 3) uint32.
+
+def terrain_mesh(heightmap, terrain_scale, height_scale, band_rows=BAND_ROWS):
+    size, cols = heightmap.shape
+    min_h = float(np.min(heightmap))
+    max_h = float(np.max(heightmap))
+    h_range = max_h - min_h or 1.0
+
+    def vertices():
+        # Jeden bufor pasa używany ponownie - pas jest zapisany, zanim
+        # powstanie następny
+        tile = np.empty((band_rows, cols, siatka.VERTEX_FLOATS), dtype=np.float32)
+        for start in range(0, size, band_rows):
+            stop = min(start + band_rows, size)
+            band = tile[:stop - start]
+            siatka.build_vertex_tile(heightmap, band, start, stop, terrain_scale, height_scale,
+                                     min_h, h_range)
+            yield band.reshape(-1, siatka.VERTEX_FLOATS)
+
+    def triangles():
+        for start in range(0, size - 1, band_rows):
+            yield siatka.grid_triangle_indices(size, cols, start, min(start + band_rows, size - 1))
+
+    # Granice liczone tymi samymi działaniami co pozycje w build_vertex_tile
+    # i zaokrąglone do float32 - muszą dokładnie zgadzać się z zapisanymi
+    # wartościami (min/max akcesora glTF)
+    heights = np.multiply(np.array([min_h, max_h], dtype=heightmap.dtype), height_scale,
+                          out=np.empty(2, dtype=np.float32))
+    far = np.array([(size - 1) * terrain_scale, (cols - 1) * terrain_scale]).astype(np.float32)
+
+    return {
+        'vertex_count': size * cols,
+        'triangle_count': (size - 1) * (cols - 1) * 2,
+        'bounds': ([0.0, float(heights[0]), 0.0], [float(far[0]), float(heights[1]), float(far[1])]),
+        'vertices': vertices,
+        'triangles': triangles,
+    }
+
+
+def array_mesh(vertices, triangles):
+    # Siatka z gotowych tablic (jeden pas)
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    triangles = np.ascontiguousarray(triangles, dtype=np.uint32)
+    return {
+        'vertex_count': len(vertices),
+        'triangle_count': len(triangles),
+        'bounds': (vertices[:, :3].min(axis=0).tolist(), vertices[:, :3].max(axis=0).tolist()),
+        'vertices': lambda: iter([vertices]),
+        'triangles': lambda: iter([triangles]),
+    }
+
+
+# EXAMPLE_OBJECT JAKO SIATKA
+#
+# Te same wywołania co w example_object() (lab4.py, zad3.0.py - zad4.5.py),
+# zapisane jako lista poleceń i odtworzone na macierzach zamiast w OpenGL.
+
+EXAMPLE_OBJECT = [
+    ('rotate', 90, 1.0, 0.0, 0.0),
+    ('rotate', -90, 0.0, 1.0, 0.0),
+    ('sphere', 1.5, 10, 10),
+    ('translate', 0.0, 0.0, 1.1),
+    ('cylinder', 1.0, 1.5, 1.5, 10, 5),
+    ('translate', 0.0, 0.0, -1.1),
+    ('translate', 0.0, 0.0, -2.6),
+    ('cylinder', 0.0, 1.0, 1.5, 10, 5),
+    ('translate', 0.0, 0.0, 2.6),
+    ('rotate', 90, 1.0, 0.0, 1.0),
+    ('translate', 0.0, 0.0, 1.5),
+    ('cylinder', 0.1, 0.0, 1.0, 5, 5),
+    ('translate', 0.0, 0.0, -1.5),
+    ('rotate', -90, 1.0, 0.0, 1.0),
+    ('rotate', -90, 1.0, 0.0, 1.0),
+    ('translate', 0.0, 0.0, 1.5),
+    ('cylinder', 0.1, 0.0, 1.0, 5, 5),
+]
+
+
+def sphere_grid(radius, slices, stacks):
+    # Jak gluSphere: oś wzdłuż Z, stosy od bieguna +Z do -Z
+    theta = np.linspace(0.0, 2.0 * np.pi, slices + 1)[np.newaxis, :]
+    phi = np.linspace(0.0, np.pi, stacks + 1)[:, np.newaxis]
+    normals = np.stack(np.broadcast_arrays(np.sin(phi) * np.cos(theta), np.sin(phi) * np.sin(theta),
+                                           np.cos(phi)), axis=-1)
+    return normals * radius, normals
+
+
+def cylinder_grid(base, top, height, slices, stacks):
+    # Jak gluCylinder: od z = 0 (promień base) do z = height (promień top)
+    theta = np.linspace(0.0, 2.0 * np.pi, slices + 1)[np.newaxis, :]
+    t = np.linspace(0.0, 1.0, stacks + 1)[:, np.newaxis]
+    radius = base + (top - base) * t
+    positions = np.stack(np.broadcast_arrays(radius * np.cos(theta), radius * np.sin(theta),
+                                             height * t), axis=-1)
+    normals = np.stack(np.broadcast_arrays(np.cos(theta), np.sin(theta),
+                                           np.full_like(t, (base - top) / height)), axis=-1)
+    return positions, normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+
+
+QUADRICS = {'sphere': sphere_grid, 'cylinder': cylinder_grid}
+
+
+def rotation_matrix(angle, x, y, z):
+    # glRotatef normalizuje oś, tak samo tutaj
+    axis = np.array([x, y, z]) / np.linalg.norm([x, y, z])
+    matrix = np.identity(4)
+    matrix[:3, :3] = kamera.quat_to_matrix(kamera.quat_from_axis_angle(axis, angle))
+    return matrix
+
+
+def translation_matrix(x, y, z):
+    matrix = np.identity(4)
+    matrix[:3, 3] = (x, y, z)
+    return matrix
+
+
+def object_mesh(commands=EXAMPLE_OBJECT, color=(1.0, 1.0, 1.0)):
+    matrix = np.identity(4)
+    vertex_parts = []
+    triangle_parts = []
+    count = 0
+
+    for name, *params in commands:
+        if name == 'rotate':
+            matrix = matrix @ rotation_matrix(*params)
+        elif name == 'translate':
+            matrix = matrix @ translation_matrix(*params)
+        else:
+            positions, normals = QUADRICS[name](*params)
+            rows, cols = positions.shape[:2]
+            vertices = np.empty((rows * cols, siatka.VERTEX_FLOATS), dtype=np.float32)
+            # Tylko obroty i przesunięcia, więc normalne przechodzą przez tę samą macierz 3x3
+            vertices[:, 0:3] = positions.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+            vertices[:, 3:6] = color
+            vertices[:, 6:9] = normals.reshape(-1, 3) @ matrix[:3, :3].T
+            vertex_parts.append(vertices)
+            triangle_parts.append(siatka.grid_triangle_indices(rows, cols) + count)
+            count += len(vertices)
+
+    return array_mesh(np.concatenate(vertex_parts), np.concatenate(triangle_parts))
+
+
+# ZAPIS
+
+def write_chunks(f, chunks, dtype):
+    # Zapisuje pasy bezpośrednio z pamięci tablic; zwraca liczbę wierszy
+    rows = 0
+    for chunk in chunks:
+        np.ascontiguousarray(chunk, dtype=dtype).tofile(f)
+        rows += len(chunk)
+    return rows
+
+
+def check_count(kind, written, expected):
+    if written != expected:
+        raise ValueError("Zapisano {} {} zamiast {}".format(written, kind, expected))
+
+
+def write_glb(path, mesh):
+    # Wierzchołki jako jeden przeplatany bufferView (byteStride 36), więc
+    # POSITION, COLOR_0 i NORMAL powstają w jednym przejściu po pasach
+    vertex_count = mesh['vertex_count']
+    triangle_count = mesh['triangle_count']
+    vertex_bytes = vertex_count * siatka.VERTEX_STRIDE
+    index_bytes = triangle_count * 3 * 4
+    lo, hi = mesh['bounds']
+
+    def attribute(offset, **extra):
+        return dict(bufferView=0, byteOffset=offset, componentType=5126,
+                    count=vertex_count, type='VEC3', **extra)
+
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'lab4 eksport.py'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0, 'COLOR_0': 1, 'NORMAL': 2},
+                                    'indices': 3, 'mode': 4}]}],
+        'buffers': [{'byteLength': vertex_bytes + index_bytes}],
+        'bufferViews': [
+            {'buffer': 0, 'byteOffset': 0, 'byteLength': vertex_bytes,
+             'byteStride': siatka.VERTEX_STRIDE, 'target': 34962},
+            {'buffer': 0, 'byteOffset': vertex_bytes, 'byteLength': index_bytes, 'target': 34963},
+        ],
+        'accessors': [
+            attribute(0, min=[float(v) for v in lo], max=[float(v) for v in hi]),
+            attribute(siatka.COLOR_OFFSET),
+            attribute(siatka.NORMAL_OFFSET),
+            {'bufferView': 1, 'componentType': 5125, 'count': triangle_count * 3, 'type': 'SCALAR'},
+        ],
+    }
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + vertex_bytes + index_bytes
+
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sII', b'glTF', 2, total))
+        f.write(struct.pack('<I4s', len(json_chunk), b'JSON'))
+        f.write(json_chunk)
+        f.write(struct.pack('<I4s', vertex_bytes + index_bytes, b'BIN\0'))
+        check_count('wierzchołków', write_chunks(f, mesh['vertices'](), np.float32), vertex_count)
+        check_count('trójkątów', write_chunks(f, mesh['triangles'](), np.uint32), triangle_count)
+
+
+PLY_VERTEX = np.dtype([('position', '<f4', 3), ('normal', '<f4', 3), ('color', 'u1', 3)])
+PLY_FACE = np.dtype([('count', 'u1'), ('index', '<u4', 3)])
+
+
+def write_ply(path, mesh):
+    header = '\n'.join([
+        'ply',
+        'format binary_little_endian 1.0',
+        'comment lab4 eksport.py',
+        'element vertex {}'.format(mesh['vertex_count']),
+        'property float x', 'property float y', 'property float z',
+        'property float nx', 'property float ny', 'property float nz',
+        'property uchar red', 'property uchar green', 'property uchar blue',
+        'element face {}'.format(mesh['triangle_count']),
+        'property list uchar uint vertex_indices',
+        'end_header',
+    ]) + '\n'
+
+    def vertex_records():
+        for chunk in mesh['vertices']():
+            records = np.empty(len(chunk), dtype=PLY_VERTEX)
+            records['position'] = chunk[:, 0:3]
+            records['normal'] = chunk[:, 6:9]
+            records['color'] = np.clip(chunk[:, 3:6] * 255.0 + 0.5, 0.0, 255.0)
+            yield records
+
+    def face_records():
+        for chunk in mesh['triangles']():
+            records = np.empty(len(chunk), dtype=PLY_FACE)
+            records['count'] = 3
+            records['index'] = chunk
+            yield records
+
+    with open(path, 'wb') as f:
+        f.write(header.encode('ascii'))
+        check_count('wierzchołków', write_chunks(f, vertex_records(), PLY_VERTEX), mesh['vertex_count'])
+        check_count('trójkątów', write_chunks(f, face_records(), PLY_FACE), mesh['triangle_count'])
+
+
+def ascii_numbers(values, decimals=0, fill=' '):
+    # Liczby jako tekst stałej szerokości: tablica (n, szerokość) uint8.
+    # Cyfry wyznaczane dzieleniem całych tablic, bez napisu na liczbę.
+    values = np.asarray(values)
+    scaled = np.rint(np.abs(values.astype(np.float64)) * 10 ** decimals).astype(np.int64)
+    negative = (values < 0) & (scaled > 0)
+    whole = scaled // 10 ** decimals
+
+    int_digits = np.ones(len(values), dtype=np.int64)
+    rest = whole // 10
+    while rest.any():
+        int_digits += rest > 0
+        rest //= 10
+
+    max_digits = int(int_digits.max()) if len(values) else 1
+    width = int(negative.any()) + max_digits + (decimals + 1 if decimals else 0)
+    out = np.full((len(values), width), ord(fill), dtype=np.uint8)
+
+    column = width - 1
+    for _ in range(decimals):
+        out[:, column] = ord('0') + scaled % 10
+        scaled //= 10
+        column -= 1
+    if decimals:
+        out[:, column] = ord('.')
+        column -= 1
+    for k in range(max_digits):
+        digit = ord('0') + scaled % 10
+        out[:, column - k] = digit if fill == '0' else np.where(k < int_digits, digit, ord(fill))
+        scaled //= 10
+
+    rows = np.nonzero(negative)[0]
+    out[rows, column - int_digits[rows]] = ord('-')
+    return out
+
+
+def text_rows(parts):
+    # Łączy kolumny tekstu (tablice uint8 albo stałe bytes) w wiersze
+    rows = next(len(p) for p in parts if isinstance(p, np.ndarray))
+    columns = [np.broadcast_to(np.frombuffer(p, dtype=np.uint8), (rows, len(p)))
+               if isinstance(p, bytes) else p for p in parts]
+    return np.concatenate(columns, axis=1)
+
+
+def write_obj(path, mesh):
+    # Kolor jako rozszerzenie "v x y z r g b" (czytane m.in. przez MeshLab
+    # i Blendera). Wiersze v i vn idą na przemian pasami - numeracja obu
+    # rodzajów zostaje zgodna. Indeksy dopełnione zerami ("f 0012//0012").
+    with open(path, 'wb') as f:
+        f.write(b'# lab4 eksport.py\n')
+
+        vertex_count = 0
+        for chunk in mesh['vertices']():
+            fields = [b'v']
+            for c in range(6):
+                fields += [b' ', ascii_numbers(chunk[:, c], POSITION_DECIMALS if c < 3 else COLOR_DECIMALS)]
+            text_rows(fields + [b'\n']).tofile(f)
+
+            fields = [b'vn']
+            for c in range(6, 9):
+                fields += [b' ', ascii_numbers(chunk[:, c], NORMAL_DECIMALS)]
+            text_rows(fields + [b'\n']).tofile(f)
+            vertex_count += len(chunk)
+        check_count('wierzchołków', vertex_count, mesh['vertex_count'])
+
+        triangle_count = 0
+        for chunk in mesh['triangles']():
+            fields = [b'f']
+            for c in range(3):
+                index = ascii_numbers(chunk[:, c].astype(np.int64) + 1, fill='0')
+                fields += [b' ', index, b'//', index]
+            text_rows(fields + [b'\n']).tofile(f)
+            triangle_count += len(chunk)
+        check_count('trójkątów', triangle_count, mesh['triangle_count'])
+
+
+EXPORTERS = {'.glb': write_glb, '.ply': write_ply, '.obj': write_obj}
+
+
+def export(path, mesh):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORTERS:
+        raise ValueError("Nieobsługiwany format: {} (dostępne: {})".format(
+            extension, ', '.join(sorted(EXPORTERS))))
+    EXPORTERS[extension](path, mesh)
+    return os.path.getsize(path)
+
+
+def benchmark(size=2049, seed=1):
+    heightmap = teren.diamond_square_iterative(size, seed)
+    mesh = terrain_mesh(heightmap, 5.0, 30.0)
+    print("Eksport terenu {}x{} ({} wierzchołków, {} trójkątów):".format(
+        size, size, mesh['vertex_count'], mesh['triangle_count']))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in sorted(EXPORTERS):
+            path = os.path.join(directory, 'teren' + extension)
+            tracemalloc.start()
+            start = time.perf_counter()
+            file_size = export(path, mesh)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            os.unlink(path)
+            print("  {:5s} {:7.2f} s  {:8.1f} MB  {:7.1f} MB/s  szczyt pamięci {:6.1f} MB".format(
+                extension, elapsed, file_size / 2 ** 20, file_size / 2 ** 20 / elapsed, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'benchmark'
+    if command == 'teren':
+        size = int(sys.argv[3]) if len(sys.argv) > 3 else 513
+        seed = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+        print("Zapisano {:.1f} MB".format(export(sys.argv[2], terrain_mesh(
+            teren.diamond_square_iterative(size, seed), 5.0, 30.0)) / 2 ** 20))
+    elif command == 'obiekt':
+        print("Zapisano {:.1f} kB".format(export(sys.argv[2], object_mesh()) / 2 ** 10))
+    else:
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 2049)
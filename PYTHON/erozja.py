@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# Erozja termiczna i hydrauliczna mapy wysokości (post-processing terenu)
+#
+# Każda iteracja to kilka operacji na całych tablicach (przesunięcia
+# np.roll o jedną komórkę w czterech kierunkach), a nie pętla po kroplach.
+# Mapa jest okresowa z okresem size - 1, jak w get_height, więc materiał
+# zsuwający się z krawędzi trafia na przeciwną stronę i teren dalej się
+# zawija bez szwu.
+#
+# Z workers > 1 mapa jest dzielona na pasy wierszy z marginesem (halo)
+# i liczona w puli wątków; wynik jest identyczny jak w wersji szeregowej.
+#
+#   python erozja.py [ROZMIAR [WĄTKI]]   - przepustowość w aktualizacjach komórek/s
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import teren
+
+# Kierunki sąsiadów: (oś, przesunięcie) dla np.roll
+DIRECTIONS = [(0, 1), (0, -1), (1, 1), (1, -1)]
+
+THERMAL_DEFAULTS = {
+    # Największa różnica wysokości między sąsiadami, która się utrzymuje;
+    # None = średnia różnica sąsiadów mapy wejściowej (wysokości z generatorów
+    # mają ten sam zakres dla każdego rozmiaru, więc nachylenie na komórkę
+    # zależy od rozmiaru mapy)
+    'talus': None,
+    'rate': 0.25,  # część nadmiaru przenoszona w jednej iteracji (stabilne do 0.25 na kierunek)
+}
+
+HYDRAULIC_DEFAULTS = {
+    'rain': 0.01,  # woda dodawana w każdej iteracji
+    'solubility': 0.01,  # grunt rozpuszczany na jednostkę wody
+    'capacity': 0.01,  # osad utrzymywany na jednostkę wody
+    'evaporation': 0.5,  # część wody odparowująca w każdej iteracji
+}
+
+
+# JEDNA ITERACJA (na tablicach okresowych w obu osiach)
+
+def thermal_step(state, talus, rate):
+    # Materiał zsuwa się do niższych sąsiadów, gdy różnica przekracza talus.
+    # Suma wysokości jest zachowana: co odpływa z komórki, trafia do sąsiada.
+    (h,) = state
+    new_h = h.copy()
+    for axis, shift in DIRECTIONS:
+        excess = h - np.roll(h, shift, axis=axis) - talus
+        np.maximum(excess, 0.0, out=excess)
+        excess *= rate
+        new_h -= excess
+        new_h += np.roll(excess, -shift, axis=axis)
+    return (new_h,)
+
+
+def hydraulic_step(state, rain, solubility, capacity, evaporation):
+    # Erozja wodna na siatce (model Olsena): deszcz rozpuszcza część gruntu,
+    # woda z osadem spływa do niższych sąsiadów proporcjonalnie do spadku
+    # poziomu wody, a przy parowaniu nadmiar osadu ponad pojemność wody
+    # wraca do terenu. Suma teren + osad jest zachowana.
+    h, water, sediment = state
+    water = water + rain
+    h = h - solubility * water
+    sediment = sediment + solubility * water
+    level = h + water
+
+    drops = []
+    total_drop = np.zeros_like(h)
+    for axis, shift in DIRECTIONS:
+        drop = level - np.roll(level, shift, axis=axis)
+        np.maximum(drop, 0.0, out=drop)
+        drops.append(drop)
+        total_drop += drop
+
+    # Najwyżej połowa spadku - woda wyrównuje poziom, ale go nie odwraca
+    moved = np.minimum(water, total_drop * 0.5)
+    share = np.divide(moved, total_drop, out=np.zeros_like(h), where=total_drop > 0)
+    concentration = np.divide(sediment, water, out=np.zeros_like(h), where=water > 0)
+
+    new_water = water - moved
+    new_sediment = sediment - moved * concentration
+    for (axis, shift), drop in zip(DIRECTIONS, drops):
+        out = drop * share
+        new_water += np.roll(out, -shift, axis=axis)
+        new_sediment += np.roll(out * concentration, -shift, axis=axis)
+
+    new_water *= 1.0 - evaporation
+    settled = np.maximum(new_sediment - capacity * new_water, 0.0)
+    return h + settled, new_water, new_sediment - settled
+
+
+KERNELS = {
+    # nazwa: (krok, liczba tablic stanu, margines pasa w wierszach, parametry domyślne)
+    'thermal': (thermal_step, 1, 1, THERMAL_DEFAULTS),
+    'hydraulic': (hydraulic_step, 3, 2, HYDRAULIC_DEFAULTS),
+}
+
+
+# ITERACJE (szeregowo albo pasami w puli wątków)
+
+def _step_band(step, state, row_start, row_stop, halo, params):
+    # Pas wierszy z marginesem pobranym z zawijaniem; błędne wiersze na
+    # brzegach marginesu są odrzucane
+    rows = np.arange(row_start - halo, row_stop + halo)
+    padded = tuple(np.take(a, rows, axis=0, mode='wrap') for a in state)
+    return tuple(a[halo:-halo] for a in step(padded, **params))
+
+
+def _bands(rows, count):
+    edges = np.linspace(0, rows, count + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def erode(heightmap, kind='thermal', iterations=50, workers=1, max_seconds=None, **params):
+    # Zwraca (nowa mapa, liczba wykonanych iteracji). max_seconds przerywa
+    # pracę po przekroczeniu budżetu czasu (sprawdzane po każdej iteracji).
+    step, arrays, halo, defaults = KERNELS[kind]
+    params = dict(defaults, **params)
+    period = heightmap.shape[0] - 1
+    if params.get('talus', 0.0) is None:
+        params['talus'] = roughness(heightmap)
+
+    core = np.array(heightmap[:period, :period], dtype=np.float64)
+    state = (core,) + tuple(np.zeros_like(core) for _ in range(arrays - 1))
+    bands = _bands(period, workers) if workers > 1 and period >= 4 * halo * workers else None
+    start = time.perf_counter()
+    done = 0
+
+    pool = ThreadPoolExecutor(workers) if bands else None
+    try:
+        while done < iterations:
+            if bands:
+                parts = list(pool.map(lambda b: _step_band(step, state, b[0], b[1], halo, params), bands))
+                state = tuple(np.concatenate([p[k] for p in parts]) for k in range(arrays))
+            else:
+                state = step(state, **params)
+            done += 1
+            if max_seconds is not None and time.perf_counter() - start > max_seconds:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if kind == 'hydraulic':
+        # Osad niesiony przez wodę zostaje na miejscu - masa terenu zachowana
+        state[0][...] += state[2]
+
+    out = np.empty(heightmap.shape, dtype=heightmap.dtype)
+    out[:period, :period] = state[0]
+    teren.copy_border(out)
+    return out, done
+
+
+def roughness(heightmap):
+    # Średnia bezwzględna różnica sąsiednich wysokości (miara "ostrości")
+    h = heightmap[:-1, :-1]
+    return float((np.abs(h - np.roll(h, 1, axis=0)).mean() + np.abs(h - np.roll(h, 1, axis=1)).mean()) / 2)
+
+
+def benchmark(size=1025, max_workers=4, iterations=20):
+    heightmap = teren.diamond_square_iterative(size, 1, dtype=np.float64)
+    cells = (size - 1) ** 2
+    print("Erozja mapy {}x{}, {} iteracji (szorstkość przed: {:.4f}):".format(
+        size, size, iterations, roughness(heightmap)))
+
+    for kind in KERNELS:
+        reference = None
+        for workers in sorted({1, 2, max_workers}):
+            start = time.perf_counter()
+            eroded, done = erode(heightmap, kind, iterations, workers=workers)
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = eroded
+            print("  {:9s} {} wątk.  {:6.2f} s  {:6.1f} mln aktualizacji komórek/s  szorstkość {:.4f}  {}".format(
+                kind, workers, elapsed, cells * done / elapsed / 1e6, roughness(eroded),
+                'zgodny' if np.array_equal(eroded, reference) else 'NIEZGODNY'))
+
+    # Masa terenu (suma wysokości) przed i po erozji
+    for kind in KERNELS:
+        eroded, _ = erode(heightmap, kind, iterations)
+        print("  {:9s} zmiana sumy wysokości: {:.1e}".format(
+            kind, abs(eroded[:-1, :-1].sum() - heightmap[:-1, :-1].sum()) / cells))
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1025,
+              int(sys.argv[2]) if len(sys.argv) > 2 else 4)
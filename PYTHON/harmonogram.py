@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# Harmonogram pracy z priorytetami i budżetem czasu na klatkę (zad5.0.py)
+#
+# Przesyłanie buforów terenu do GPU, przebudowa normalnych, odświeżenie
+# minimapy czy wypisywanie statystyk nie są wykonywane od razu w render(),
+# tylko trafiają do kolejki z priorytetem (0 = najpilniejsze). To jedyna
+# kolejka pracy odkładanej na klatki: w każdej klatce run() wykonuje zadania
+# w kolejności priorytetów, dopóki szacowany koszt następnego kroku mieści
+# się w budżecie; reszta przechodzi na kolejne klatki.
+#
+# Budżet klatki to mniejsza z wartości: stały budżet i czas do końca okresu
+# klatki (petla.frame_budget). Klatka już po terminie nie wykonuje zadań;
+# wyjątkiem jest zadanie czekające co najmniej MAX_WAIT_FRAMES klatek - jeden
+# jego krok idzie mimo to, żeby ciągłe przekroczenia go nie zagłodziły.
+#
+# Zadanie to funkcja albo generator - generator jest wykonywany krokami
+# (każde yield kończy krok), więc długą pracę można rozłożyć na klatki.
+# Koszt kroku jest szacowany ze średniej kroczącej czasów zadań o tej samej
+# nazwie.
+#
+#   python harmonogram.py [BUDŻET_MS]   - klatki bez okna ze sztucznym zegarem
+#                                         i dużymi paczkami zadań; p99 czasu klatki
+import sys
+import time
+import heapq
+import types
+from collections import deque
+import numpy as np
+
+WORK_BUDGET = 0.004  # s pracy z kolejki na klatkę
+COST_SMOOTHING = 0.2  # waga nowej próbki w średniej kroczącej kosztu kroku
+METRICS_WINDOW = 600  # ostatnie klatki / zadania uwzględniane w metrykach
+MAX_WAIT_FRAMES = 30  # tyle klatek bez budżetu, potem jeden krok wymuszony
+
+
+def make_scheduler(budget=WORK_BUDGET, clock=time.perf_counter):
+    return {
+        'budget': budget,
+        'clock': clock,
+        'queue': [],  # kopiec (priorytet, numer, zadanie)
+        'counter': 0,
+        'keys': {},  # klucz -> zadanie oczekujące (bez duplikatów tej samej pracy)
+        'costs': {},  # nazwa -> szacowany koszt kroku
+        'frame': 0,
+        'forced': 0,  # kroki wykonane bez budżetu (zadanie czekało za długo)
+        'latencies': {},  # priorytet -> czasy od dodania do zakończenia
+        'depths': deque(maxlen=METRICS_WINDOW),  # długość kolejki na końcu każdej klatki
+        'work': deque(maxlen=METRICS_WINDOW),  # czas pracy z kolejki w każdej klatce
+    }
+
+
+def submit(scheduler, name, priority, task, key=None):
+    # task: funkcja bez argumentów albo generator. Z kluczem zadanie, które
+    # już czeka w kolejce, nie jest dodawane drugi raz.
+    if key is not None and key in scheduler['keys']:
+        return scheduler['keys'][key]
+    entry = {
+        'name': name,
+        'priority': priority,
+        'task': task,
+        'key': key,
+        'submitted': scheduler['clock'](),
+        'frame': scheduler['frame'],
+        'steps': 0,
+        'done': False,
+    }
+    if key is not None:
+        scheduler['keys'][key] = entry
+    _push(scheduler, entry)
+    return entry
+
+
+def _push(scheduler, entry):
+    heapq.heappush(scheduler['queue'], (entry['priority'], scheduler['counter'], entry))
+    scheduler['counter'] += 1
+
+
+def pending(scheduler, key):
+    return key in scheduler['keys']
+
+
+def run(scheduler, budget=None):
+    # Wykonuje kroki zadań w ramach budżetu; przy dodatnim budżecie zawsze
+    # co najmniej jeden krok, żeby krok dłuższy niż budżet nie zablokował
+    # kolejki na zawsze. Budżet <= 0 (klatka po terminie): tylko krok
+    # zadania czekającego od MAX_WAIT_FRAMES klatek.
+    clock = scheduler['clock']
+    budget = scheduler['budget'] if budget is None else budget
+    queue = scheduler['queue']
+    start = clock()
+    steps = 0
+
+    while queue:
+        entry = queue[0][2]
+        estimate = scheduler['costs'].get(entry['name'], 0.0)
+        if steps:
+            if clock() - start + estimate > budget:
+                break
+        elif budget <= 0:
+            if scheduler['frame'] - entry['frame'] < MAX_WAIT_FRAMES:
+                break
+            scheduler['forced'] += 1
+        heapq.heappop(queue)
+
+        step_start = clock()
+        finished = _step(entry)
+        cost = clock() - step_start
+        old = scheduler['costs'].get(entry['name'], cost)
+        scheduler['costs'][entry['name']] = old * (1.0 - COST_SMOOTHING) + cost * COST_SMOOTHING
+        steps += 1
+
+        if finished:
+            entry['done'] = True
+            if entry['key'] is not None:
+                scheduler['keys'].pop(entry['key'], None)
+            latencies = scheduler['latencies'].setdefault(entry['priority'], deque(maxlen=METRICS_WINDOW))
+            latencies.append(clock() - entry['submitted'])
+        else:
+            # Niedokończony generator wraca do kolejki za zadaniami
+            # o tym samym priorytecie
+            _push(scheduler, entry)
+
+    scheduler['work'].append(clock() - start)
+    scheduler['depths'].append(len(queue))
+    scheduler['frame'] += 1
+    return steps
+
+
+def flush(scheduler):
+    # Po pętli: wszystkie oczekujące zadania do końca, bez budżetu
+    # (np. ostatnie wypisy przed wyjściem)
+    queue = scheduler['queue']
+    while queue:
+        entry = heapq.heappop(queue)[2]
+        while not _step(entry):
+            pass
+        entry['done'] = True
+        if entry['key'] is not None:
+            scheduler['keys'].pop(entry['key'], None)
+
+
+def _step(entry):
+    # Jeden krok zadania; True, gdy zadanie się zakończyło
+    task = entry['task']
+    entry['steps'] += 1
+    if isinstance(task, types.GeneratorType):
+        try:
+            next(task)
+        except StopIteration:
+            return True
+        return False
+    task()
+    return True
+
+
+def metrics(scheduler):
+    # Głębokość kolejki i opóźnienia (od dodania do zakończenia) w sekundach
+    # z ostatnich METRICS_WINDOW klatek / zadań
+    work = np.array(scheduler['work'] or [0.0])
+    depths = np.array(scheduler['depths'] or [0])
+    result = {
+        'depth': len(scheduler['queue']),
+        'depth_max': int(depths.max()),
+        'forced': scheduler['forced'],
+        'work_p99': float(np.percentile(work, 99)),
+        'work_max': float(work.max()),
+        'latency': {},
+    }
+    for priority, latencies in sorted(scheduler['latencies'].items()):
+        latencies = np.array(latencies)
+        result['latency'][priority] = (len(latencies), float(np.percentile(latencies, 50)),
+                                       float(np.percentile(latencies, 99)))
+    return result
+
+
+def print_metrics(scheduler):
+    m = metrics(scheduler)
+    print("  kolejka: {} zadań (maks. {}), praca na klatkę p99 {:.2f} ms (maks. {:.2f} ms), wymuszone: {}".format(
+        m['depth'], m['depth_max'], m['work_p99'] * 1000.0, m['work_max'] * 1000.0, m['forced']))
+    for priority, (count, p50, p99) in m['latency'].items():
+        print("  priorytet {}: {} zadań, opóźnienie p50 {:.1f} ms, p99 {:.1f} ms".format(
+            priority, count, p50 * 1000.0, p99 * 1000.0))
+
+
+def benchmark(budget=WORK_BUDGET, frames=600, period=1.0 / 60.0):
+    # Klatka kosztuje 9-11 ms (sztuczny zegar). Co 50 klatek trafia paczka:
+    # 64 kafelki do przesłania (0,6 ms każdy), przebudowa normalnych w 16
+    # pasach (1,5 ms na pas) i odświeżenie minimapy (2 ms). Porównanie
+    # z wykonaniem wszystkiego od razu w tej samej klatce.
+    import random
+    import petla
+
+    results = {}
+    for mode in ('od razu', 'harmonogram'):
+        clock, advance = petla.fake_clock()
+        scheduler = make_scheduler(budget, clock)
+        rng = random.Random(3)
+        frame_times = []
+
+        def normals(bands=16):
+            for _ in range(bands):
+                advance(0.0015)
+                yield
+
+        for frame in range(frames):
+            start = clock()
+            advance(rng.uniform(0.009, 0.011))
+            if frame % 50 == 0:
+                for _ in range(64):
+                    submit(scheduler, 'kafelek', 0, lambda: advance(0.0006))
+                submit(scheduler, 'normalne', 1, normals(), key='normalne')
+                submit(scheduler, 'minimapa', 2, lambda: advance(0.002), key='minimapa')
+            run(scheduler, budget=float('inf') if mode == 'od razu' else None)
+            frame_times.append(clock() - start)
+
+        frame_times = np.array(frame_times)
+        results[mode] = float(np.percentile(frame_times, 99))
+        print("{}: czas klatki p50 {:.2f} ms, p99 {:.2f} ms, maks. {:.2f} ms (okres {:.1f} ms)".format(
+            mode, np.percentile(frame_times, 50) * 1000.0, results[mode] * 1000.0,
+            frame_times.max() * 1000.0, period * 1000.0))
+        print_metrics(scheduler)
+    return results['harmonogram'] <= period
+
+
+if __name__ == '__main__':
+    ok = benchmark(float(sys.argv[1]) / 1000.0 if len(sys.argv) > 1 else WORK_BUDGET)
+    print("p99 czasu klatki w okresie:", "OK" if ok else "PRZEKROCZONY")
+    sys.exit(0 if ok else 1)
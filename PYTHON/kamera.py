@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# Kamera z orientacją w kwaternionie (zad4.5.py - orbita, zad5.0.py - FPP)
+#
+# Kąty theta/phi w zad4.5 dawały pozycję oka z sześciu funkcji
+# trygonometrycznych w każdej klatce, a wektor UP odwracał się skokowo dla
+# 90 < phi < 270. Tutaj orientacja jest kwaternionem obracanym przyrostowo
+# o ruch myszy, a oś UP to obrócona oś Y kamery - przejście przez biegun
+# jest ciągłe.
+#
+#   python kamera.py   - sprawdzenie ciągłości na biegunach i zgodności z gluLookAt
+import math
+import numpy as np
+
+AXIS_X = np.array([1.0, 0.0, 0.0])
+AXIS_Y = np.array([0.0, 1.0, 0.0])
+AXIS_Z = np.array([0.0, 0.0, 1.0])
+IDENTITY = np.array([1.0, 0.0, 0.0, 0.0])  # (w, x, y, z)
+
+
+# KWATERNIONY
+
+def quat_from_axis_angle(axis, angle):
+    # Obrót o angle stopni wokół osi jednostkowej axis (prawoskrętnie)
+    half = math.radians(angle) * 0.5
+    s = math.sin(half)
+    return np.array([math.cos(half), axis[0] * s, axis[1] * s, axis[2] * s])
+
+
+def quat_multiply(a, b):
+    # Złożenie obrotów: najpierw b, potem a
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return np.array([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ])
+
+
+def quat_normalize(q):
+    # Przy obrotach przyrostowych błędy zaokrągleń powoli zmieniają długość
+    return q / math.sqrt(q[0] * q[0] + q[1] * q[1] + q[2] * q[2] + q[3] * q[3])
+
+
+def quat_to_matrix(q):
+    # Macierz obrotu 3x3; kolumny to obrócone osie X, Y, Z
+    w, x, y, z = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ])
+
+
+def quat_rotate(q, v):
+    return quat_to_matrix(q) @ v
+
+
+# OBRÓT PRZYROSTOWY (WSPÓLNY DLA OBU KAMER)
+#
+# Obrót o yaw wokół pionowej osi świata (mnożenie z lewej) i o pitch wokół
+# własnej osi Z kamery (z prawej). Oba rodzaje obrotów są przemienne w tym
+# układzie, więc orientacja to zawsze Ry(-suma yaw) * Rz(suma pitch) - oś
+# kierunku to obrócona oś X, a kąty można z niej odczytać z powrotem.
+
+def turn(q, d_yaw, d_pitch):
+    if d_yaw != 0.0:
+        q = quat_multiply(quat_from_axis_angle(AXIS_Y, -d_yaw), q)
+    if d_pitch != 0.0:
+        q = quat_multiply(q, quat_from_axis_angle(AXIS_Z, d_pitch))
+    return quat_normalize(q)
+
+
+def yaw_pitch(q):
+    # Kąty (yaw, pitch) w stopniach z przedziału (-180, 180]. pitch z osi
+    # kierunku i osi UP, więc także po przejściu przez biegun
+    # (theta / phi kamery orbitalnej).
+    m = quat_to_matrix(q)
+    return (math.degrees(math.atan2(-m[0, 2], m[2, 2])),
+            math.degrees(math.atan2(m[1, 0], m[1, 1])))
+
+
+# KAMERA ORBITALNA (ZAD 4.5)
+
+def make_orbit_camera(radius, theta=0.0, phi=0.0):
+    # Stan kamery w słowniku. Dla orientacji jednostkowej oko leży na +X,
+    # a UP to +Y - tak jak dla theta = phi = 0 w zad4.5.
+    camera = {'orientation': IDENTITY.copy(), 'radius': radius}
+    orbit(camera, theta, phi)
+    return camera
+
+
+def orbit(camera, d_theta, d_phi):
+    # theta: obrót wokół pionowej osi świata (oko od +X w stronę +Z),
+    # phi: obrót wokół własnej osi Z kamery (oko w górę). Bez ruchu myszy
+    # nic nie jest liczone.
+    if d_theta == 0.0 and d_phi == 0.0:
+        return
+    camera['orientation'] = turn(camera['orientation'], d_theta, d_phi)
+
+
+def orbit_angles(camera):
+    # (theta, phi) w [0, 360) jak dawne globalne kąty zad4.5 - do przełączenia
+    # na tryb obiektu bez utraty orientacji
+    theta, phi = yaw_pitch(camera['orientation'])
+    return theta % 360.0, phi % 360.0
+
+
+def set_orbit_angles(camera, theta, phi):
+    camera['orientation'] = turn(IDENTITY, theta, phi)
+
+
+def orbit_eye(camera, target=(0.0, 0.0, 0.0)):
+    # Pozycja oka i wektor UP (obie osie z jednej macierzy obrotu)
+    m = quat_to_matrix(camera['orientation'])
+    return np.asarray(target, dtype=float) + camera['radius'] * m[:, 0], m[:, 1]
+
+
+def orbit_view_matrix(camera, target=(0.0, 0.0, 0.0)):
+    # Macierz widoku 4x4 (wierszowo; do glLoadMatrixf podać transpozycję).
+    # Kamera patrzy wzdłuż -Z, więc Z kamery to kierunek do oka (oś X
+    # orientacji), Y to UP, a X = Y x Z.
+    m = quat_to_matrix(camera['orientation'])
+    eye = np.asarray(target, dtype=float) + camera['radius'] * m[:, 0]
+
+    view = np.identity(4)
+    view[0, :3] = -m[:, 2]
+    view[1, :3] = m[:, 1]
+    view[2, :3] = m[:, 0]
+    view[:3, 3] = -view[:3, :3] @ eye
+    return view
+
+
+# KAMERA FPP (ZAD 5.0)
+
+FLY_MAX_PITCH = 89.0  # bez przewrotu kamery przez pion
+
+
+def fly_orientation(yaw, pitch):
+    # Kierunek patrzenia dla yaw = pitch = 0 to +X; yaw obraca w stronę +Z,
+    # pitch w górę
+    return turn(IDENTITY, yaw, pitch)
+
+
+def fly_turn(orientation, d_yaw, d_pitch, max_pitch=FLY_MAX_PITCH):
+    # Obrót o ruch myszy z pitch ograniczonym do [-max_pitch, max_pitch];
+    # bez ruchu orientacja zostaje bez zmian
+    if d_pitch != 0.0:
+        pitch = yaw_pitch(orientation)[1]
+        d_pitch = min(max(pitch + d_pitch, -max_pitch), max_pitch) - pitch
+    if d_yaw == 0.0 and d_pitch == 0.0:
+        return orientation
+    return turn(orientation, d_yaw, d_pitch)
+
+
+def fly_forward(orientation):
+    # Obrócona oś X (pierwsza kolumna quat_to_matrix) bez całej macierzy
+    w, x, y, z = orientation
+    return np.array([1 - 2 * (y * y + z * z), 2 * (x * y + w * z), 2 * (x * z - w * y)])
+
+
+def look_at_matrix(eye, target, up):
+    # Ten sam wzór co gluLookAt (do porównań bez kontekstu OpenGL)
+    f = np.asarray(target, dtype=float) - eye
+    f = f / np.linalg.norm(f)
+    s = np.cross(f, up)
+    s = s / np.linalg.norm(s)
+    u = np.cross(s, f)
+
+    view = np.identity(4)
+    view[0, :3] = s
+    view[1, :3] = u
+    view[2, :3] = -f
+    view[:3, 3] = -view[:3, :3] @ eye
+    return view
+
+
+def legacy_orbit_eye(radius, theta, phi):
+    # Dawny wzór z zad4.5 (z odwracaniem UP), do porównania
+    theta_rad = math.radians(theta)
+    phi_rad = math.radians(phi)
+    eye = np.array([radius * math.cos(theta_rad) * math.cos(phi_rad),
+                    radius * math.sin(phi_rad),
+                    radius * math.sin(theta_rad) * math.cos(phi_rad)])
+    up = np.array([0.0, -1.0, 0.0]) if 90.0 < phi % 360.0 < 270.0 else AXIS_Y
+    return eye, up
+
+
+def check_poles(radius=10.0, theta=30.0, step=0.5):
+    # Pełny obrót phi przez oba bieguny małymi krokami: największe skoki
+    # oka i wektora UP między kolejnymi klatkami
+    camera = make_orbit_camera(radius, theta, 0.0)
+    eye, up = orbit_eye(camera)
+    legacy_eye, legacy_up = legacy_orbit_eye(radius, theta, 0.0)
+    jumps = {'eye': 0.0, 'up': 0.0, 'legacy_eye': 0.0, 'legacy_up': 0.0}
+
+    for k in range(1, int(round(360.0 / step)) + 1):
+        orbit(camera, 0.0, step)
+        new_eye, new_up = orbit_eye(camera)
+        new_legacy_eye, new_legacy_up = legacy_orbit_eye(radius, theta, k * step)
+
+        jumps['eye'] = max(jumps['eye'], np.linalg.norm(new_eye - eye))
+        jumps['up'] = max(jumps['up'], np.linalg.norm(new_up - up))
+        jumps['legacy_eye'] = max(jumps['legacy_eye'], np.linalg.norm(new_legacy_eye - legacy_eye))
+        jumps['legacy_up'] = max(jumps['legacy_up'], np.linalg.norm(new_legacy_up - legacy_up))
+        eye, up, legacy_eye, legacy_up = new_eye, new_up, new_legacy_eye, new_legacy_up
+
+    # Po pełnym obrocie kamera wraca do punktu startu
+    start_eye, _ = orbit_eye(make_orbit_camera(radius, theta, 0.0))
+    jumps['closure'] = np.linalg.norm(eye - start_eye)
+    return jumps
+
+
+if __name__ == '__main__':
+    step = 0.5
+    jumps = check_poles(step=step)
+    arc = 10.0 * math.radians(step)
+    print("Obrót phi o 360 stopni krokami {} stopnia (R = 10):".format(step))
+    print("  kwaternion: skok oka {:.4f}, skok UP {:.4f}, domknięcie {:.1e}".format(
+        jumps['eye'], jumps['up'], jumps['closure']))
+    print("  dawny wzór: skok oka {:.4f}, skok UP {:.4f}".format(
+        jumps['legacy_eye'], jumps['legacy_up']))
+    assert jumps['eye'] <= arc * 1.001 and jumps['up'] <= math.radians(step) * 1.001
+    assert jumps['closure'] < 1e-9
+
+    # Dla phi w (-90, 90) widok ma być taki sam jak z gluLookAt w zad4.5
+    worst = 0.0
+    for theta, phi in ((0.0, 0.0), (30.0, 45.0), (200.0, -60.0), (315.0, 89.0)):
+        eye, up = legacy_orbit_eye(10.0, theta, phi)
+        expected = look_at_matrix(eye, np.zeros(3), up)
+        worst = max(worst, np.abs(orbit_view_matrix(make_orbit_camera(10.0, theta, phi)) - expected).max())
+    print("Zgodność z gluLookAt poza biegunami: {:.1e}".format(worst))
+    assert worst < 1e-9
+
+    forward = np.array([math.cos(math.radians(40.0)) * math.cos(math.radians(-20.0)),
+                        math.sin(math.radians(-20.0)),
+                        math.sin(math.radians(40.0)) * math.cos(math.radians(-20.0))])
+    print("Kierunek kamery FPP: różnica {:.1e}".format(np.abs(fly_forward(fly_orientation(40.0, -20.0)) - forward).max()))
+    assert np.abs(fly_forward(fly_orientation(40.0, -20.0)) - forward).max() < 1e-12
+
+    # Przyrostowe obroty FPP: ograniczenie pitch i odczyt kątów
+    q = fly_orientation(40.0, -20.0)
+    for _ in range(100):
+        q = fly_turn(q, 1.5, 3.0)
+    yaw, pitch = yaw_pitch(q)
+    assert abs(yaw - 190.0 + 360.0) < 1e-9 and abs(pitch - FLY_MAX_PITCH) < 1e-9
+
+    # Kąty orbity przez biegun (phi > 90) wracają do tych samych wartości
+    camera = make_orbit_camera(10.0, 30.0, 0.0)
+    orbit(camera, 20.0, 130.0)
+    theta, phi = orbit_angles(camera)
+    assert abs(theta - 50.0) < 1e-9 and abs(phi - 130.0) < 1e-9
+    set_orbit_angles(camera, theta, phi)
+    assert np.abs(orbit_eye(camera)[0] - orbit_eye(make_orbit_camera(10.0, 50.0, 130.0))[0]).max() < 1e-9
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# Ciągła kolizja z terenem dla zad5.0.py
+#
+# Zamiast sprawdzać wysokość tylko w punkcie końcowym ruchu, odcinek ruchu
+# jest próbkowany na każdym przecięciu z siatką mapy wysokości (oraz w połowie
+# każdej komórki), więc przy dużej prędkości kamera nie przelatuje przez grzbiety.
+import time
+import numpy as np
+
+
+def sample_heights(heightmap, xs, zs, terrain_scale, height_scale):
+    # Wektorowa wersja get_interpolated_height (interpolacja biliniowa
+    # z zawijaniem co MAP_SIZE - 1 komórek, jak w get_height)
+    period = heightmap.shape[0] - 1
+    grid_x = np.asarray(xs, dtype=np.float64) / terrain_scale
+    grid_z = np.asarray(zs, dtype=np.float64) / terrain_scale
+
+    x_int = np.floor(grid_x)
+    z_int = np.floor(grid_z)
+    x_frac = grid_x - x_int
+    z_frac = grid_z - z_int
+    x0 = x_int.astype(np.int64) % period
+    z0 = z_int.astype(np.int64) % period
+    x1 = (x0 + 1) % period
+    z1 = (z0 + 1) % period
+
+    h_x1 = heightmap[x0, z0] * (1 - x_frac) + heightmap[x1, z0] * x_frac
+    h_x2 = heightmap[x0, z1] * (1 - x_frac) + heightmap[x1, z1] * x_frac
+    return (h_x1 * (1 - z_frac) + h_x2 * z_frac) * height_scale
+
+
+def terrain_normal(heightmap, x, z, terrain_scale, height_scale):
+    # Normalna terenu z różnic centralnych wysokości
+    d = terrain_scale * 0.5
+    hx = sample_heights(heightmap, [x + d, x - d], [z, z], terrain_scale, height_scale)
+    hz = sample_heights(heightmap, [x, x], [z + d, z - d], terrain_scale, height_scale)
+    normal = np.array([-(hx[0] - hx[1]) / (2 * d), 1.0, -(hz[0] - hz[1]) / (2 * d)])
+    return normal / np.linalg.norm(normal)
+
+
+def _crossing_params(start, end, terrain_scale):
+    # Parametry t w [0, 1], w których odcinek przecina linie siatki X i Z,
+    # uzupełnione o środki przedziałów (wysokość w komórce nie jest liniowa)
+    ts = [0.0, 1.0]
+    for axis in (0, 2):
+        a = start[axis] / terrain_scale
+        b = end[axis] / terrain_scale
+        if a == b:
+            continue
+        lo, hi = sorted((a, b))
+        lines = np.arange(np.floor(lo) + 1, np.ceil(hi))
+        ts.extend((lines - a) / (b - a))
+
+    ts = np.unique(np.clip(ts, 0.0, 1.0))
+    mids = (ts[:-1] + ts[1:]) * 0.5
+    return np.sort(np.concatenate((ts, mids)))
+
+
+def sweep_segment(heightmap, start, end, clearance, terrain_scale, height_scale, refine_steps=8):
+    # Pierwszy kontakt odcinka start -> end z powierzchnią terenu + clearance.
+    # Zwraca (t, punkt, normalna) albo None, jeśli ruch jest wolny.
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    ts = _crossing_params(start, end, terrain_scale)
+    points = start + (end - start) * ts[:, np.newaxis]
+    depth = sample_heights(heightmap, points[:, 0], points[:, 2], terrain_scale, height_scale) \
+        + clearance - points[:, 1]
+
+    hits = np.nonzero(depth > 0.0)[0]
+    if len(hits) == 0:
+        return None
+
+    first = hits[0]
+    if first == 0:
+        t = 0.0
+    else:
+        # Doprecyzowanie momentu kontaktu bisekcją między ostatnią wolną próbką a kolizją
+        t_free, t_hit = ts[first - 1], ts[first]
+        for _ in range(refine_steps):
+            t_mid = (t_free + t_hit) * 0.5
+            p = start + (end - start) * t_mid
+            if sample_heights(heightmap, p[0], p[2], terrain_scale, height_scale) + clearance > p[1]:
+                t_hit = t_mid
+            else:
+                t_free = t_mid
+        t = t_free
+
+    point = start + (end - start) * t
+    return t, point, terrain_normal(heightmap, point[0], point[2], terrain_scale, height_scale)
+
+
+def slide(heightmap, start, end, clearance, terrain_scale, height_scale):
+    # Ruch z kolizją: do punktu kontaktu, potem reszta ruchu rzutowana
+    # na płaszczyznę styczną do terenu (ślizganie się po zboczu)
+    end = np.asarray(end, dtype=np.float64)
+    contact = sweep_segment(heightmap, start, end, clearance, terrain_scale, height_scale)
+    if contact is None:
+        return end.copy()
+
+    t, point, normal = contact
+    remaining = (end - start) * (1.0 - t)
+    remaining -= normal * np.dot(remaining, normal)
+    result = point + remaining
+
+    # Ślizg po zakrzywionym terenie może lekko wejść pod powierzchnię
+    ground = sample_heights(heightmap, result[0], result[2], terrain_scale, height_scale)
+    result[1] = max(result[1], ground + clearance)
+    return result
+
+
+def resolve_bodies(heightmap, starts, ends, clearance, terrain_scale, height_scale):
+    # Wektorowa kolizja wielu ciał naraz: każdy odcinek próbkowany w tej
+    # samej liczbie punktów (gęściej niż pół komórki), pierwszy kontakt
+    # przez argmax po masce kolizji. Zwraca (nowe pozycje, maska trafień).
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    moves = ends - starts
+
+    longest = np.max(np.abs(moves[:, [0, 2]])) if len(moves) else 0.0
+    samples = int(np.ceil(longest / (terrain_scale * 0.5))) + 2
+    ts = np.linspace(0.0, 1.0, samples)
+
+    points = starts[:, np.newaxis, :] + moves[:, np.newaxis, :] * ts[np.newaxis, :, np.newaxis]
+    depth = sample_heights(heightmap, points[..., 0], points[..., 2], terrain_scale, height_scale) \
+        + clearance - points[..., 1]
+    below = depth > 0.0
+    hit = below.any(axis=1)
+    first = np.argmax(below, axis=1)
+
+    # Liniowe doprecyzowanie t między ostatnią wolną próbką a pierwszą kolizją
+    rows = np.arange(len(starts))
+    prev = np.maximum(first - 1, 0)
+    d_prev = depth[rows, prev]
+    d_hit = depth[rows, first]
+    denom = np.where(d_hit - d_prev > 0, d_hit - d_prev, 1.0)
+    frac = np.where(first > 0, np.clip(-d_prev / denom, 0.0, 1.0), 0.0)
+    t = np.where(hit, ts[prev] + (ts[first] - ts[prev]) * frac, 1.0)
+    contact = starts + moves * t[:, np.newaxis]
+
+    # Normalne w punktach kontaktu i rzut reszty ruchu na płaszczyznę styczną
+    d = terrain_scale * 0.5
+    cx, cz = contact[:, 0], contact[:, 2]
+    gx = (sample_heights(heightmap, cx + d, cz, terrain_scale, height_scale) -
+          sample_heights(heightmap, cx - d, cz, terrain_scale, height_scale)) / (2 * d)
+    gz = (sample_heights(heightmap, cx, cz + d, terrain_scale, height_scale) -
+          sample_heights(heightmap, cx, cz - d, terrain_scale, height_scale)) / (2 * d)
+    normals = np.stack((-gx, np.ones_like(gx), -gz), axis=1)
+    normals /= np.linalg.norm(normals, axis=1)[:, np.newaxis]
+
+    remaining = moves * (1.0 - t)[:, np.newaxis]
+    remaining -= normals * np.sum(remaining * normals, axis=1)[:, np.newaxis]
+    result = np.where(hit[:, np.newaxis], contact + remaining, ends)
+
+    ground = sample_heights(heightmap, result[:, 0], result[:, 2], terrain_scale, height_scale)
+    result[:, 1] = np.where(hit, np.maximum(result[:, 1], ground + clearance), result[:, 1])
+    return result, hit
+
+
+def benchmark(bodies=10000, size=129):
+    # Liczba ciał rozwiązywanych na sekundę przy szybkim locie nisko nad terenem
+    rng = np.random.default_rng(1)
+    heightmap = rng.random((size, size))
+    starts = np.column_stack((rng.uniform(0, 600, bodies), np.full(bodies, 40.0),
+                              rng.uniform(0, 600, bodies)))
+    ends = starts + rng.uniform(-50, 50, (bodies, 3))
+
+    start = time.perf_counter()
+    _, hit = resolve_bodies(heightmap, starts, ends, 5.0, 5.0, 30.0)
+    elapsed = time.perf_counter() - start
+    print(f"{bodies} ciał: {elapsed * 1000:.1f} ms ({bodies / elapsed:.0f} ciał/s, kolizje: {hit.sum()})")
+
+
+if __name__ == '__main__':
+    benchmark()
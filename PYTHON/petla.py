@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# Pętla programu z wejściem/wyjściem w puli wątków (zad5.0.py)
+#
+# Odczyty cache i zapisy plików idą do puli wątków (submit_io), a pętla
+# sprawdza w kolejnych klatkach, czy się zakończyły (Future.done()), więc
+# klatki nie czekają na dysk.
+#
+# Praca w wątku głównym rozkładana na klatki (bufory GPU, minimapa,
+# wypisywanie statystyk) to zadania jednego harmonogramu (harmonogram.py)
+# wykonywane w render() - jeden budżet i jedno szacowanie kosztów na
+# klatkę. Budżet jest przycinany do czasu pozostałego w okresie klatki
+# (frame_budget), mierzonego przed wyświetleniem (present) -
+# glfwSwapBuffers z glfwSwapInterval(1) czeka do końca okresu.
+#
+# Zegar jest parametrem, więc pętlę można uruchomić bez okna ze sztucznym
+# zegarem (fake_clock) i sprawdzić deterministycznie.
+#
+#   python petla.py   - 600 klatek bez okna ze sztucznym zegarem
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def make_loop(frame_period, clock=time.perf_counter, io_workers=1):
+    return {
+        'period': frame_period,
+        'clock': clock,
+        'executor': ThreadPoolExecutor(max_workers=io_workers),
+        'frame': 0,
+        'frame_start': clock(),
+        'stats': {'frames': 0, 'overruns': 0, 'io_done': 0},
+    }
+
+
+# WEJŚCIE/WYJŚCIE W PULI WĄTKÓW
+
+def submit_io(loop, function, *args):
+    # concurrent.futures.Future - wynik odbierany przez done() / result()
+    future = loop['executor'].submit(function, *args)
+    future.add_done_callback(lambda f: _io_done(loop))
+    return future
+
+
+def _io_done(loop):
+    loop['stats']['io_done'] += 1
+
+
+# PĘTLA
+
+def frame_budget(loop, budget):
+    # Czas na zadania w tej klatce: nie więcej niż budget i nie dłużej niż do
+    # końca okresu; <= 0, gdy klatka już przekroczyła okres
+    return min(budget, loop['frame_start'] + loop['period'] - loop['clock']())
+
+
+def run(loop, frame, present, poll, should_close):
+    # frame() rysuje klatkę (razem z zadaniami harmonogramu), present() ją
+    # wyświetla (glfwSwapBuffers), poll() odbiera zdarzenia okna
+    clock = loop['clock']
+    stats = loop['stats']
+    while not should_close():
+        loop['frame_start'] = clock()
+        frame()
+        if clock() - loop['frame_start'] > loop['period']:
+            stats['overruns'] += 1
+        present()
+        poll()
+        stats['frames'] += 1
+        loop['frame'] += 1
+
+
+def close(loop):
+    # Po pętli: oczekujące zapisy kończą się przed wyjściem
+    loop['executor'].shutdown(wait=True)
+
+
+# SZTUCZNY ZEGAR (testy bez okna)
+
+def fake_clock(start=0.0):
+    state = {'now': start}
+
+    def clock():
+        return state['now']
+
+    def advance(seconds):
+        state['now'] += seconds
+
+    return clock, advance
+
+
+def demo(frames=600, period=1.0 / 60.0, budget=0.004):
+    # Klatki o koszcie 8-18 ms (sztuczny zegar), co 10 klatek zadanie
+    # statystyk kosztujące 3 ms w harmonogramie i w tle zapis i odczyt
+    # pliku w puli wątków. present() czeka do końca okresu jak
+    # glfwSwapBuffers z synchronizacją.
+    import os
+    import random
+    import tempfile
+    import numpy as np
+    import harmonogram
+
+    clock, advance = fake_clock()
+    loop = make_loop(period, clock)
+    scheduler = harmonogram.make_scheduler(budget, clock)
+    rng = random.Random(5)
+    frame_costs = []
+    state = {'frame': 0, 'io_frames': 0}
+    path = os.path.join(tempfile.mkdtemp(), 'kafelek.npy')
+    tile = np.random.default_rng(1).random((1025, 1025))
+    io = {'save': submit_io(loop, np.save, path, tile), 'load': None}
+
+    def frame():
+        cost = 0.018 if rng.random() < 0.1 else rng.uniform(0.008, 0.012)
+        advance(cost)
+        frame_costs.append(cost)
+        if state['frame'] % 10 == 0:
+            harmonogram.submit(scheduler, 'statystyki', 2, lambda: advance(0.003))
+        harmonogram.run(scheduler, frame_budget(loop, budget))
+        state['frame'] += 1
+
+    def present():
+        advance(max(0.0, loop['frame_start'] + period - clock()))
+        time.sleep(0.0005)  # procesor wolny dla wątku zapisu
+
+    def poll():
+        # Zapis i ponowny odczyt kafelka 1025x1025 bez zatrzymywania klatek
+        if io['load'] is None and io['save'].done():
+            io['save'].result()
+            io['load'] = submit_io(loop, np.load, path)
+        elif io['load'] is not None and io['load'].done() and not state['io_frames']:
+            assert np.array_equal(io['load'].result(), tile)
+            state['io_frames'] = state['frame']
+
+    run(loop, frame, present, poll, lambda: state['frame'] >= frames)
+    close(loop)
+    os.unlink(path)
+    os.rmdir(os.path.dirname(path))
+
+    stats = loop['stats']
+    # Przekroczenia spowodowane zadaniami (sama klatka mieściła się w okresie)
+    own_overruns = sum(1 for c in frame_costs if c > period)
+    print("{} klatek po {:.1f} ms (sztuczny zegar):".format(stats['frames'], period * 1000.0))
+    print("  klatki ponad okres: {} (same klatki: {}), przez zadania: {}".format(
+        stats['overruns'], own_overruns, stats['overruns'] - own_overruns))
+    harmonogram.print_metrics(scheduler)
+    print("  wejście/wyjście w tle: {} zadań, klatki w trakcie: {}".format(stats['io_done'], state['io_frames']))
+    assert state['io_frames'] > 0
+    return stats['overruns'] - own_overruns, harmonogram.metrics(scheduler)['depth']
+
+
+if __name__ == '__main__':
+    overruns, depth = demo()
+    assert overruns == 0 and depth == 0
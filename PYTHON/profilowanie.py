@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# Profilowanie pamięci i alokacji w pętli klatek (zad5.0.py --profile)
+#
+# Klatka jest dzielona na etapy znacznikami mark(); dla każdego etapu
+# zapisywany jest czas, szczyt pamięci zaalokowanej chwilowo w etapie
+# (tracemalloc, obejmuje też bufory NumPy) i czas pauz odśmiecacza
+# (gc.callbacks). Z profiler = None wszystkie funkcje od razu wracają,
+# więc wywołania mogą zostać w render() na stałe.
+#
+#   python profilowanie.py [BUDŻET_KB]   - klatki bez okna (kolizja, odrzucanie,
+#                                          zakresy rysowania); kod wyjścia 1 po
+#                                          przekroczeniu budżetu alokacji
+import gc
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+WARMUP_FRAMES = 30  # klatki pomijane w statystykach (cache, pierwsze alokacje)
+ALLOC_BUDGET = 1024 * 1024  # bajtów chwilowych alokacji na klatkę w stanie ustalonym
+
+
+def make_profiler(warmup=WARMUP_FRAMES):
+    profiler = {
+        'warmup': warmup,
+        'stages': {},  # nazwa etapu -> lista (czas, alokacje, pauzy gc)
+        'frames': [],  # (czas, alokacje, zmiana pamięci, zmiana bloków, pauzy gc, liczba gc)
+        'stage': None,
+        'stage_start': 0.0,
+        'stage_memory': 0,
+        'stage_gc': 0.0,
+        'frame': None,
+        'gc_start': None,
+        'callback': None,
+    }
+
+    def on_gc(phase, info):
+        if phase == 'start':
+            profiler['gc_start'] = time.perf_counter()
+        elif profiler['gc_start'] is not None:
+            pause = time.perf_counter() - profiler['gc_start']
+            profiler['gc_start'] = None
+            profiler['stage_gc'] += pause
+            if profiler['frame'] is not None:
+                profiler['frame']['gc_count'] += 1
+
+    profiler['callback'] = on_gc
+    return profiler
+
+
+def start(profiler):
+    if profiler is None:
+        return
+    tracemalloc.start()
+    gc.callbacks.append(profiler['callback'])
+
+
+def stop(profiler):
+    if profiler is None:
+        return
+    if profiler['callback'] in gc.callbacks:
+        gc.callbacks.remove(profiler['callback'])
+    profiler['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+
+def begin_frame(profiler, stage):
+    if profiler is None:
+        return
+    profiler['frame'] = {
+        'start': time.perf_counter(),
+        'memory': tracemalloc.get_traced_memory()[0],
+        'blocks': sys.getallocatedblocks(),
+        'alloc': 0,
+        'gc': 0.0,
+        'gc_count': 0,
+    }
+    _open_stage(profiler, stage)
+
+
+def mark(profiler, stage):
+    # Zamyka bieżący etap i otwiera następny
+    if profiler is None or profiler['frame'] is None:
+        return
+    _close_stage(profiler)
+    _open_stage(profiler, stage)
+
+
+def end_frame(profiler):
+    if profiler is None or profiler['frame'] is None:
+        return
+    _close_stage(profiler)
+    frame = profiler['frame']
+    profiler['frame'] = None
+    profiler['frames'].append((
+        time.perf_counter() - frame['start'],
+        frame['alloc'],
+        tracemalloc.get_traced_memory()[0] - frame['memory'],
+        sys.getallocatedblocks() - frame['blocks'],
+        frame['gc'],
+        frame['gc_count'],
+    ))
+
+
+def _open_stage(profiler, stage):
+    profiler['stage'] = stage
+    profiler['stage_gc'] = 0.0
+    tracemalloc.reset_peak()
+    profiler['stage_memory'] = tracemalloc.get_traced_memory()[0]
+    profiler['stage_start'] = time.perf_counter()
+
+
+def _close_stage(profiler):
+    elapsed = time.perf_counter() - profiler['stage_start']
+    alloc = tracemalloc.get_traced_memory()[1] - profiler['stage_memory']
+    profiler['frame']['alloc'] += alloc
+    profiler['frame']['gc'] += profiler['stage_gc']
+    profiler['stages'].setdefault(profiler['stage'], []).append((elapsed, alloc, profiler['stage_gc']))
+
+
+def steady_frames(profiler):
+    return profiler['frames'][profiler['warmup']:]
+
+
+def report(profiler):
+    frames = steady_frames(profiler)
+    if not frames:
+        print("Profil: za mało klatek (rozgrzewka {})".format(profiler['warmup']))
+        return
+
+    times, allocs, memory, blocks, gc_pauses, gc_counts = (np.array(c, dtype=float) for c in zip(*frames))
+    print("Profil {} klatek (po {} klatkach rozgrzewki):".format(len(frames), profiler['warmup']))
+    print("  klatka: {:.2f} ms, alokacje chwilowe {:.1f} kB (maks. {:.1f} kB), przyrost pamięci {:+.1f} kB,"
+          " bloki {:+.1f}".format(times.mean() * 1000.0, allocs.mean() / 1024, allocs.max() / 1024,
+                                  memory.mean() / 1024, blocks.mean()))
+    print("  odśmiecanie: {} przebiegów, pauzy razem {:.2f} ms".format(int(gc_counts.sum()), gc_pauses.sum() * 1000.0))
+    if 'peak_memory' in profiler:
+        print("  szczyt pamięci śledzonej: {:.1f} MB".format(profiler['peak_memory'] / 2 ** 20))
+
+    for stage, samples in profiler['stages'].items():
+        stage_times, stage_allocs, stage_gc = (np.array(c) for c in zip(*samples[profiler['warmup']:]))
+        print("  {:10s} {:7.3f} ms  {:8.1f} kB  gc {:6.3f} ms".format(
+            stage, stage_times.mean() * 1000.0, stage_allocs.mean() / 1024, stage_gc.sum() * 1000.0))
+
+
+def check_budget(profiler, budget=ALLOC_BUDGET):
+    # Mediana chwilowych alokacji na klatkę w stanie ustalonym; (czy w budżecie, mediana)
+    frames = steady_frames(profiler)
+    if not frames:
+        return True, 0.0
+    median = float(np.median([alloc for _, alloc, _, _, _, _ in frames]))
+    return median <= budget, median
+
+
+def benchmark(frames=300, budget=ALLOC_BUDGET):
+    # Część klatki zad5.0 bez OpenGL: ruch z kolizją, odrzucanie zasłoniętych
+    # kawałków i wyznaczanie wywołań glDrawElements
+    import teren
+    import kolizja
+    import kamera
+    import siatka
+    import widocznosc
+
+    size, chunk, terrain_scale, height_scale = 129, 8, 5.0, 30.0
+    heightmap = teren.diamond_square_iterative(size, 3, dtype=np.float64)
+    level = widocznosc.minmax_pyramid(heightmap, chunk)[0]
+    camera = np.array([100.0, 40.0, 100.0])
+    orientation = kamera.fly_orientation(30.0, -5.0)
+
+    profiler = make_profiler()
+    start(profiler)
+    for _ in range(frames):
+        begin_frame(profiler, 'kamera')
+        orientation = kamera.fly_turn(orientation, 0.5, 0.0)
+        forward = kamera.fly_forward(orientation)
+        old = camera.copy()
+        camera = kolizja.slide(heightmap, old, camera + forward * 5.0, 5.0, terrain_scale, height_scale)
+        camera[0] %= (size - 1) * terrain_scale
+        camera[2] %= (size - 1) * terrain_scale
+
+        mark(profiler, 'odrzucanie')
+        window = (widocznosc.chunk_window(camera[0], 600.0, chunk, terrain_scale, 0, level.shape[0])
+                  + widocznosc.chunk_window(camera[2], 600.0, chunk, terrain_scale, 0, level.shape[0]))
+        visible = widocznosc.horizon_cull(heightmap, level, camera, chunk, terrain_scale, height_scale,
+                                          window=window)
+
+        mark(profiler, 'zakresy')
+        mask = widocznosc.tile_visibility(visible, window, 0, 0, level.shape[0])
+        siatka.chunk_draw_calls(mask, chunk, widocznosc.MERGE_GAP)
+        end_frame(profiler)
+    stop(profiler)
+
+    report(profiler)
+    ok, median = check_budget(profiler, budget)
+    print("Budżet alokacji {:.0f} kB/klatkę: mediana {:.1f} kB - {}".format(
+        budget / 1024, median / 1024, "OK" if ok else "PRZEKROCZONY"))
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if benchmark(budget=int(sys.argv[1]) * 1024 if len(sys.argv) > 1 else ALLOC_BUDGET) else 1)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# Testy regresji próbkowania terenu i ograniczeń lotu kamery (zad5.0.py)
+#
+# Wyrocznią są funkcje samego zad5.0.py: get_height (zawijanie),
+# get_interpolated_height (interpolacja biliniowa) i render() (kolizja,
+# zawijanie kafelków, ograniczenie pułapu między MIN_FLIGHT_ALTITUDE
+# a MAX_FLIGHT_ALTITUDE). Szybsze silniki (wektorowe, z cache) muszą dawać
+# te same wyniki - check_engine porównuje dowolną funkcję próbkującą
+# z wyrocznią.
+#
+# Sprawdzenia na przypadkach losowych z ustalonym ziarnem: przy każdym
+# uruchomieniu ten sam zestaw kilku tysięcy punktów (to nie testy własności
+# w stylu hypothesis - nie ma szukania ani zawężania kontrprzykładów).
+# Dane wzorcowe (regresja.json) przypinają wysokości w wybranych punktach
+# i trajektorię przelotu ze skryptowanym sterowaniem. Moduły glfw i OpenGL
+# są zastępowane pustymi tylko na czas wczytania zad5.0.py (potem
+# sys.modules jest przywracane), więc okno ani kontekst nie są potrzebne.
+#
+#   python regresja.py            - wszystkie sprawdzenia; kod wyjścia 1 przy błędzie
+#   python regresja.py --update   - zapisanie nowych danych wzorcowych
+import os
+import re
+import sys
+import json
+import types
+import numpy as np
+
+import uruchom
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regresja.json')
+GOLDEN_SEED = 7
+GOLDEN_FRAMES = 300
+HEIGHT_TOLERANCE = 1e-9  # dopuszczalna różnica wysokości (inna kolejność działań)
+FLIGHT_TOLERANCE = 1e-6  # dopuszczalna różnica pozycji po całym przelocie
+SEEDED_CASES = 2000
+STUB_MODULES = ['glfw', 'glfw.GLFW', 'OpenGL.GL', 'OpenGL.GLU', 'OpenGL.arrays']
+STUB_RETURNS = {  # wartości zwracane przez puste funkcje, gdy kod z nich korzysta
+    'glfwGetCursorPos': (0.0, 0.0),
+    'glfwGetFramebufferSize': (800, 600),
+    'glfwGetCurrentContext': None,
+    'glfwWindowShouldClose': False,
+}
+
+
+# ZASTĘPCZE GLFW I OPENGL
+
+class StubVBO:
+    # Zastępuje OpenGL.arrays.vbo.VBO: trzyma tablicę, niczego nie przesyła
+    def __init__(self, data, *args, **kwargs):
+        self.data = data
+
+    def __add__(self, offset):
+        return self
+
+    def bind(self):
+        pass
+
+    def unbind(self):
+        pass
+
+    def delete(self):
+        pass
+
+
+def stub_module(name, names):
+    # Moduł z pustymi funkcjami i stałymi (różne liczby całkowite) dla
+    # wszystkich nazw gl*/glfw*/GL_* użytych w źródle
+    module = types.ModuleType(name)
+    for k, attr in enumerate(sorted(names)):
+        if attr.startswith(('GL_', 'GLU_', 'GLFW_')):
+            setattr(module, attr, k + 1)
+        else:
+            result = STUB_RETURNS.get(attr, 1)
+            setattr(module, attr, lambda *args, _result=result, **kwargs: _result)
+    module.__all__ = sorted(names)
+    return module
+
+
+def load_viewer(argv):
+    # zad5.0.py z zastępczymi glfw i OpenGL oraz argumentami wiersza poleceń
+    path = os.path.join(uruchom.SCRIPT_DIR, uruchom.VIEWER)
+    with open(path, encoding='utf-8') as f:
+        names = set(re.findall(r'\b((?:gl|glu|glfw|GL_|GLU_|GLFW_)\w*)', f.read()))
+    # Zastępcze moduły są potrzebne tylko przy imporcie (zad5.0.py wiąże
+    # nazwy przez from ... import *); potem sys.modules wraca do stanu
+    # sprzed wczytania, żeby kolejne importy dostały prawdziwe moduły
+    replaced = STUB_MODULES + ['OpenGL', 'OpenGL.arrays.vbo', 'tryb_gl', uruchom.module_name(uruchom.VIEWER)]
+    saved = {name: sys.modules.get(name) for name in replaced}
+    try:
+        try:
+            import OpenGL
+        except ImportError:
+            sys.modules['OpenGL'] = types.ModuleType('OpenGL')
+        import tryb_gl  # przed zastępczym OpenGL.GL, jak w zad5.0.py
+        for name in STUB_MODULES:
+            sys.modules[name] = stub_module(name, names)
+        vbo_module = types.ModuleType('OpenGL.arrays.vbo')
+        vbo_module.VBO = StubVBO
+        sys.modules['OpenGL.arrays.vbo'] = vbo_module
+        sys.modules['OpenGL.arrays'].vbo = vbo_module
+
+        viewer = uruchom.load_script(uruchom.VIEWER)
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+    saved_argv = sys.argv
+    sys.argv = [uruchom.VIEWER] + argv
+    try:
+        args = viewer.parse_args()
+    finally:
+        sys.argv = saved_argv
+
+    viewer.update_viewport(None, 800, 600)
+    viewer.startup(args)
+    while viewer.terrain_version == 0:
+        viewer.render(0.0)
+    return viewer
+
+
+def world_size(viewer):
+    return (viewer.MAP_SIZE - 1) * viewer.TERRAIN_SCALE
+
+
+def random_points(viewer, count, seed):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0.0, world_size(viewer), size=(count, 2))
+
+
+# SPRAWDZENIA NA PRZYPADKACH LOSOWYCH Z USTALONYM ZIARNEM
+
+def check_wrap(viewer):
+    # get_height(x + k * okres, y + m * okres) == get_height(x, y) dla
+    # dowolnych całkowitych (także ujemnych); krawędź mapy to kopia początku
+    period = viewer.MAP_SIZE - 1
+    rng = np.random.default_rng(11)
+    worst = 0.0
+    for x, y in rng.integers(-3 * period, 3 * period, size=(SEEDED_CASES, 2)):
+        x, y = int(x), int(y)
+        reference = viewer.HEIGHTMAP[x % period][y % period]
+        worst = max(worst, abs(viewer.get_height(x, y) - reference))
+    heightmap = np.asarray(viewer.HEIGHTMAP)
+    border = max(np.abs(heightmap[period] - heightmap[0]).max(), np.abs(heightmap[:, period] - heightmap[:, 0]).max())
+    return max(worst, border)
+
+
+def check_grid_nodes(viewer):
+    # W węzłach siatki interpolacja daje dokładnie wysokość węzła
+    period = viewer.MAP_SIZE - 1
+    ts, hs = viewer.TERRAIN_SCALE, viewer.HEIGHT_SCALE
+    worst = 0.0
+    for i in range(0, period, 3):
+        for j in range(0, period, 5):
+            worst = max(worst, abs(viewer.get_interpolated_height(i * ts, j * ts) - viewer.get_height(i, j) * hs))
+    return worst
+
+
+def check_bounds(viewer):
+    # Wynik leży między najniższym a najwyższym z czterech rogów komórki;
+    # zwraca największe wyjście poza ten przedział
+    ts, hs = viewer.TERRAIN_SCALE, viewer.HEIGHT_SCALE
+    worst = 0.0
+    for x, z in random_points(viewer, SEEDED_CASES, 12):
+        i, j = int(x / ts), int(z / ts)
+        corners = [viewer.get_height(i + a, j + b) * hs for a in (0, 1) for b in (0, 1)]
+        h = viewer.get_interpolated_height(x, z)
+        worst = max(worst, min(corners) - h, h - max(corners))
+    return max(worst, 0.0)
+
+
+def check_continuity(viewer, eps=1e-7):
+    # Granice jednostronne na krawędziach komórek są równe, a szew kafelka
+    # (x = rozmiar świata) łączy się z początkiem: |h(a) - h(b)| <= L * |a - b|
+    ts, hs = viewer.TERRAIN_SCALE, viewer.HEIGHT_SCALE
+    period = viewer.MAP_SIZE - 1
+    heightmap = np.asarray(viewer.HEIGHTMAP, dtype=np.float64)[:period + 1, :period + 1]
+    slope = max(np.abs(np.diff(heightmap, axis=0)).max(), np.abs(np.diff(heightmap, axis=1)).max()) * hs / ts
+    size = world_size(viewer)
+    rng = np.random.default_rng(13)
+    worst = 0.0
+
+    for _ in range(SEEDED_CASES // 4):
+        i = int(rng.integers(1, period))
+        z = float(rng.uniform(0.0, size))
+        edge = i * ts
+        jump_x = abs(viewer.get_interpolated_height(edge - eps, z) - viewer.get_interpolated_height(edge + eps, z))
+        jump_z = abs(viewer.get_interpolated_height(z, edge - eps) - viewer.get_interpolated_height(z, edge + eps))
+        worst = max(worst, jump_x - 2 * eps * slope, jump_z - 2 * eps * slope)
+
+        # Szew kafelka i zawijanie całego kafelka dalej
+        seam = abs(viewer.get_interpolated_height(size - eps, z) - viewer.get_interpolated_height(0.0, z))
+        shifted = abs(viewer.get_interpolated_height(z + size, edge) - viewer.get_interpolated_height(z, edge))
+        worst = max(worst, seam - eps * slope, shifted - HEIGHT_TOLERANCE)
+    return max(worst, 0.0)
+
+
+def check_engine(viewer, sample, count=SEEDED_CASES * 2, seed=14):
+    # Dowolny silnik sample(heightmap, xs, zs, terrain_scale, height_scale)
+    # w porównaniu z get_interpolated_height; największa różnica
+    points = random_points(viewer, count, seed)
+    expected = np.array([viewer.get_interpolated_height(x, z) for x, z in points])
+    heights = sample(np.asarray(viewer.HEIGHTMAP), points[:, 0], points[:, 1],
+                     viewer.TERRAIN_SCALE, viewer.HEIGHT_SCALE)
+    return float(np.abs(np.asarray(heights) - expected).max())
+
+
+def check_clamp(viewer):
+    # Kamera bez ruchu: render() zostawia X/Z, a wysokość przycina do
+    # [teren + MIN_FLIGHT_ALTITUDE, teren + MAX_FLIGHT_ALTITUDE]
+    rng = np.random.default_rng(15)
+    viewer.keys.clear()
+    worst = 0.0
+    for x, z in random_points(viewer, SEEDED_CASES // 4, 16):
+        ground = viewer.get_interpolated_height(x, z)
+        y = ground + float(rng.uniform(-60.0, viewer.MAX_FLIGHT_ALTITUDE + 60.0))
+        viewer.camera_pos = np.array([x, y, z])
+        viewer.delta_x = viewer.delta_y = 0
+        viewer.render(0.0)
+
+        expected = min(max(y, ground + viewer.MIN_FLIGHT_ALTITUDE), ground + viewer.MAX_FLIGHT_ALTITUDE)
+        worst = max(worst, abs(viewer.camera_pos[1] - expected),
+                    abs(viewer.camera_pos[0] - x), abs(viewer.camera_pos[2] - z))
+    return worst
+
+
+# PRZELOT WZORCOWY
+
+def scripted_flight(viewer, frames=GOLDEN_FRAMES):
+    # Stałe sterowanie: lot do przodu, skręty myszą, zniżanie pod ziemię
+    # i wznoszenie ponad sufit. Zwraca (próbki co 10 klatek, największe
+    # naruszenie ograniczeń pułapu i kafelka w trakcie lotu).
+    viewer.camera_pos = np.array([viewer.MAP_SIZE * viewer.TERRAIN_SCALE / 2, 50.0,
+                                  viewer.MAP_SIZE * viewer.TERRAIN_SCALE / 2])
+    viewer.camera_orientation = viewer.kamera.fly_orientation(0.0, 0.0)
+    viewer.world_origin['tile'][:] = 0
+    viewer.keys.clear()
+    viewer.keys[viewer.GLFW_KEY_W] = True
+    size = world_size(viewer)
+    samples = []
+    violation = 0.0
+
+    for frame in range(frames):
+        phase = frame // 50
+        viewer.keys[viewer.GLFW_KEY_LEFT_SHIFT] = phase % 3 == 1
+        viewer.keys[viewer.GLFW_KEY_SPACE] = phase % 3 == 2
+        viewer.delta_x = 4 if phase % 2 else -2
+        viewer.delta_y = 1 if frame % 7 == 0 else 0
+        viewer.render(frame / 60.0)
+
+        x, y, z = viewer.camera_pos
+        ground = viewer.get_interpolated_height(x, z)
+        violation = max(violation, ground + viewer.MIN_FLIGHT_ALTITUDE - y, y - ground - viewer.MAX_FLIGHT_ALTITUDE,
+                        -x, x - size, -z, z - size)
+        if frame % 10 == 9:
+            world_x, world_z = viewer.swiat.world_position(viewer.world_origin, viewer.camera_pos)
+            samples.append([frame + 1, world_x, float(y), world_z])
+    viewer.keys.clear()
+    return samples, max(violation, 0.0)
+
+
+def golden_heights(viewer):
+    points = random_points(viewer, 64, 17)
+    return [[float(x), float(z), float(viewer.get_interpolated_height(x, z))] for x, z in points]
+
+
+def write_golden(viewer):
+    samples, _ = scripted_flight(viewer)
+    data = {
+        'seed': GOLDEN_SEED,
+        'generator': viewer.TERRAIN_GENERATOR,
+        'heights': golden_heights(viewer),
+        'flight': samples,
+    }
+    with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    print("Zapisano dane wzorcowe:", GOLDEN_PATH)
+
+
+def check_golden(viewer):
+    # Zwraca (różnica wysokości, różnica pozycji przelotu, naruszenie ograniczeń)
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        data = json.load(f)
+    heights = max(abs(viewer.get_interpolated_height(x, z) - h) for x, z, h in data['heights'])
+    samples, violation = scripted_flight(viewer)
+    if len(samples) != len(data['flight']):
+        return heights, float('inf'), violation
+    flight = max(abs(a - b) for got, expected in zip(samples, data['flight']) for a, b in zip(got, expected))
+    return heights, flight, violation
+
+
+def run_checks():
+    failures = 0
+
+    def report(name, value, tolerance):
+        nonlocal failures
+        ok = value <= tolerance
+        failures += not ok
+        print("  {:42s} {:9.2e}  {}".format(name, value, "OK" if ok else "BŁĄD"))
+
+    viewer = load_viewer(['--seed', str(GOLDEN_SEED), '--no-cache'])
+    print("Dane wzorcowe (ziarno {}, {} klatek przelotu):".format(GOLDEN_SEED, GOLDEN_FRAMES))
+    heights, flight, violation = check_golden(viewer)
+    report("wysokości w punktach wzorcowych", heights, HEIGHT_TOLERANCE)
+    report("trajektoria przelotu", flight, FLIGHT_TOLERANCE)
+    report("pułap i kafelek w trakcie przelotu", violation, HEIGHT_TOLERANCE)
+    viewer.shutdown()
+
+    import kolizja
+    for generator in ('diamond_square', 'perlin'):
+        viewer = load_viewer(['--seed', '3', '--no-cache', '--generator', generator])
+        print("Przypadki losowe z ustalonym ziarnem ({}, {} przypadków):".format(generator, SEEDED_CASES))
+        report("get_height: zawijanie i krawędź mapy", check_wrap(viewer), 0.0)
+        report("interpolacja w węzłach siatki", check_grid_nodes(viewer), HEIGHT_TOLERANCE)
+        report("interpolacja w przedziale rogów komórki", check_bounds(viewer), HEIGHT_TOLERANCE)
+        report("ciągłość na krawędziach komórek i kafelka", check_continuity(viewer), HEIGHT_TOLERANCE)
+        report("ograniczenie pułapu w render()", check_clamp(viewer), HEIGHT_TOLERANCE)
+        report("kolizja.sample_heights zgodne z wyrocznią", check_engine(viewer, kolizja.sample_heights),
+               HEIGHT_TOLERANCE)
+        viewer.shutdown()
+
+    print("Błędy:", failures)
+    return failures == 0
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--update']:
+        write_golden(load_viewer(['--seed', str(GOLDEN_SEED), '--no-cache']))
+    else:
+        sys.exit(0 if run_checks() else 1)
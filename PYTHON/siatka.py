@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+# Budowanie siatek terenu z mapy wysokości dla zad5.0.py
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import teren
+
+
+# SIATKA NIEREGULARNA (TIN) Z OGRANICZENIEM BŁĘDU PIONOWEGO
+#
+# Hierarchia trójkątów prostokątnych (jak w RTIN / "Martini"): każdy trójkąt
+# dzieli się w środku przeciwprostokątnej na dwa mniejsze. Błąd trójkąta to
+# odchyłka wysokości w środku przeciwprostokątnej od średniej z jej końców,
+# powiększona o błędy dzieci - dzięki temu wynik nie ma pęknięć (T-junctions).
+# Błąd jest mierzony w środkach przeciwprostokątnych, więc ograniczenie jest
+# przybliżone: węzły wewnątrz dużych trójkątów mogą je przekroczyć -
+# tin_max_error mierzy rzeczywisty błąd we wszystkich węzłach siatki.
+
+def _triangle_levels(size):
+    # Kolejne poziomy podziału: tablice (n, 6) z narożnikami a, b, c (x, z);
+    # ab to przeciwprostokątna. Poziomy kończą się, gdy środek ab nie leży w siatce.
+    tile = size - 1
+    level = np.array([[0, 0, tile, tile, tile, 0],
+                      [tile, tile, 0, 0, 0, tile]], dtype=np.int64)
+    levels = []
+    while True:
+        ax, az, bx, bz, cx, cz = level.T
+        if np.any((ax + bx) % 2) or np.any((az + bz) % 2):
+            break
+        levels.append(level)
+        mx = (ax + bx) // 2
+        mz = (az + bz) // 2
+        left = np.stack((cx, cz, ax, az, mx, mz), axis=1)
+        right = np.stack((bx, bz, cx, cz, mx, mz), axis=1)
+        level = np.concatenate((left, right))
+    return levels
+
+
+def _midpoint_index(level, size):
+    return ((level[:, 1] + level[:, 3]) // 2) * size + (level[:, 0] + level[:, 2]) // 2
+
+
+def triangle_errors(heightmap, height_scale=1.0):
+    # Błąd każdego węzła siatki (jako środka przeciwprostokątnej) w jednostkach świata
+    size = heightmap.shape[0]
+    if size < 3 or (size - 1) & (size - 2):
+        raise ValueError("Siatka TIN wymaga mapy o rozmiarze 2^n + 1")
+
+    # heightmap[x][z] -> indeks liniowy z * size + x
+    heights = np.ascontiguousarray(heightmap.T, dtype=np.float64).ravel() * height_scale
+    errors = np.zeros(size * size)
+    levels = _triangle_levels(size)
+
+    for depth in range(len(levels) - 1, -1, -1):
+        level = levels[depth]
+        ax, az, bx, bz, cx, cz = level.T
+        mid = _midpoint_index(level, size)
+        err = np.abs((heights[az * size + ax] + heights[bz * size + bx]) * 0.5 - heights[mid])
+        np.maximum.at(errors, mid, err)
+
+        if depth < len(levels) - 1:
+            left_child = ((az + cz) // 2) * size + (ax + cx) // 2
+            right_child = ((bz + cz) // 2) * size + (bx + cx) // 2
+            np.maximum.at(errors, mid, errors[left_child])
+            np.maximum.at(errors, mid, errors[right_child])
+
+    return errors, levels
+
+
+def build_tin(heightmap, max_error, height_scale=1.0, errors=None):
+    # Zwraca (grid, indices): grid - uint16 (n, 2) współrzędne (i, j) węzłów
+    # siatki, indices - (m, 3) trójkąty (uint16 gdy wierzchołków < 65536)
+    size = heightmap.shape[0]
+    if errors is None:
+        errors, levels = triangle_errors(heightmap, height_scale)
+    else:
+        levels = _triangle_levels(size)
+
+    active = levels[0]
+    emitted = []
+    for depth in range(len(levels)):
+        split = errors[_midpoint_index(active, size)] > max_error
+        emitted.append(active[~split])
+
+        parents = active[split]
+        if len(parents) == 0:
+            break
+        ax, az, bx, bz, cx, cz = parents.T
+        mx = (ax + bx) // 2
+        mz = (az + bz) // 2
+        active = np.concatenate((np.stack((cx, cz, ax, az, mx, mz), axis=1),
+                                 np.stack((bx, bz, cx, cz, mx, mz), axis=1)))
+        if depth == len(levels) - 1:
+            # Dzieci ostatniego poziomu to trójkąty jednostkowe - środki ich
+            # przeciwprostokątnych nie leżą w siatce, więc nie dzielą się dalej
+            emitted.append(active)
+
+    triangles = np.concatenate(emitted)
+    corners = triangles.reshape(-1, 2)
+    linear = corners[:, 0] * size + corners[:, 1]
+    unique, inverse = np.unique(linear, return_inverse=True)
+
+    grid = np.stack((unique // size, unique % size), axis=1).astype(np.uint16)
+    index_type = np.uint16 if len(unique) < 65536 else np.uint32
+    indices = inverse.reshape(-1, 3).astype(index_type)
+    return grid, indices
+
+
+def tin_max_error(heightmap, grid, indices, height_scale=1.0):
+    # Największa różnica pionowa między siatką TIN a mapą we wszystkich
+    # węzłach siatki (interpolacja liniowa w trójkącie zawierającym węzeł).
+    # Trójkąty grupowane po rozmiarze: dla każdej grupy węzły prostokąta
+    # otaczającego i współrzędne barycentryczne naraz.
+    heights = np.asarray(heightmap, dtype=np.float64) * height_scale
+    corners = grid[indices.astype(np.intp)].astype(np.int64)  # (m, 3, 2): (x, z)
+    low = corners.min(axis=1)
+    extent = (corners.max(axis=1) - low).max(axis=1)
+    worst = 0.0
+
+    for s in np.unique(extent):
+        group = extent == s
+        a, b, c = corners[group, 0], corners[group, 1], corners[group, 2]
+        offsets = np.stack(np.meshgrid(np.arange(s + 1), np.arange(s + 1), indexing='ij'), axis=-1).reshape(-1, 2)
+        # Kwadrat s x s wystaje poza mapę dla trójkątów z przeciwprostokątną
+        # na krawędzi - przycięte węzły to inne węzły mapy, sprawdzane tak samo
+        p = np.minimum(low[group][:, np.newaxis, :] + offsets[np.newaxis], np.array(heights.shape) - 1)
+
+        e0 = (b - a)[:, np.newaxis, :]
+        e1 = (c - a)[:, np.newaxis, :]
+        d = p - a[:, np.newaxis, :]
+        den = e0[..., 0] * e1[..., 1] - e1[..., 0] * e0[..., 1]
+        l1 = (d[..., 0] * e1[..., 1] - e1[..., 0] * d[..., 1]) / den
+        l2 = (e0[..., 0] * d[..., 1] - d[..., 0] * e0[..., 1]) / den
+        l0 = 1.0 - l1 - l2
+        inside = (l0 >= -1e-9) & (l1 >= -1e-9) & (l2 >= -1e-9)
+
+        surface = (l0 * heights[a[:, 0], a[:, 1]][:, np.newaxis]
+                   + l1 * heights[b[:, 0], b[:, 1]][:, np.newaxis]
+                   + l2 * heights[c[:, 0], c[:, 1]][:, np.newaxis])
+        error = np.abs(surface - heights[p[..., 0], p[..., 1]])[inside]
+        worst = max(worst, float(error.max()))
+    return worst
+
+
+def tin_vertices(heightmap, grid, terrain_scale, height_scale):
+    # Pozycje float32 (n, 3) wierzchołków TIN, jak w draw_terrain
+    i = grid[:, 0].astype(np.intp)
+    j = grid[:, 1].astype(np.intp)
+    return np.stack((i * terrain_scale, heightmap[i, j] * height_scale, j * terrain_scale),
+                    axis=1).astype(np.float32)
+
+
+def save_mesh(path, grid, indices):
+    # Kompaktowy zapis siatki na dysk (np.savez, bez kompresji - szybkie wczytanie)
+    np.savez(path, grid=grid, indices=indices)
+
+
+def load_mesh(path):
+    with np.load(path) as data:
+        return data['grid'], data['indices']
+
+
+# BUFORY INDEKSÓW DLA REGULARNEJ SIATKI I OPTYMALIZACJA POD CACHE WIERZCHOŁKÓW
+#
+# Wierzchołek (i, j) siatki ma indeks i * cols + j.
+
+def grid_strip_indices(rows, cols):
+    # Jeden pasek GL_TRIANGLE_STRIP dla całej siatki: wiersze jak w draw_terrain,
+    # połączone dwoma zdegenerowanymi indeksami (powtórzony koniec i początek)
+    i = np.arange(rows - 1)[:, np.newaxis]
+    j = np.arange(cols)[np.newaxis, :]
+    pairs = np.empty((rows - 1, cols, 2), dtype=np.uint32)
+    pairs[:, :, 0] = i * cols + j
+    pairs[:, :, 1] = (i + 1) * cols + j
+    return _join_strips(pairs.reshape(rows - 1, 2 * cols))
+
+
+def chunk_strip_indices(rows, cols, chunk):
+    # Ten sam pasek, ale ułożony kawałkami chunk x chunk komórek (kawałki
+    # wierszami, jak poziom 0 piramidy min/max): ciąg kolejnych kawałków,
+    # także przez koniec wiersza kawałków, to jeden spójny fragment paska
+    ci = np.arange((rows - 1) // chunk)[:, np.newaxis, np.newaxis, np.newaxis]
+    cj = np.arange((cols - 1) // chunk)[np.newaxis, :, np.newaxis, np.newaxis]
+    i = ci * chunk + np.arange(chunk)[:, np.newaxis]
+    j = cj * chunk + np.arange(chunk + 1)
+    pairs = np.empty(np.broadcast(i, j).shape + (2,), dtype=np.uint32)
+    pairs[..., 0] = i * cols + j
+    pairs[..., 1] = (i + 1) * cols + j
+    return _join_strips(pairs.reshape(-1, 2 * (chunk + 1)))
+
+
+def _join_strips(row_strips):
+    # Paski wierszy połączone dwoma zdegenerowanymi indeksami (powtórzony
+    # koniec i początek); każdy wiersz zaczyna się od parzystego indeksu
+    strip = np.empty((row_strips.shape[0], row_strips.shape[1] + 2), dtype=np.uint32)
+    strip[:, 1:-1] = row_strips
+    strip[:, 0] = row_strips[:, 0]
+    strip[:, -1] = row_strips[:, -1]
+    # Pierwszy i ostatni indeks całości nie są potrzebne do łączenia
+    return strip.ravel()[1:-1]
+
+
+def strip_row_range(row, cols):
+    # Zakres [start, stop) paska grid_strip_indices należący do wiersza row
+    # (pozwala narysować tylko widoczne wiersze jednym wywołaniem)
+    start = row * (2 * cols + 2)
+    return start, start + 2 * cols
+
+
+def strip_draw_calls(ranges, cols):
+    # Fragmenty wierszy (wiersz, j0, j1) -> wywołania (pierwszy indeks, liczba
+    # indeksów) paska grid_strip_indices. Fragment kończący wiersz i fragment
+    # zaczynający następny leżą w pasku obok siebie, połączone zdegenerowanymi
+    # indeksami, więc idą jednym wywołaniem - cała szerokość to jedno wywołanie.
+    calls = []
+    previous = None
+    for i, j0, j1 in ranges:
+        start, _ = strip_row_range(i, cols)
+        first, stop = start + 2 * j0, start + 2 * j1
+        if calls and j0 == 0 and previous == (i - 1, cols):
+            calls[-1][1] = stop - calls[-1][0]
+        else:
+            calls.append([first, stop - first])
+        previous = (i, j1)
+    return calls
+
+
+def chunk_draw_calls(draw, chunk, max_gap=0):
+    # Maska (n, n) kawałków do narysowania -> wywołania (pierwszy indeks,
+    # liczba indeksów) paska chunk_strip_indices. Kawałki leżą w pasku
+    # w kolejności maski spłaszczonej wierszami, więc każdy ciąg True w niej
+    # to jedno wywołanie. Przerwy najwyżej max_gap kawałków są rysowane
+    # mimo to - jedno wywołanie zamiast dwóch.
+    length = chunk * (2 * chunk + 4)
+    edges = np.diff(np.concatenate(([0], draw.ravel().astype(np.int8), [0])))
+    starts = np.nonzero(edges == 1)[0]
+    stops = np.nonzero(edges == -1)[0]
+    split = starts[1:] - stops[:-1] > max_gap
+    starts = starts[np.concatenate(([True], split))[:len(starts)]]
+    stops = stops[np.concatenate((split, [True]))[:len(stops)]]
+    return [(int(a) * length, int(b - a) * length - 2) for a, b in zip(starts, stops)]
+
+
+def chunk_call_triangles(calls, chunk):
+    # Trójkąty narysowane wywołaniami chunk_draw_calls (bez zdegenerowanych)
+    length = chunk * (2 * chunk + 4)
+    return sum((count + 2) // length for _, count in calls) * 2 * chunk * chunk
+
+
+def strip_to_triangles(strip):
+    # Zamiana paska na listę trójkątów (bez zdegenerowanych), z zachowaniem orientacji
+    a = strip[:-2]
+    b = strip[1:-1]
+    c = strip[2:]
+    odd = np.arange(len(a)) % 2 == 1
+    tris = np.stack((a, np.where(odd, c, b), np.where(odd, b, c)), axis=1)
+    keep = (a != b) & (b != c) & (a != c)
+    return tris[keep]
+
+
+def grid_triangle_indices(rows, cols, row_start=0, row_stop=None):
+    # Lista trójkątów siatki w kolejności wierszy (dwa trójkąty na komórkę);
+    # row_start/row_stop wybierają pas wierszy komórek (zapis strumieniowy)
+    i = np.arange(row_start, rows - 1 if row_stop is None else row_stop)[:, np.newaxis]
+    j = np.arange(cols - 1)[np.newaxis, :]
+    v00 = (i * cols + j).ravel()
+    v10 = v00 + cols
+    tris = np.stack((v00, v10, v00 + 1, v00 + 1, v10, v10 + 1), axis=1)
+    return tris.reshape(-1, 3).astype(np.uint32)
+
+
+def acmr(triangles, cache_size=32):
+    # Average cache miss ratio: chybienia cache FIFO wierzchołków na trójkąt
+    cache = deque()
+    cached = set()
+    misses = 0
+    for v in np.asarray(triangles).ravel().tolist():
+        if v not in cached:
+            misses += 1
+            cache.append(v)
+            cached.add(v)
+            if len(cache) > cache_size:
+                cached.discard(cache.popleft())
+    return misses / max(1, len(triangles))
+
+
+def optimize_vertex_cache(triangles, cache_size=32):
+    # Przestawia trójkąty pod cache wierzchołków (algorytm Tipsify, Sander i in. 2007)
+    triangles = np.asarray(triangles)
+    vertex_count = int(triangles.max()) + 1
+    tri_list = triangles.tolist()
+
+    adjacency = [[] for _ in range(vertex_count)]
+    for t, tri in enumerate(tri_list):
+        for v in tri:
+            adjacency[v].append(t)
+
+    live = [len(a) for a in adjacency]
+    timestamps = [0] * vertex_count
+    emitted = [False] * len(tri_list)
+    dead_end = []
+    output = []
+    clock = cache_size + 1
+    cursor = 0
+    fanning = 0
+
+    while fanning >= 0:
+        candidates = []
+        for t in adjacency[fanning]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            output.append(t)
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if clock - timestamps[v] > cache_size:
+                    timestamps[v] = clock
+                    clock += 1
+
+        # Następny wierzchołek: wciąż w cache i z żywymi trójkątami
+        fanning = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if clock - timestamps[v] + 2 * live[v] <= cache_size:
+                    priority = clock - timestamps[v]
+                if priority > best:
+                    best = priority
+                    fanning = v
+
+        if fanning < 0:
+            while dead_end:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    fanning = v
+                    break
+        if fanning < 0:
+            while cursor < vertex_count and live[cursor] == 0:
+                cursor += 1
+            if cursor < vertex_count:
+                fanning = cursor
+
+    return triangles[output]
+
+
+# BUFOR WIERZCHOŁKÓW (POZYCJA, KOLOR, NORMALNA) BUDOWANY RÓWNOLEGLE
+#
+# Bufor ma kształt (size, size, VERTEX_FLOATS) float32, wierzchołek (i, j)
+# jak w draw_terrain. Kafelki wierszy są liczone w puli wątków - operacje
+# NumPy na dużych tablicach zwalniają GIL, a każdy kafelek pisze tylko
+# do swoich wierszy, więc wynik jest identyczny z wersją szeregową.
+
+VERTEX_FLOATS = 9  # x, y, z, r, g, b, nx, ny, nz
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+COLOR_OFFSET = 3 * 4
+NORMAL_OFFSET = 6 * 4
+
+
+def build_vertex_tile(heightmap, tile, row_start, row_stop, terrain_scale, height_scale, min_h, h_range,
+                      classes=None, palette=None):
+    # Wypełnia tile (row_stop - row_start, cols, VERTEX_FLOATS) wierszami
+    # row_start..row_stop-1 siatki. Z classes (uint8 na wierzchołek) kolor
+    # to palette[klasa] zamiast zielonej rampy.
+    period = heightmap.shape[0] - 1
+    cols = heightmap.shape[1]
+    h = heightmap[row_start:row_stop]
+
+    tile[:, :, 0] = (np.arange(row_start, row_stop) * terrain_scale)[:, np.newaxis]
+    np.multiply(h, height_scale, out=tile[:, :, 1])
+    tile[:, :, 2] = np.arange(cols) * terrain_scale
+
+    if classes is not None:
+        tile[:, :, 3:6] = palette[classes[row_start:row_stop]]
+    else:
+        # Kolor jak w draw_terrain: zieleń zależna od znormalizowanej wysokości
+        tile[:, :, 3] = 0.1
+        np.multiply(h - min_h, 0.8 / h_range, out=tile[:, :, 4])
+        tile[:, :, 4] += 0.2
+        tile[:, :, 5] = 0.1
+
+    # Normalne z różnic centralnych z zawijaniem jak w get_height
+    i = np.arange(row_start, row_stop)
+    j = np.arange(cols)
+    above = heightmap[(i + 1) % period]
+    below = heightmap[(i - 1) % period]
+    k = height_scale / (2.0 * terrain_scale)
+    nx = tile[:, :, 6]
+    ny = tile[:, :, 7]
+    nz = tile[:, :, 8]
+    np.multiply(below - above, k, out=nx)
+    np.multiply(h[:, (j - 1) % period] - h[:, (j + 1) % period], k, out=nz)
+    norm = np.sqrt(nx * nx + nz * nz + 1.0)
+    np.divide(nx, norm, out=nx)
+    np.divide(nz, norm, out=nz)
+    np.divide(1.0, norm, out=ny)
+
+
+def build_vertex_buffer(heightmap, terrain_scale, height_scale, workers=None, tile_rows=256, out=None,
+                        classes=None, palette=None):
+    size = heightmap.shape[0]
+    if out is None:
+        out = np.empty((size, heightmap.shape[1], VERTEX_FLOATS), dtype=np.float32)
+
+    min_h = float(np.min(heightmap))
+    h_range = float(np.max(heightmap)) - min_h
+    if h_range == 0:
+        h_range = 1.0
+
+    tiles = [(start, min(start + tile_rows, size)) for start in range(0, size, tile_rows)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for start, stop in tiles:
+            build_vertex_tile(heightmap, out[start:stop], start, stop, terrain_scale, height_scale,
+                              min_h, h_range, classes, palette)
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(lambda t: build_vertex_tile(heightmap, out[t[0]:t[1]], t[0], t[1], terrain_scale,
+                                                      height_scale, min_h, h_range, classes, palette), tiles))
+    return out
+
+
+# KOMPAKTOWY FORMAT WIERZCHOŁKÓW
+#
+# x i z wierzchołka wynikają z jego indeksu w siatce (i * TERRAIN_SCALE,
+# j * TERRAIN_SCALE), a kolor z wysokości - wystarczy więc przechowywać
+# samą wysokość jako uint16 znormalizowany do [min_h, max_h]. Resztę
+# odtwarza shader wierzchołków w zad5.0.py (gl_VertexID -> i, j).
+
+def quantize_heights(heightmap):
+    # Zwraca (wysokości uint16, min_h, h_range); h = min_h + q / 65535 * h_range
+    min_h = float(np.min(heightmap))
+    h_range = float(np.max(heightmap)) - min_h
+    if h_range == 0:
+        h_range = 1.0
+    q = np.rint((heightmap - min_h) * (65535.0 / h_range))
+    return q.astype(np.uint16), min_h, h_range
+
+
+def dequantize_heights(q, min_h, h_range):
+    return min_h + q.astype(np.float64) * (h_range / 65535.0)
+
+
+def pack_normals(normals):
+    # Normalne jednostkowe -> uint32 w formacie GL_INT_2_10_10_10_REV
+    # (3 x 10 bitów ze znakiem, w = 0)
+    n = np.clip(np.rint(np.asarray(normals, dtype=np.float64) * 511.0), -511, 511).astype(np.int64)
+    n &= 0x3ff
+    return (n[..., 0] | (n[..., 1] << 10) | (n[..., 2] << 20)).astype(np.uint32)
+
+
+def unpack_normals(packed):
+    p = np.asarray(packed, dtype=np.int64)
+    n = np.stack(((p >> 0) & 0x3ff, (p >> 10) & 0x3ff, (p >> 20) & 0x3ff), axis=-1)
+    n = np.where(n >= 512, n - 1024, n)
+    return n / 511.0
+
+
+# Bajty na wierzchołek dla porównywanych formatów
+VERTEX_FORMATS = [
+    ("float32 xyz + rgb", 24),
+    ("float32 xyz + rgb + normalna (build_vertex_buffer)", VERTEX_STRIDE),
+    ("uint16 wysokość + packed normalna (2_10_10_10)", 2 + 4),
+    ("uint16 wysokość (quantize_heights)", 2),
+]
+
+
+def vertex_memory_report(tiles, tile_size):
+    # Pamięć wierzchołków dla świata tiles x tiles kafelków po tile_size^2 wierzchołków
+    vertices = tiles * tiles * tile_size * tile_size
+    print(f"Świat {tiles}x{tiles} kafelków po {tile_size}^2 = {vertices / 1e6:.1f} mln wierzchołków")
+    for name, size in VERTEX_FORMATS:
+        print(f"  {name:50s} {size:3d} B/wierzch.  {vertices * size / 2 ** 20:9.1f} MB"
+              f"  (współczynnik {VERTEX_FORMATS[0][1] / size:4.1f}x)")
+
+
+def benchmark_vertex_buffer(size, max_workers=None):
+    # Skalowanie budowy bufora wierzchołków z liczbą wątków
+    max_workers = max_workers or os.cpu_count() or 1
+    heightmap = teren.diamond_square_iterative(size, 1)
+    reference = build_vertex_buffer(heightmap, 5.0, 30.0, workers=1)
+    out = np.empty_like(reference)
+    base = None
+
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        build_vertex_buffer(heightmap, 5.0, 30.0, workers=workers, out=out)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        same = np.array_equal(out, reference)
+        print(f"{workers:3d} wątk.  {elapsed:7.2f} s  przyspieszenie {base / elapsed:5.2f}x"
+              f"  {'zgodny' if same else 'NIEZGODNY'} z wersją szeregową")
+
+
+def index_layout_report(size, cache_size=32):
+    # Porównanie układów indeksów siatki size x size pod względem ACMR
+    strip = grid_strip_indices(size, size)
+    tris = grid_triangle_indices(size, size)
+    # draw_terrain wysyła 2 * size wierzchołków na wiersz bez indeksowania
+    immediate = (size - 1) * 2 * size / len(tris)
+
+    print(f"Siatka {size}^2, {len(tris)} trójkątów, cache {cache_size} wierzchołków")
+    print(f"  paski bez indeksów (draw_terrain): {immediate:.3f} wierzch./trójkąt")
+    print(f"  jeden pasek z degeneratami:        ACMR {acmr(strip_to_triangles(strip), cache_size):.3f}"
+          f" ({len(strip)} indeksów)")
+    print(f"  lista trójkątów wierszami:         ACMR {acmr(tris, cache_size):.3f}")
+
+    # Wywołania z fragmentów wierszy rysują te same trójkąty co osobne wiersze
+    ranges = [(i, 0, size) if i != 5 else (i, 3, size // 2) for i in range(size - 1)]
+    calls = strip_draw_calls(ranges, size)
+    merged = np.concatenate([strip_to_triangles(strip[first:first + count]) for first, count in calls])
+    per_row = np.concatenate([strip_to_triangles(strip[strip_row_range(i, size)[0] + 2 * j0:
+                                                       strip_row_range(i, size)[0] + 2 * j1])
+                              for i, j0, j1 in ranges])
+    assert sorted(map(tuple, merged)) == sorted(map(tuple, per_row))
+    print(f"  {len(ranges)} fragmentów wierszy:               {len(calls)} wywołania glDrawElements")
+
+    # Pasek kawałkami: wybrane kawałki rysują dokładnie swoje trójkąty paska,
+    # z tą samą orientacją
+    chunk = 8
+    n = (size - 1) // chunk
+    draw = np.random.default_rng(2).random((n, n)) < 0.6
+    draw[3] = True
+    chunk_strip = chunk_strip_indices(size, size, chunk)
+    chunk_calls = chunk_draw_calls(draw, chunk)
+    drawn = np.concatenate([strip_to_triangles(chunk_strip[first:first + count])
+                            for first, count in chunk_calls])
+    strip_tris = strip_to_triangles(strip)
+    rows, cols = strip_tris.min(axis=1) // size, (strip_tris % size).min(axis=1)
+    expected = strip_tris[draw[rows // chunk, cols // chunk]]
+
+    def canonical(t):
+        # Trójkąt od najmniejszego indeksu (obrót zachowuje orientację)
+        return sorted(tuple(np.roll(x, -int(np.argmin(x)))) for x in t)
+
+    assert canonical(drawn) == canonical(expected)
+    assert chunk_call_triangles(chunk_calls, chunk) == len(expected)
+    print(f"  {int(draw.sum())} z {n * n} kawałków paskiem kawałkami:  {len(chunk_calls)} wywołań glDrawElements")
+    start = time.perf_counter()
+    optimized = optimize_vertex_cache(tris, cache_size)
+    elapsed = time.perf_counter() - start
+    print(f"  lista po Tipsify:                  ACMR {acmr(optimized, cache_size):.3f}"
+          f" ({elapsed:.2f} s)")
+
+
+def tin_report(heightmap, tolerances, height_scale=1.0):
+    # Redukcja liczby trójkątów względem pełnej siatki dla kilku tolerancji
+    size = heightmap.shape[0]
+    full = 2 * (size - 1) ** 2
+    start = time.perf_counter()
+    errors, _ = triangle_errors(heightmap, height_scale)
+    print(f"Mapa {size}^2, pełna siatka: {full} trójkątów, "
+          f"błędy policzone w {time.perf_counter() - start:.2f} s")
+
+    for tolerance in tolerances:
+        start = time.perf_counter()
+        grid, indices = build_tin(heightmap, tolerance, height_scale, errors)
+        elapsed = time.perf_counter() - start
+        measured = tin_max_error(heightmap, grid, indices, height_scale)
+        print(f"  tolerancja {tolerance:6.2f}: {len(indices):8d} trójkątów ({len(indices) / full:6.1%}),"
+              f" {len(grid):7d} wierzchołków, zmierzony maks. błąd {measured:6.2f}, {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    # python siatka.py              - raporty układu indeksów i siatki TIN
+    # python siatka.py ROZMIAR [N]  - skalowanie budowy bufora wierzchołków (np. 4097)
+    if len(sys.argv) > 1:
+        benchmark_vertex_buffer(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    else:
+        index_layout_report(129)
+        vertex_memory_report(16, 257)
+        tin_report(teren.diamond_square_iterative(513, 1), [0.1, 0.5, 1.0, 2.0, 5.0], height_scale=30.0)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# Świat z kafelków o całkowitych współrzędnych i ruchomym początkiem
+# układu (floating origin) dla zad5.0.py
+#
+# Pozycja w świecie to para: całkowite współrzędne kafelka (int64) i
+# przesunięcie wewnątrz kafelka (float64). Kamera zawsze ma przesunięcie
+# w [0, rozmiar kafelka), a po przekroczeniu krawędzi (plus opcjonalny
+# próg histerezy) zmienia się tylko numer kafelka - rebase(). Bufory
+# wierzchołków trzymają współrzędne lokalne kafelka (float32), a kafelki
+# sąsiednie są rysowane z przesunięciem liczonym względem kafelka kamery,
+# więc liczby trafiające do OpenGL są małe niezależnie od tego, jak daleko
+# w świecie jest kamera.
+#
+#   python swiat.py [ODLEGŁOŚĆ]   - precyzja wierzchołków float32 z dala od
+#                                    początku układu (domyślnie 10^6 jednostek)
+import sys
+import math
+import numpy as np
+
+
+def make_origin(tile_size, threshold=0.0):
+    # threshold: jak daleko za krawędź kafelka kamera może wyjść przed
+    # zmianą kafelka (0 = od razu, jak dawne zawijanie modulo)
+    return {
+        'tile_size': tile_size,
+        'threshold': threshold,
+        'tile': np.zeros(2, dtype=np.int64),  # (x, z) kafelka kamery
+        'rebases': 0,
+    }
+
+
+def rebase(origin, local):
+    # Przenosi początek układu o całe kafelki, gdy kamera wyszła poza
+    # kafelek; local (x, y, z) float64 jest zmieniane w miejscu.
+    # Zwraca przesunięcie (kafelki x, kafelki z).
+    size = origin['tile_size']
+    low = -origin['threshold']
+    high = size + origin['threshold']
+    shift = [0, 0]
+    for k, axis in enumerate((0, 2)):
+        if local[axis] < low or local[axis] >= high:
+            # divmod zgodny z operatorem % (wynik zawsze w [0, size))
+            tiles, local[axis] = divmod(local[axis], size)
+            shift[k] = int(tiles)
+    if shift[0] or shift[1]:
+        origin['tile'] += shift
+        origin['rebases'] += 1
+    return shift
+
+
+def world_position(origin, local):
+    # Pozycja bezwzględna (x, z) jako liczby Pythona - do wypisania i zapisu,
+    # nigdy do OpenGL
+    size = origin['tile_size']
+    return (int(origin['tile'][0]) * size + float(local[0]),
+            int(origin['tile'][1]) * size + float(local[2]))
+
+
+def split_position(x, z, tile_size):
+    # Pozycja bezwzględna -> (kafelek (x, z), przesunięcie (x, z))
+    tx, ox = divmod(x, tile_size)
+    tz, oz = divmod(z, tile_size)
+    return (int(tx), int(tz)), (ox, oz)
+
+
+def tile_offset(origin, tile):
+    # Przesunięcie rogu kafelka względem kafelka kamery - różnica liczb
+    # całkowitych, więc dokładna także bardzo daleko od początku świata
+    size = origin['tile_size']
+    return ((int(tile[0]) - int(origin['tile'][0])) * size,
+            (int(tile[1]) - int(origin['tile'][1])) * size)
+
+
+def neighbour_tiles(local, distance, tile_size, ring=1):
+    # Przesunięcia (di, dj) kafelków wokół kafelka kamery, które zawierają
+    # punkty bliżej niż distance (w rzucie na osie X i Z); najwyżej ring
+    # kafelków w każdą stronę
+    def span(center):
+        lo = max(-ring, int(math.floor((center - distance) / tile_size)))
+        hi = min(ring, int(math.floor((center + distance) / tile_size)))
+        return range(lo, hi + 1)
+
+    return [(di, dj) for di in span(local[0]) for dj in span(local[2])]
+
+
+# PRECYZJA (bez OpenGL)
+
+def eye_error_absolute(camera, vertices):
+    # Dawne podejście: wierzchołki i kamera w bezwzględnych float32,
+    # odejmowanie (macierz widoku) też w float32
+    eye = vertices.astype(np.float32) - camera.astype(np.float32)
+    return np.abs(eye.astype(np.float64) - (vertices - camera)).max()
+
+
+def eye_error_floating(camera, vertices, tile_size):
+    # Wierzchołki lokalne swojego kafelka w float32; przesunięcie kafelka
+    # względem kafelka kamery to różnica liczb całkowitych razy rozmiar, od
+    # której odejmowana jest lokalna pozycja kamery (glTranslate w float32)
+    camera_tile = np.floor_divide(camera[[0, 2]], tile_size)
+    vertex_tile = np.floor_divide(vertices[:, [0, 2]], tile_size)
+
+    local_vertices = vertices.copy()
+    local_vertices[:, [0, 2]] -= vertex_tile * tile_size
+    local_camera = camera.copy()
+    local_camera[[0, 2]] -= camera_tile * tile_size
+
+    translation = np.zeros_like(vertices)
+    translation[:, [0, 2]] = (vertex_tile - camera_tile) * tile_size
+    translation -= local_camera
+    eye = local_vertices.astype(np.float32) + translation.astype(np.float32)
+    return np.abs(eye.astype(np.float64) - (vertices - camera)).max()
+
+
+def camera_steps(start, step, frames, floating, tile_size):
+    # Przesunięcia kamery między klatkami przy stałej prędkości; dla
+    # float32 z dala od początku układu krok jest zaokrąglany (drgania)
+    if not floating:
+        positions = start + step * np.arange(frames)
+        return np.diff(positions.astype(np.float32).astype(np.float64))
+    origin = make_origin(tile_size)
+    (tx, _), (local_x, _) = split_position(start, 0.0, tile_size)
+    origin['tile'][0] = tx
+    local = np.array([local_x, 0.0, 0.0])
+    steps = []
+    previous = None
+    for _ in range(frames):
+        local[0] += step
+        shift = rebase(origin, local)
+        current = float(np.float32(local[0]))  # wartość trafiająca do OpenGL
+        if previous is not None:
+            steps.append(current - previous + shift[0] * tile_size)
+        previous = current
+    return np.array(steps)
+
+
+def precision_report(distance=1e6, tile_size=640.0):
+    rng = np.random.default_rng(4)
+    camera = np.array([distance + 123.456, 80.0, distance * 0.5 + 77.7])
+    vertices = camera + rng.uniform(-600.0, 600.0, size=(4096, 3))
+    absolute = eye_error_absolute(camera, vertices)
+    floating = eye_error_floating(camera, vertices, tile_size)
+    print("Wierzchołki {:.0e} jednostek od początku świata (float32, kafelek {:.0f}):".format(distance, tile_size))
+    print("  błąd pozycji względem kamery: bezwzględne {:.2e}, ruchomy początek {:.2e}".format(absolute, floating))
+
+    step = 0.01
+    for floating_origin in (False, True):
+        steps = camera_steps(distance, step, 500, floating_origin, tile_size)
+        print("  krok kamery {} ({}): min {:.4f}, maks {:.4f}".format(
+            step, 'ruchomy początek' if floating_origin else 'bezwzględne', steps.min(), steps.max()))
+    return absolute, floating, np.abs(camera_steps(distance, step, 500, True, tile_size) - step).max()
+
+
+if __name__ == '__main__':
+    distance = float(sys.argv[1]) if len(sys.argv) > 1 else 1e6
+    absolute, floating, jitter = precision_report(distance)
+    assert floating < 1e-3 and jitter < 1e-4
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+# Generatory map wysokości dla zad5.0.py
+#
+# Każdy generator zwraca tablicę NumPy (size x size) z wysokościami
+# w przybliżeniu z zakresu [-1, 1]. Mapa jest okresowa z okresem size - 1,
+# tak jak HEIGHTMAP w zad5.0.py (ostatni wiersz i kolumna = pierwsze).
+import sys
+import time
+import random
+import resource
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+
+# DIAMOND-SQUARE (WERSJA REFERENCYJNA)
+
+def diamond_square(size, seed, roughness=1.0):
+    # Wierne przeniesienie diamond_square_step z zad5.0.py - dla tego samego
+    # ziarna daje identyczną mapę, więc służy jako wzorzec dla szybszych silników
+    if size < 3 or (size - 1) & (size - 2):
+        raise ValueError("Rozmiar mapy dla Diamond-Square musi być 2^n + 1")
+
+    rng = random.Random(seed)
+    heightmap = np.zeros((size, size))
+    period = size - 1
+
+    def get_height(x, y):
+        return heightmap[x % period][y % period]
+
+    def set_height(x, y, val):
+        heightmap[x % period][y % period] = val
+
+    set_height(0, 0, rng.random())
+    set_height(0, size - 1, rng.random())
+    set_height(size - 1, 0, rng.random())
+    set_height(size - 1, size - 1, rng.random())
+
+    step = size - 1
+    while step // 2 >= 1:
+        half_step = step // 2
+
+        for x in range(half_step, size, step):
+            for y in range(half_step, size, step):
+                avg = (get_height(x - half_step, y - half_step) +
+                       get_height(x + half_step, y - half_step) +
+                       get_height(x - half_step, y + half_step) +
+                       get_height(x + half_step, y + half_step)) / 4.0
+                set_height(x, y, avg + rng.uniform(-roughness, roughness))
+
+        for x in range(0, size, half_step):
+            for y in range((x + half_step) % step, size, step):
+                avg = (get_height(x - half_step, y) +
+                       get_height(x + half_step, y) +
+                       get_height(x, y - half_step) +
+                       get_height(x, y + half_step)) / 4.0
+                set_height(x, y, avg + rng.uniform(-roughness, roughness))
+
+        step = half_step
+        roughness /= 2.0
+
+    # Uzupełnij krawędź okresu, żeby tablica była spójna bez modulo
+    heightmap[period, :] = heightmap[0, :]
+    heightmap[:, period] = heightmap[:, 0]
+    return heightmap
+
+
+# DIAMOND-SQUARE ITERACYJNY (DUŻE MAPY)
+
+def _random_offsets(seed, level, rows, cols, roughness):
+    # Przesunięcia zależą tylko od (ziarno, poziom, x, y), więc wynik
+    # nie zależy od kolejności ani podziału mapy na bloki
+    h = lattice_hash(rows[:, np.newaxis], cols[np.newaxis, :], seed * 64 + level)
+    return (h * (2.0 / 0xffffffff) - 1.0) * roughness
+
+
+def diamond_pass(buf, step, roughness, seed, level, row_start, row_stop):
+    # Krok diamentu dla środków kwadratów o indeksach wierszy [row_start, row_stop)
+    # (wiersz k leży na x = half + k * step)
+    half = step // 2
+    period = buf.shape[0] - 1
+    s0, s1 = row_start * step, row_stop * step
+
+    avg = buf[s0:s1:step, 0:period:step] + buf[s0:s1:step, step::step]
+    avg += buf[s0 + step:s1 + step:step, 0:period:step]
+    avg += buf[s0 + step:s1 + step:step, step::step]
+    avg *= 0.25
+
+    rows = np.arange(row_start, row_stop) * step + half
+    cols = np.arange(half, period, step)
+    avg += _random_offsets(seed, level, rows, cols, roughness)
+    buf[s0 + half:s1 + half:step, half::step] = avg
+
+
+def square_pass(buf, step, roughness, seed, level, row_start, row_stop):
+    # Krok kwadratu dla wierszy siatki x = k * half, k w [row_start, row_stop).
+    # Zawijanie obsługuje tablica indeksów sąsiadów liczona raz na blok,
+    # a nie modulo przy każdym odczycie; ostatni wiersz i kolumna (kopie
+    # pierwszych) są uzupełniane przez copy_border.
+    half = step // 2
+    period = buf.shape[0] - 1
+
+    # Wiersze narożników (k parzyste): punkty w kolumnach half::step
+    k0 = row_start + row_start % 2
+    if k0 < row_stop:
+        x0, x1 = k0 * half, row_stop * half
+        rows = np.arange(x0, x1, step)
+        avg = buf[(rows - half) % period, half::step] + buf[x0 + half:x1 + half:step, half::step]
+        avg += buf[x0:x1:step, 0:period:step]
+        avg += buf[x0:x1:step, step::step]
+        avg *= 0.25
+        avg += _random_offsets(seed, level, rows, np.arange(half, period, step), roughness)
+        buf[x0:x1:step, half::step] = avg
+
+    # Wiersze środków (k nieparzyste): punkty w kolumnach 0::step (bez kopii okresu)
+    k0 = row_start + 1 - row_start % 2
+    if k0 < row_stop:
+        x0, x1 = k0 * half, row_stop * half
+        rows = np.arange(x0, x1, step)
+        left = np.arange(-half, period - half, step) % period
+        avg = buf[x0 - half:x1 - half:step, 0:period:step] + buf[x0 + half:x1 + half:step, 0:period:step]
+        avg += buf[x0:x1:step][:, left]
+        avg += buf[x0:x1:step, half::step]
+        avg *= 0.25
+        avg += _random_offsets(seed, level, rows, np.arange(0, period, step), roughness)
+        buf[x0:x1:step, 0:period:step] = avg
+
+
+def copy_border(buf):
+    # Ostatni wiersz i kolumna to kopia pierwszych (okres mapy = size - 1)
+    period = buf.shape[0] - 1
+    buf[period, :] = buf[0, :]
+    buf[:, period] = buf[:, 0]
+
+
+def diamond_square_iterative(size, seed, roughness=1.0, out=None, block_rows=64, dtype=np.float32):
+    # Diamond-Square bez rekursji, w miejscu, na jednym buforze size x size.
+    # out może być wcześniej zaalokowaną tablicą (także np.memmap).
+    if size < 3 or (size - 1) & (size - 2):
+        raise ValueError("Rozmiar mapy dla Diamond-Square musi być 2^n + 1")
+
+    buf = out if out is not None else np.empty((size, size), dtype=dtype)
+    buf[0, 0] = random.Random(seed).random()
+    copy_border(buf)
+
+    step = size - 1
+    level = 0
+    while step >= 2:
+        # Wiersze przetwarzane blokami, żeby tymczasowe tablice mieściły się w cache
+        centers = (size - 1) // step
+        for start in range(0, centers, block_rows):
+            diamond_pass(buf, step, roughness, seed, level, start, min(start + block_rows, centers))
+
+        square_rows = (size - 1) // (step // 2)
+        for start in range(0, square_rows, block_rows):
+            square_pass(buf, step, roughness, seed, level, start, min(start + block_rows, square_rows))
+        copy_border(buf)
+
+        step //= 2
+        roughness /= 2.0
+        level += 1
+
+    return buf
+
+
+# DIAMOND-SQUARE RÓWNOLEGŁY (WIELE PROCESÓW)
+
+# Procesy robocze są uruchamiane przez 'spawn', nie fork: zad5.0.py generuje
+# teren w wątku wejścia/wyjścia przy działającym kontekście GL/GLFW, a fork
+# procesu z wieloma wątkami kopiuje tylko jeden z nich (zablokowane mutexy,
+# stan sterownika). 'spawn' startuje czysty interpreter, który tylko
+# importuje ten moduł.
+POOL_CONTEXT = multiprocessing.get_context('spawn')
+
+# Widok na mapę we współdzielonej pamięci, ustawiany w każdym procesie roboczym
+_worker_shm = None
+_worker_buf = None
+
+
+def _attach_worker(shm_name, size, dtype):
+    global _worker_shm, _worker_buf
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_buf = np.ndarray((size, size), dtype=dtype, buffer=_worker_shm.buf)
+
+
+def _run_band(pass_name, step, roughness, seed, level, row_start, row_stop):
+    if pass_name == 'diamond':
+        diamond_pass(_worker_buf, step, roughness, seed, level, row_start, row_stop)
+    else:
+        square_pass(_worker_buf, step, roughness, seed, level, row_start, row_stop)
+
+
+def _bands(rows, count):
+    # Podział [0, rows) na count pasów wierszy o zbliżonej wysokości
+    bounds = [rows * i // count for i in range(count + 1)]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def diamond_square_parallel(size, seed, roughness=1.0, workers=None, dtype=np.float32):
+    # Diamond-Square z krokami diamentu i kwadratu rozdzielonymi na pasy wierszy
+    # liczone w puli procesów. Pasy jednego kroku piszą rozłączne punkty, a
+    # pool.starmap wraca dopiero po wszystkich pasach - to bariera między krokami.
+    # Wynik jest identyczny z diamond_square_iterative dla każdej liczby procesów.
+    if size < 3 or (size - 1) & (size - 2):
+        raise ValueError("Rozmiar mapy dla Diamond-Square musi być 2^n + 1")
+    workers = workers or multiprocessing.cpu_count()
+
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=size * size * dtype.itemsize)
+    try:
+        buf = np.ndarray((size, size), dtype=dtype, buffer=shm.buf)
+        buf[0, 0] = random.Random(seed).random()
+        copy_border(buf)
+
+        with POOL_CONTEXT.Pool(workers, _attach_worker, (shm.name, size, dtype.str)) as pool:
+            step = size - 1
+            level = 0
+            while step >= 2:
+                centers = (size - 1) // step
+                pool.starmap(_run_band, [('diamond', step, roughness, seed, level, a, b)
+                                         for a, b in _bands(centers, workers)])
+
+                square_rows = (size - 1) // (step // 2)
+                pool.starmap(_run_band, [('square', step, roughness, seed, level, a, b)
+                                         for a, b in _bands(square_rows, workers)])
+                copy_border(buf)
+
+                step //= 2
+                roughness /= 2.0
+                level += 1
+
+        heightmap = buf.copy()
+        del buf
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return heightmap
+
+
+# SZUM GRADIENTOWY I WARTOŚCIOWY (WEKTORYZOWANY)
+
+# 8 kierunków gradientu (osie i przekątne) jak w szumie Perlina
+GRADIENTS = np.array([[1.0, 0.0], [-1.0, 0.0], [0.0, 1.0], [0.0, -1.0],
+                      [0.7071, 0.7071], [-0.7071, 0.7071],
+                      [0.7071, -0.7071], [-0.7071, -0.7071]])
+
+
+def lattice_hash(ix, iz, seed):
+    # Bezstanowy hasz całkowitych współrzędnych siatki -> uint32
+    h = (np.asarray(ix, dtype=np.int64) * 0x27d4eb2d) ^ (np.asarray(iz, dtype=np.int64) * 0x165667b1)
+    h = (h ^ ((seed * 0x9e3779b9) & 0xffffffff)) & 0xffffffff
+    h = h.astype(np.uint64)
+    h ^= h >> np.uint64(15)
+    h = (h * np.uint64(0x85ebca6b)) & np.uint64(0xffffffff)
+    h ^= h >> np.uint64(13)
+    h = (h * np.uint64(0xc2b2ae35)) & np.uint64(0xffffffff)
+    h ^= h >> np.uint64(16)
+    return h
+
+
+def fade(t):
+    # Krzywa wygładzająca 6t^5 - 15t^4 + 10t^3
+    return t * t * t * (t * (t * 6.0 - 15.0) + 10.0)
+
+
+def _lattice(x, z, period):
+    # Narożniki komórki siatki i położenie wewnątrz komórki
+    x0 = np.floor(x)
+    z0 = np.floor(z)
+    fx = x - x0
+    fz = z - z0
+    x0 = x0.astype(np.int64)
+    z0 = z0.astype(np.int64)
+    x1 = x0 + 1
+    z1 = z0 + 1
+    if period:
+        x0, x1, z0, z1 = x0 % period, x1 % period, z0 % period, z1 % period
+    return x0, x1, z0, z1, fx, fz
+
+
+def value_noise(x, z, seed, period=None):
+    # Losowe wartości w węzłach siatki, interpolowane krzywą fade
+    x0, x1, z0, z1, fx, fz = _lattice(np.asarray(x, dtype=np.float64),
+                                      np.asarray(z, dtype=np.float64), period)
+    scale = 2.0 / 0xffffffff
+
+    v00 = lattice_hash(x0, z0, seed) * scale - 1.0
+    v10 = lattice_hash(x1, z0, seed) * scale - 1.0
+    v01 = lattice_hash(x0, z1, seed) * scale - 1.0
+    v11 = lattice_hash(x1, z1, seed) * scale - 1.0
+
+    u = fade(fx)
+    v = fade(fz)
+    return (v00 * (1 - u) + v10 * u) * (1 - v) + (v01 * (1 - u) + v11 * u) * v
+
+
+def perlin_noise(x, z, seed, period=None):
+    # Szum gradientowy Perlina; wynik przeskalowany do około [-1, 1]
+    x0, x1, z0, z1, fx, fz = _lattice(np.asarray(x, dtype=np.float64),
+                                      np.asarray(z, dtype=np.float64), period)
+
+    def corner(ix, iz, dx, dz):
+        g = GRADIENTS[(lattice_hash(ix, iz, seed) & np.uint64(7)).astype(np.intp)]
+        return g[..., 0] * dx + g[..., 1] * dz
+
+    n00 = corner(x0, z0, fx, fz)
+    n10 = corner(x1, z0, fx - 1.0, fz)
+    n01 = corner(x0, z1, fx, fz - 1.0)
+    n11 = corner(x1, z1, fx - 1.0, fz - 1.0)
+
+    u = fade(fx)
+    v = fade(fz)
+    return ((n00 * (1 - u) + n10 * u) * (1 - v) + (n01 * (1 - u) + n11 * u) * v) * 1.4142
+
+
+def fbm(x, z, seed, period=None, octaves=6, lacunarity=2, gain=0.5, base=perlin_noise):
+    # Fractional Brownian motion - suma oktaw szumu bazowego.
+    # Przy całkowitym lacunarity okres rośnie razem z częstotliwością.
+    x = np.asarray(x, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    total = np.zeros(np.broadcast(x, z).shape)
+    amplitude = 1.0
+    frequency = 1
+    norm = 0.0
+
+    for octave in range(octaves):
+        octave_period = period * frequency if period else None
+        total += amplitude * base(x * frequency, z * frequency, seed + octave, octave_period)
+        norm += amplitude
+        amplitude *= gain
+        frequency *= lacunarity
+
+    return total / norm
+
+
+# INTERFEJS GENERATORÓW
+
+# Generatory próbkujące w dowolnych współrzędnych siatki
+NOISE_GENERATORS = {
+    'value': value_noise,
+    'perlin': perlin_noise,
+    'fbm': fbm,
+}
+
+GENERATOR_NAMES = ['diamond_square', 'diamond_square_iterative',
+                   'diamond_square_parallel'] + list(NOISE_GENERATORS)
+
+
+def make_heightmap(generator, size, seed, x0=0, z0=0, frequency=1.0 / 32, period=None, roughness=1.0,
+                   **params):
+    # Mapa size x size próbek zaczynająca się w próbce (x0, z0).
+    # period (w próbkach) zawija szum tak jak get_height w zad5.0.py;
+    # period * frequency musi być liczbą całkowitą. roughness to amplituda
+    # przesunięć Diamond-Square na pierwszym poziomie, a dla szumów skala
+    # wyniku - w obu przypadkach 1.0 daje dotychczasowy teren.
+    if generator == 'diamond_square':
+        if x0 or z0:
+            raise ValueError("Diamond-Square nie obsługuje przesuniętych kafelków")
+        return diamond_square(size, seed, roughness, **params)
+    if generator == 'diamond_square_iterative':
+        if x0 or z0:
+            raise ValueError("Diamond-Square nie obsługuje przesuniętych kafelków")
+        return diamond_square_iterative(size, seed, roughness, **params)
+    if generator == 'diamond_square_parallel':
+        if x0 or z0:
+            raise ValueError("Diamond-Square nie obsługuje przesuniętych kafelków")
+        return diamond_square_parallel(size, seed, roughness, **params)
+
+    if generator not in NOISE_GENERATORS:
+        raise ValueError("Nieznany generator terenu: " + generator)
+
+    lattice_period = None
+    if period:
+        lattice_period = int(round(period * frequency))
+        if lattice_period < 1 or abs(lattice_period - period * frequency) > 1e-9:
+            raise ValueError("period * frequency musi być dodatnią liczbą całkowitą")
+
+    xs = (x0 + np.arange(size)) * frequency
+    zs = (z0 + np.arange(size)) * frequency
+    heights = NOISE_GENERATORS[generator](xs[:, np.newaxis], zs[np.newaxis, :], seed,
+                                          lattice_period, **params)
+    if roughness != 1.0:
+        heights *= roughness
+    return heights
+
+
+def benchmark():
+    # Przepustowość generatorów w próbkach na sekundę
+    cases = [('diamond_square', 257), ('diamond_square_iterative', 1025),
+             ('value', 1025), ('perlin', 1025), ('fbm', 1025)]
+    for generator, size in cases:
+        start = time.perf_counter()
+        make_heightmap(generator, size, 1)
+        elapsed = time.perf_counter() - start
+        print(f"{generator:25s} {size:5d}^2  {size * size / elapsed / 1e6:8.2f} Mpróbek/s")
+
+
+def benchmark_large(size, block_rows=64):
+    # Czas i szczytowe RSS dla dużej mapy z iteracyjnego Diamond-Square
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    start = time.perf_counter()
+    heightmap = diamond_square_iterative(size, 1, block_rows=block_rows)
+    elapsed = time.perf_counter() - start
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+    print(f"Diamond-Square iteracyjny {size}^2: {elapsed:.2f} s")
+    print(f"  bufor mapy:    {heightmap.nbytes / 2 ** 20:8.1f} MB")
+    print(f"  RSS szczytowe: {rss_peak:8.1f} MB (przed: {rss_before:.1f} MB)")
+
+
+def benchmark_parallel(size, max_workers=None):
+    # Skalowanie równoległego Diamond-Square od 1 do N procesów
+    max_workers = max_workers or multiprocessing.cpu_count()
+    reference = diamond_square_iterative(size, 1)
+    base = None
+
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        heightmap = diamond_square_parallel(size, 1, workers=workers)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        same = np.array_equal(heightmap, reference)
+        print(f"{workers:3d} proc.  {elapsed:7.2f} s  przyspieszenie {base / elapsed:5.2f}x"
+              f"  {'zgodny' if same else 'NIEZGODNY'} z wersją szeregową")
+
+
+if __name__ == '__main__':
+    # python teren.py                      - porównanie generatorów
+    # python teren.py ROZMIAR              - czas i pamięć dla dużej mapy (np. 8193)
+    # python teren.py ROZMIAR PROCESY      - skalowanie wersji równoległej
+    if len(sys.argv) > 2:
+        benchmark_parallel(int(sys.argv[1]), int(sys.argv[2]))
+    elif len(sys.argv) > 1:
+        benchmark_large(int(sys.argv[1]))
+    else:
+        benchmark()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Tryb wydajności PyOpenGL dla skryptów laboratorium
+#
+# PyOpenGL domyślnie wywołuje glGetError i loguje po każdym glVertex3f,
+# glColor3f czy glRotatef, co wielokrotnie spowalnia pętle trybu
+# natychmiastowego. Zaimportowanie tego modułu PRZED OpenGL.GL wyłącza te
+# kontrole (oraz kontrolę kontekstu, rozmiarów tablic i trzymanie
+# wskaźników). Opcja --debug-gl albo zmienna LAB4_GL_DEBUG=1 je przywraca.
+#
+#   python tryb_gl.py   - liczba wywołań na sekundę w obu trybach (bez okna)
+import os
+import sys
+import json
+import time
+import subprocess
+
+import OpenGL
+
+DEBUG = '--debug-gl' in sys.argv or os.environ.get('LAB4_GL_DEBUG') == '1'
+
+if 'OpenGL.GL' in sys.modules:
+    print("tryb_gl: OpenGL.GL zaimportowany wcześniej - flagi nie zadziałają", file=sys.stderr)
+
+OpenGL.ERROR_CHECKING = DEBUG
+OpenGL.ERROR_LOGGING = DEBUG
+# Sprawdzanie, czy kontekst jest aktywny, i rozmiarów tablic przy każdym wywołaniu
+OpenGL.CONTEXT_CHECKING = DEBUG
+OpenGL.ARRAY_SIZE_CHECKING = DEBUG
+# Bez STORE_POINTERS PyOpenGL nie trzyma referencji do tablic podanych do
+# gl*Pointer - tablica po stronie klienta musi żyć, dopóki jest rysowana.
+# Skrypty podają tam tylko bufory VBO, więc w trybie wydajności to bezpieczne.
+OpenGL.STORE_POINTERS = DEBUG
+
+BENCHMARK_CALLS = 200000
+
+
+def benchmark_calls():
+    # Pętla jak w draw_terrain / example_object; bez kontekstu wywołania
+    # trafiają do pustych funkcji sterownika, więc mierzony jest narzut Pythona
+    # (kontrola kontekstu bez okna zawsze zgłosiłaby NoContext)
+    OpenGL.CONTEXT_CHECKING = False
+    from OpenGL.GL import glColor3f, glVertex3f, glRotatef
+
+    results = {}
+    for name, call in (('glColor3f', lambda: glColor3f(0.1, 0.5, 0.1)),
+                       ('glVertex3f', lambda: glVertex3f(1.0, 2.0, 3.0)),
+                       ('glRotatef', lambda: glRotatef(90.0, 1.0, 0.0, 0.0))):
+        start = time.perf_counter()
+        for _ in range(BENCHMARK_CALLS):
+            call()
+        results[name] = BENCHMARK_CALLS / (time.perf_counter() - start)
+    return results
+
+
+def benchmark():
+    for debug in (False, True):
+        env = dict(os.environ, LAB4_GL_DEBUG='1' if debug else '0')
+        code = ("import sys, json; sys.path.insert(0, {!r}); import tryb_gl; "
+                "print(json.dumps(tryb_gl.benchmark_calls()))").format(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            print("Pomiar nieudany:", result.stderr.strip().splitlines()[-1:])
+            continue
+
+        rates = json.loads(result.stdout.strip().splitlines()[-1])
+        print("Tryb {}:".format("debug (kontrola błędów)" if debug else "wydajności"))
+        for name, rate in rates.items():
+            print("  {:12s} {:10.0f} wywołań/s".format(name, rate))
+
+
+if __name__ == '__main__':
+    benchmark()
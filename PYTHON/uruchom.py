@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# Szybki start lotu nad terenem (zad5.0.py)
+#
+# Okno powstaje zaraz po imporcie samego glfw. Ciężkie moduły (OpenGL,
+# NumPy, generatory terenu) ładują się dopiero potem, a teren generuje się
+# w tle, gdy okno już pokazuje niebo.
+#
+#   python uruchom.py [opcje zad5.0.py]   - lot z pomiarem czasu startu
+#   python uruchom.py --benchmark         - czasy importu i pierwszej klatki
+import time
+
+LAUNCH_TIME = time.perf_counter()
+
+import os
+import sys
+import subprocess
+import importlib.util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+VIEWER = 'zad5.0.py'
+SCRIPTS = ['lab4.py', 'zad3.0.py', 'zad3.5.py', 'zad4.0.py', 'zad4.5.py', 'zad5.0.py']
+HEAVY_MODULES = ['glfw.GLFW', 'OpenGL.GL', 'OpenGL.GLU', 'numpy']
+
+
+def module_name(filename):
+    # Nazwy zadań zawierają kropkę (zad5.0.py) - nazwa modułu bez niej
+    return os.path.splitext(filename)[0].replace('.', '_')
+
+
+def load_script(filename):
+    # Nazwy zadań zawierają kropkę (zad5.0.py), więc import przez importlib
+    name = module_name(filename)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_viewer(argv):
+    from glfw.GLFW import glfwInit, glfwCreateWindow, glfwTerminate, glfwPollEvents, glfwSetWindowTitle
+
+    if not glfwInit():
+        sys.exit(-1)
+
+    window = glfwCreateWindow(800, 600, "Ładowanie...", None, None)
+    if not window:
+        glfwTerminate()
+        sys.exit(-1)
+    glfwPollEvents()
+
+    window_time = time.perf_counter()
+    print("Okno po {:.0f} ms".format((window_time - LAUNCH_TIME) * 1000.0))
+
+    sys.argv = [VIEWER] + argv
+    viewer = load_script(VIEWER)
+    print("Import modułów: {:.0f} ms".format((time.perf_counter() - window_time) * 1000.0))
+
+    viewer.launch_time = LAUNCH_TIME
+    glfwSetWindowTitle(window, viewer.WINDOW_TITLE)
+    viewer.run(window, viewer.parse_args())
+
+
+def measure_import(statement):
+    # Czas importu w świeżym interpreterze (bez modułów już w pamięci)
+    code = ("import sys, time; sys.path.insert(0, {!r}); t = time.perf_counter(); {}; "
+            "print((time.perf_counter() - t) * 1000.0)").format(SCRIPT_DIR, statement)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(runs=3):
+    print("Czas importu (ms, najlepszy z {}):".format(runs))
+    for module in HEAVY_MODULES:
+        times = [measure_import('import ' + module) for _ in range(runs)]
+        print("  {:20s} {}".format(module, format_times(times)))
+    for script in SCRIPTS:
+        times = [measure_import('import uruchom; uruchom.load_script({!r})'.format(script))
+                 for _ in range(runs)]
+        print("  {:20s} {}".format(script, format_times(times)))
+
+    if not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY') or sys.platform in ('win32', 'darwin')):
+        print("Brak ekranu - pomijam pomiar pierwszej klatki")
+        return
+
+    print("Start do pierwszej klatki (zimny start, bez cache terenu):")
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, 'uruchom.py'),
+                                 '--frames', '1', '--no-cache', '--seed', '1'],
+                                capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            if line.endswith(' ms'):
+                print("  " + line)
+
+
+def format_times(times):
+    valid = [t for t in times if t is not None]
+    if not valid:
+        return "niedostępny"
+    return "{:8.1f}".format(min(valid))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--benchmark']:
+        benchmark()
+    else:
+        run_viewer(sys.argv[1:])
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# Zasięg widzenia dla zad5.0.py: mgła, dalsza płaszczyzna obcinania
+# i regulator utrzymujący zadany czas klatki
+import math
+import numpy as np
+
+# Progi regulatora względem docelowego czasu klatki
+SHRINK_ABOVE = 1.05  # klatka dłuższa niż 105% celu -> zmniejsz zasięg
+GROW_BELOW = 0.80  # klatka krótsza niż 80% celu -> zwiększ zasięg
+SHRINK_FACTOR = 0.90
+GROW_FACTOR = 1.05
+SMOOTHING = 0.1  # waga nowej próbki w średniej kroczącej czasu klatki
+
+
+def make_view_controller(target_frame_time, min_distance, max_distance, distance=None):
+    # Stan regulatora trzymany w słowniku (jak stan kamery w zmiennych globalnych)
+    return {
+        'target_frame_time': target_frame_time,
+        'min_distance': min_distance,
+        'max_distance': max_distance,
+        'distance': max_distance if distance is None else distance,
+        'avg_frame_time': target_frame_time,
+        'decision': 'hold',
+    }
+
+
+def update_view_controller(controller, frame_time):
+    # Zmniejsza albo zwiększa zasięg widzenia tak, żeby utrzymać czas klatki.
+    # Zwraca nowy zasięg; decyzja zostaje w controller['decision'].
+    avg = controller['avg_frame_time'] * (1.0 - SMOOTHING) + frame_time * SMOOTHING
+    controller['avg_frame_time'] = avg
+    target = controller['target_frame_time']
+    distance = controller['distance']
+
+    if avg > target * SHRINK_ABOVE and distance > controller['min_distance']:
+        distance = max(controller['min_distance'], distance * SHRINK_FACTOR)
+        controller['decision'] = 'shrink'
+    elif avg < target * GROW_BELOW and distance < controller['max_distance']:
+        distance = min(controller['max_distance'], distance * GROW_FACTOR)
+        controller['decision'] = 'grow'
+    else:
+        controller['decision'] = 'hold'
+
+    controller['distance'] = distance
+    return distance
+
+
+def visible_range(center, distance, scale, count):
+    # Zakres indeksów siatki [lo, hi) w odległości distance od center
+    # (rzut na jedną oś); wszystko poza nim jest w pełni zakryte mgłą
+    lo = max(0, int(math.floor((center - distance) / scale)))
+    hi = min(count, int(math.ceil((center + distance) / scale)) + 1)
+    return lo, max(lo, hi)
+
+
+def minmax_pyramid(heightmap, chunk=8):
+    # Piramida min/max wysokości: poziom 0 to kawałki chunk x chunk komórek,
+    # każdy kolejny łączy 2 x 2 kawałki. Poziom to tablica (n, n, 2) float32.
+    n = (heightmap.shape[0] - 1) // chunk
+    cells_min = np.minimum(np.minimum(heightmap[:-1, :-1], heightmap[1:, :-1]),
+                           np.minimum(heightmap[:-1, 1:], heightmap[1:, 1:]))
+    cells_max = np.maximum(np.maximum(heightmap[:-1, :-1], heightmap[1:, :-1]),
+                           np.maximum(heightmap[:-1, 1:], heightmap[1:, 1:]))
+
+    level = np.empty((n, n, 2), dtype=np.float32)
+    level[:, :, 0] = cells_min[:n * chunk, :n * chunk].reshape(n, chunk, n, chunk).min(axis=(1, 3))
+    level[:, :, 1] = cells_max[:n * chunk, :n * chunk].reshape(n, chunk, n, chunk).max(axis=(1, 3))
+
+    pyramid = [level]
+    for n in pyramid_sizes(heightmap.shape[0], chunk)[1:]:
+        blocks = level.reshape(n, 2, n, 2, 2)
+        level = np.empty((n, n, 2), dtype=np.float32)
+        level[:, :, 0] = blocks[..., 0].min(axis=(1, 3))
+        level[:, :, 1] = blocks[..., 1].max(axis=(1, 3))
+        pyramid.append(level)
+    return pyramid
+
+
+def pyramid_sizes(size, chunk):
+    # Liczba kawałków na bok na kolejnych poziomach piramidy
+    sizes = [(size - 1) // chunk]
+    while sizes[-1] > 1 and sizes[-1] % 2 == 0:
+        sizes.append(sizes[-1] // 2)
+    return sizes
+
+
+def pack_pyramid(pyramid):
+    # Piramida jako jedna płaska tablica (do zapisu w cache_terenu)
+    return np.concatenate([level.ravel() for level in pyramid])
+
+
+def unpack_pyramid(flat, size, chunk):
+    pyramid = []
+    offset = 0
+    for n in pyramid_sizes(size, chunk):
+        pyramid.append(flat[offset:offset + n * n * 2].reshape(n, n, 2))
+        offset += n * n * 2
+    return pyramid
+
+
+# ODRZUCANIE ZASŁONIĘTYCH KAWAŁKÓW (HORYZONT)
+#
+# Bufor horyzontu trzyma dla każdego kierunku wokół kamery (azymutu)
+# najmniejsze pewne nachylenie terenu już przejrzanego. Kawałki (poziom 0
+# piramidy min/max) są testowane pierścieniami odległości, od najbliższych:
+# kawałek, którego największe możliwe nachylenie (max wysokości
+# w najbliższym punkcie) jest niższe od horyzontu we wszystkich jego
+# kierunkach, jest całkowicie zasłonięty.
+#
+# Horyzont budują pojedyncze komórki mapy w pobliżu kamery (min wysokości
+# w najdalszym punkcie komórki) - tylko w kierunkach, które komórka zakrywa
+# w całości, i tylko gdy cała komórka leży bliżej niż testowany pierścień.
+# Test jest więc zachowawczy: odrzucony kawałek na pewno nie jest widoczny.
+#
+# Kawałki do sprawdzenia wyznacza okno (window) w kawałkach, które może
+# wychodzić poza mapę - teren powtarza się wtedy co kafelek (swiat.py).
+# Jedno wywołanie na widok obejmuje więc kamerę i wszystkie sąsiednie
+# kafelki, a draw_tile bierze z wyniku tylko swój wycinek (tile_visibility).
+
+HORIZON_BINS = 256  # kierunków na pełny obrót
+# Zasłonięte kawałki między widocznymi (najwyżej tyle z rzędu) są rysowane,
+# żeby nie dzielić wywołania glDrawElements (siatka.chunk_draw_calls)
+MERGE_GAP = 2
+
+
+def rect_bounds(x_lo, x_hi, z_lo, z_hi, camera):
+    # Dla prostokątów [x_lo, x_hi] x [z_lo, z_hi]: najbliższa i najdalsza
+    # odległość w poziomie od kamery oraz zakres azymutów prostokąta
+    cx, cz = camera[0], camera[2]
+    gap_x = np.maximum(np.maximum(x_lo - cx, cx - x_hi), 0.0)
+    gap_z = np.maximum(np.maximum(z_lo - cz, cz - z_hi), 0.0)
+    near = np.sqrt(gap_x * gap_x + gap_z * gap_z)
+
+    corners_x = [x_lo - cx, x_lo - cx, x_hi - cx, x_hi - cx]
+    corners_z = [z_lo - cz, z_hi - cz, z_lo - cz, z_hi - cz]
+    far = np.sqrt(np.maximum.reduce([x * x + z * z for x, z in zip(corners_x, corners_z)]))
+
+    center = np.arctan2((z_lo + z_hi) * 0.5 - cz, (x_lo + x_hi) * 0.5 - cx)
+    rel = [(np.arctan2(z, x) - center + np.pi) % (2.0 * np.pi) - np.pi
+           for x, z in zip(corners_x, corners_z)]
+    return near, far, center + np.minimum.reduce(rel), center + np.maximum.reduce(rel)
+
+
+def _expand(starts, counts, bins):
+    # Kierunki [start, start + count) dla każdego elementu jako jedna płaska
+    # tablica (modulo bins) i początki fragmentów dla reduceat
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    flat = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+    return flat % bins, offsets
+
+
+def horizon_cull(heightmap, level, camera, chunk, terrain_scale, height_scale,
+                 max_distance=None, bins=HORIZON_BINS, window=None):
+    # Zwraca tablicę bool kawałków okna window = (ci_lo, ci_hi, cj_lo, cj_hi)
+    # (domyślnie cała mapa): True dla kawałków, które mogą być widoczne
+    n = level.shape[0]
+    period = heightmap.shape[0] - 1
+    scale = bins / (2.0 * math.pi)
+    cy = camera[1]
+    ci_lo, ci_hi, cj_lo, cj_hi = (0, n, 0, n) if window is None else window
+    shape = (ci_hi - ci_lo, cj_hi - cj_lo)
+
+    xs = np.arange(ci_lo, ci_hi + 1) * (chunk * terrain_scale)
+    zs = np.arange(cj_lo, cj_hi + 1) * (chunk * terrain_scale)
+    near, far, angle_lo, angle_hi = rect_bounds(xs[:-1, np.newaxis], xs[1:, np.newaxis],
+                                                zs[np.newaxis, :-1], zs[np.newaxis, 1:], camera)
+    top = level[np.ix_(np.arange(ci_lo, ci_hi) % n, np.arange(cj_lo, cj_hi) % n)][:, :, 1] * height_scale - cy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Kawałek pod kamerą (near = 0) nigdy nie jest odrzucany
+        max_slope = np.where(top > 0, top / near, top / far).ravel()
+    near = near.ravel()
+    test_lo = np.floor(angle_lo * scale).astype(np.int64).ravel()
+    test_count = np.floor(angle_hi * scale).astype(np.int64).ravel() - test_lo + 1
+
+    # Komórki zasłaniające: tylko w promieniu, w którym komórka zakrywa
+    # choć jeden pełny kierunek bufora
+    radius = int(scale) + 2
+    ci = int(math.floor(camera[0] / terrain_scale))
+    cj = int(math.floor(camera[2] / terrain_scale))
+    i0, i1 = [min(ci_hi * chunk, max(ci_lo * chunk, ci + d)) for d in (-radius, radius)]
+    j0, j1 = [min(cj_hi * chunk, max(cj_lo * chunk, cj + d)) for d in (-radius, radius)]
+    block = heightmap[np.ix_(_wrap(np.arange(i0, i1 + 1), period), _wrap(np.arange(j0, j1 + 1), period))]
+    cells_min = np.minimum(np.minimum(block[:-1, :-1], block[1:, :-1]),
+                           np.minimum(block[:-1, 1:], block[1:, 1:]))
+    xs = np.arange(i0, i1 + 1) * terrain_scale
+    zs = np.arange(j0, j1 + 1) * terrain_scale
+    c_near, c_far, c_lo, c_hi = rect_bounds(xs[:-1, np.newaxis], xs[1:, np.newaxis],
+                                            zs[np.newaxis, :-1], zs[np.newaxis, 1:], camera)
+    bottom = cells_min * height_scale - cy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        min_slope = np.where(bottom > 0, bottom / c_far, bottom / c_near)
+    occ_lo = np.ceil(c_lo * scale).astype(np.int64)
+    occ_count = np.floor(c_hi * scale).astype(np.int64) - occ_lo
+    keep = (occ_count > 0) & (c_near > 0)
+    order = np.argsort(c_far[keep])
+    occ_far = c_far[keep][order]
+    occ_lo = occ_lo[keep][order]
+    occ_count = occ_count[keep][order]
+    occ_slope = min_slope[keep][order]
+
+    ring = np.floor(near / (chunk * terrain_scale * math.sqrt(2.0))).astype(np.int64)
+    active = near > 0
+    if max_distance is not None:
+        active &= near <= max_distance
+    visible = np.ones(shape[0] * shape[1], dtype=bool)
+    horizon = np.full(bins, -np.inf)
+    committed = 0
+
+    # Aktywne kawałki posortowane pierścieniami, od najbliższego
+    candidates = np.nonzero(active)[0]
+    candidates = candidates[np.argsort(ring[candidates], kind='stable')]
+    _, starts = np.unique(ring[candidates], return_index=True)
+    for members in np.split(candidates, starts[1:]):
+        # Dołącz komórki leżące w całości bliżej niż najbliższy kawałek pierścienia
+        limit = np.searchsorted(occ_far, near[members].min(), side='right')
+        if limit > committed:
+            directions, _ = _expand(occ_lo[committed:limit], occ_count[committed:limit], bins)
+            np.maximum.at(horizon, directions,
+                          np.repeat(occ_slope[committed:limit], occ_count[committed:limit]))
+            committed = limit
+
+        directions, offsets = _expand(test_lo[members], test_count[members], bins)
+        visible[members] = max_slope[members] >= np.minimum.reduceat(horizon[directions], offsets)
+
+    return visible.reshape(shape)
+
+
+def _wrap(indices, period):
+    # Indeksy wierzchołków poza mapą -> te same wierzchołki w sąsiednim kafelku
+    return np.where((indices < 0) | (indices > period), indices % period, indices)
+
+
+def tile_visibility(visible, window, di, dj, n):
+    # Wycinek wyniku horizon_cull dla kafelka (di, dj) jako tablica (n, n);
+    # kawałki spoza okna (poza zasięgiem widzenia) są niewidoczne
+    ci_lo, ci_hi, cj_lo, cj_hi = window
+    i0, i1 = max(ci_lo, di * n), min(ci_hi, (di + 1) * n)
+    j0, j1 = max(cj_lo, dj * n), min(cj_hi, (dj + 1) * n)
+    mask = np.zeros((n, n), dtype=bool)
+    if i0 < i1 and j0 < j1:
+        mask[i0 - di * n:i1 - di * n, j0 - dj * n:j1 - dj * n] = \
+            visible[i0 - ci_lo:i1 - ci_lo, j0 - cj_lo:j1 - cj_lo]
+    return mask
+
+
+def chunk_window(center, distance, chunk, scale, lo, hi):
+    # Zakres kawałków [c_lo, c_hi) na jednej osi w odległości distance od
+    # center, przycięty do [lo, hi); indeksy spoza mapy to sąsiednie kafelki
+    size = chunk * scale
+    c_lo = max(lo, int(math.floor((center - distance) / size)))
+    c_hi = min(hi, int(math.floor((center + distance) / size)) + 1)
+    return c_lo, max(c_lo, c_hi)
+
+
+def occlusion_report(size=129, seed=3, chunk=8, terrain_scale=5.0, height_scale=30.0,
+                     altitude=5.0, frames=60):
+    # Przeloty nisko nad terenem po kilku prostych trasach: liczba wywołań
+    # glDrawElements i trójkątów bez odrzucania (pasek wierszami, jak bez
+    # --occlusion) i z nim (pasek kawałkami), czas odrzucania na widok oraz
+    # sprawdzenie, czy żaden wierzchołek odrzuconego kawałka nie był jednak
+    # widoczny. Odrzucanie obejmuje kafelek kamery i 8 sąsiednich naraz.
+    import time
+    import teren
+    import kolizja
+    import siatka
+
+    heightmap = teren.diamond_square_iterative(size, seed, dtype=np.float64)
+    level = minmax_pyramid(heightmap, chunk)[0]
+    n = level.shape[0]
+    tiled = np.tile(heightmap[:-1, :-1], (3, 3))
+    tiled = np.pad(tiled, ((0, 1), (0, 1)), mode='wrap')
+    world = (size - 1) * terrain_scale
+    routes = [((0.1, 0.1), (0.9, 0.9)), ((0.9, 0.2), (0.1, 0.6)), ((0.5, 0.05), (0.5, 0.95))]
+    window = (-n, 2 * n, -n, 2 * n)
+    full_calls = len(siatka.strip_draw_calls([(i, 0, size) for i in range(size - 1)], size))
+
+    totals = {'calls': [0, 0], 'triangles': [0, 0], 'culled': 0, 'chunks': 0, 'violations': 0,
+              'time': 0.0}
+    for (x0, z0), (x1, z1) in routes:
+        for k in range(frames):
+            t = k / (frames - 1)
+            x = (x0 + (x1 - x0) * t) * world
+            z = (z0 + (z1 - z0) * t) * world
+            camera = np.array([x, kolizja.sample_heights(heightmap, [x], [z], terrain_scale,
+                                                         height_scale)[0] + altitude, z])
+
+            start = time.perf_counter()
+            visible = horizon_cull(heightmap, level, camera, chunk, terrain_scale, height_scale,
+                                   window=window)
+            totals['time'] += time.perf_counter() - start
+            for di in range(-1, 2):
+                for dj in range(-1, 2):
+                    mask = tile_visibility(visible, window, di, dj, n)
+                    calls = siatka.chunk_draw_calls(mask, chunk, MERGE_GAP)
+                    totals['calls'][0] += full_calls
+                    totals['calls'][1] += len(calls)
+                    totals['triangles'][0] += 2 * (size - 1) * (size - 1)
+                    totals['triangles'][1] += siatka.chunk_call_triangles(calls, chunk)
+            totals['culled'] += int((~visible).sum())
+            totals['chunks'] += visible.size
+            # Kafelki 3 x 3 jako jedna mapa, kamera w środkowym (co 5. klatka -
+            # promienie przez trzy kafelki są kosztowne)
+            if k % 5 == 0:
+                totals['violations'] += count_visible_vertices(tiled, camera + [world, 0.0, world],
+                                                               ~visible, chunk, terrain_scale, height_scale)
+
+    views = len(routes) * frames
+    print("Odrzucanie zasłoniętego terenu: mapa {}x{} (3x3 kafelki), lot {} nad terenem, {} klatek".format(
+        size, size, altitude, views))
+    print("  wywołania glDrawElements: {} -> {} ({:.0%})".format(
+        totals['calls'][0], totals['calls'][1], totals['calls'][1] / totals['calls'][0]))
+    print("  trójkąty:                 {} -> {} ({:.0%})".format(
+        totals['triangles'][0], totals['triangles'][1], totals['triangles'][1] / totals['triangles'][0]))
+    print("  odrzucone kawałki: {:.0%}, widoczne wierzchołki w odrzuconych: {}".format(
+        totals['culled'] / totals['chunks'], totals['violations']))
+    print("  odrzucanie: {:.2f} ms na widok".format(totals['time'] / views * 1000.0))
+    return totals
+
+
+def count_visible_vertices(heightmap, camera, culled, chunk, terrain_scale, height_scale, step=0.25):
+    # Promień od kamery do każdego wierzchołka odrzuconych kawałków: wierzchołek
+    # jest widoczny, jeśli teren nigdzie po drodze nie wystaje ponad promień
+    import kolizja
+
+    ci, cj = np.nonzero(culled)
+    if len(ci) == 0:
+        return 0
+    offsets = np.arange(chunk + 1)
+    vi = (ci[:, np.newaxis, np.newaxis] * chunk + offsets[:, np.newaxis]).ravel()
+    vj = (cj[:, np.newaxis, np.newaxis] * chunk + offsets[np.newaxis, :]).ravel()
+    target = np.stack([vi * terrain_scale, heightmap[vi, vj] * height_scale, vj * terrain_scale], axis=1)
+
+    length = np.linalg.norm((target - camera)[:, [0, 2]], axis=1).max()
+    t = np.linspace(0.0, 1.0, int(length / (terrain_scale * step)) + 2)[1:-1]
+    points = camera + (target - camera)[:, np.newaxis, :] * t[np.newaxis, :, np.newaxis]
+    ground = kolizja.sample_heights(heightmap, points[..., 0], points[..., 2], terrain_scale, height_scale)
+    blocked = (ground > points[..., 1] + 1e-6).any(axis=1)
+    return int((~blocked).sum())
+
+
+if __name__ == '__main__':
+    occlusion_report()
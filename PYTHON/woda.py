@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Poziom morza i klasyfikacja terenu dla zad5.0.py
+#
+# Każdy wierzchołek mapy dostaje raz, przy generowaniu, klasę uint8:
+# woda, plaża, trawa, skała albo śnieg. Kolor terenu to wtedy odczyt
+# z palety (w buforze wierzchołków, shaderze i minimapie), a woda to jeden
+# półprzezroczysty czworokąt na kafelek na wysokości morza.
+#
+#   python woda.py [POZIOM_MORZA]   - udział klas i czas klasyfikacji dla mapy 1025^2
+import sys
+import time
+import numpy as np
+
+WATER, BEACH, GRASS, ROCK, SNOW = range(5)
+CLASS_NAMES = ['woda', 'plaża', 'trawa', 'skała', 'śnieg']
+
+PALETTE = np.array([
+    [0.10, 0.30, 0.60],  # woda (dno pod powierzchnią)
+    [0.85, 0.80, 0.55],  # plaża
+    [0.20, 0.55, 0.20],  # trawa
+    [0.50, 0.45, 0.40],  # skała
+    [0.95, 0.95, 0.97],  # śnieg
+], dtype=np.float32)
+PALETTE_U8 = np.rint(PALETTE * 255.0).astype(np.uint8)
+
+WATER_COLOR = (0.15, 0.35, 0.70, 0.6)  # RGBA powierzchni wody
+
+# Progi jako ułamki zakresu wysokości mapy
+BEACH_WIDTH = 0.03  # pas plaży nad poziomem morza
+SNOW_LEVEL = 0.8
+ROCK_SLOPE = 0.25  # nachylenie (wzrost / odległość w świecie), powyżej którego jest skała
+
+
+def sea_height(heightmap, sea_level):
+    # Poziom morza (ułamek zakresu wysokości) jako wysokość w jednostkach mapy
+    min_h = float(np.min(heightmap))
+    return min_h + sea_level * (float(np.max(heightmap)) - min_h)
+
+
+def slopes(heightmap, terrain_scale, height_scale):
+    # Nachylenie z różnic centralnych z zawijaniem jak w get_height
+    period = heightmap.shape[0] - 1
+    i = np.arange(heightmap.shape[0])
+    dx = heightmap[(i + 1) % period] - heightmap[(i - 1) % period]
+    dz = heightmap[:, (i + 1) % period] - heightmap[:, (i - 1) % period]
+    return np.sqrt(dx * dx + dz * dz) * (height_scale / (2.0 * terrain_scale))
+
+
+def classify(heightmap, sea_level, terrain_scale, height_scale,
+             beach_width=BEACH_WIDTH, snow_level=SNOW_LEVEL, rock_slope=ROCK_SLOPE):
+    # Klasy wszystkich wierzchołków naraz; kolejność warunków = priorytet
+    min_h = float(np.min(heightmap))
+    h_range = float(np.max(heightmap)) - min_h or 1.0
+    t = (heightmap - min_h) / h_range
+
+    classes = np.full(heightmap.shape, GRASS, dtype=np.uint8)
+    classes[slopes(heightmap, terrain_scale, height_scale) > rock_slope] = ROCK
+    classes[t > snow_level] = SNOW
+    classes[(t >= sea_level) & (t < sea_level + beach_width)] = BEACH
+    classes[t < sea_level] = WATER
+    return classes
+
+
+def class_shares(classes):
+    counts = np.bincount(classes.ravel(), minlength=len(CLASS_NAMES))
+    return counts / classes.size
+
+
+if __name__ == '__main__':
+    import teren
+
+    sea_level = float(sys.argv[1]) if len(sys.argv) > 1 else 0.35
+    heightmap = teren.diamond_square_iterative(1025, 1, dtype=np.float64)
+    start = time.perf_counter()
+    classes = classify(heightmap, sea_level, 5.0, 30.0)
+    elapsed = time.perf_counter() - start
+    print("Klasyfikacja mapy 1025x1025 (poziom morza {}): {:.1f} ms, {} B/wierzchołek".format(
+        sea_level, elapsed * 1000.0, classes.itemsize))
+    for name, share in zip(CLASS_NAMES, class_shares(classes)):
+        print("  {:6s} {:5.1%}".format(name, share))
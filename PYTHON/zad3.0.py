@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import sys
 
+import tryb_gl  # przed OpenGL.GL: wyłącza kontrolę błędów PyOpenGL
 from glfw.GLFW import *
 
 from OpenGL.GL import *
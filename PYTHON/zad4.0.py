@@ -2,6 +2,7 @@
 import sys
 import math
 
+import tryb_gl  # przed OpenGL.GL: wyłącza kontrolę błędów PyOpenGL
 from glfw.GLFW import *
 
 from OpenGL.GL import *
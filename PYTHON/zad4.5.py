@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 import sys
-import math
 
+import tryb_gl  # przed OpenGL.GL: wyłącza kontrolę błędów PyOpenGL
 from glfw.GLFW import *
 
 from OpenGL.GL import *
 from OpenGL.GLU import *
 
+import kamera
 
 R = 10.0
 theta = 0.0
@@ -23,6 +24,9 @@ delta_y = 0
 scale = 1.0
 camera_mode = True  # True = Tryb Kamery (4.0), False = Tryb Obiektu (3.5)
 
+# Orientacja kamery jako kwaternion (kamera.py) - bez przeskoku na biegunach
+orbit_camera = kamera.make_orbit_camera(R)
+
 
 def startup():
     update_viewport(None, 400, 400)
@@ -85,38 +89,19 @@ def render(time):
     # TRYB KAMERY (ZADANIE 4.0 / 4.5)
     if camera_mode:
         if left_mouse_button_pressed:
-            theta += delta_x * pix2angle
-            phi += delta_y * pix2angle
-
-            # Użycie modulo dla obu kątów (pełny obrót)
-            theta = theta % 360.0
-            phi = phi % 360.0
+            # Obrót przyrostowy orientacji - UP obraca się razem z kamerą,
+            # więc przejście przez biegun jest płynne
+            kamera.orbit(orbit_camera, delta_x * pix2angle, delta_y * pix2angle)
 
         if right_mouse_button_pressed:
             R += delta_y * 0.1
             # Ograniczenie zoomu
             if R < 3.0: R = 3.0
             if R > 20.0: R = 20.0
+            orbit_camera['radius'] = R
 
-        # Przeliczenie stopni na radiany
-        theta_rad = theta * math.pi / 180.0
-        phi_rad = phi * math.pi / 180.0
-
-        # Obliczenie pozycji oka w układzie sferycznym
-        x_eye = R * math.cos(theta_rad) * math.cos(phi_rad)
-        y_eye = R * math.sin(phi_rad)
-        z_eye = R * math.sin(theta_rad) * math.cos(phi_rad)
-
-        # Obsługa wektora UP przy przejściu przez bieguny
-        # Jeśli phi jest między 90 a 270 stopni, jesteśmy "do góry nogami"
-        if 90.0 < phi < 270.0:
-            up_vector = [0.0, -1.0, 0.0]  # Odwracamy wektor UP
-        else:
-            up_vector = [0.0, 1.0, 0.0]   # Standardowy wektor UP
-
-        gluLookAt(x_eye, y_eye, z_eye,
-                  0.0, 0.0, 0.0,
-                  up_vector[0], up_vector[1], up_vector[2])
+        # Macierz widoku prosto z kwaternionu (zamiast gluLookAt)
+        glLoadMatrixf(kamera.orbit_view_matrix(orbit_camera).T)
 
     # TRYB OBIEKTU (ZADANIE 3.5)
     else:
@@ -157,18 +142,21 @@ def update_viewport(window, width, height):
 
 
 def keyboard_key_callback(window, key, scancode, action, mods):
-    global camera_mode
+    global camera_mode, theta, phi
 
     if action == GLFW_PRESS:
         if key == GLFW_KEY_ESCAPE:
             glfwSetWindowShouldClose(window, GLFW_TRUE)
 
-        # Przełączanie trybów klawiaturą "M"
+        # Przełączanie trybów klawiaturą "M"; kąty theta/phi przechodzą
+        # między trybami jak przed kwaternionem
         if key == GLFW_KEY_M:
             camera_mode = not camera_mode
             if camera_mode:
+                kamera.set_orbit_angles(orbit_camera, theta, phi)
                 print("Tryb: Poruszanie kamerą")
             else:
+                theta, phi = kamera.orbit_angles(orbit_camera)
                 print("Tryb: Obracanie obiektem")
 
 
@@ -1,28 +1,174 @@
 #!/usr/bin/env python3
+import os
 import sys
 import math
+import time
 import random
+import struct
+import argparse
 import numpy as np
 
+import tryb_gl  # przed OpenGL.GL: wyłącza kontrolę błędów PyOpenGL
 from glfw.GLFW import *
 
 from OpenGL.GL import *
 from OpenGL.GLU import *
-
-# Rozmiar mapy (musi być 2^n + 1)
+from OpenGL.arrays import vbo
+
+import teren
+import kolizja
+import widocznosc
+import siatka
+import cache_terenu
+import kamera
+import eksport
+import erozja
+import profilowanie
+import woda
+import petla
+import harmonogram
+import swiat
+
+WINDOW_TITLE = "Lab 4 (Ocena 5.0) - Lot nad terenem"
+
+# Rozmiar mapy (dla Diamond-Square musi być 2^n + 1)
 MAP_SIZE = 129
+TERRAIN_GENERATOR = 'diamond_square'  # albo jeden z teren.NOISE_GENERATORS
+TERRAIN_ROUGHNESS = 1.0
+TERRAIN_EROSION = None  # albo jeden z erozja.KERNELS
+EROSION_ITERATIONS = 50
 HEIGHTMAP = np.zeros((MAP_SIZE, MAP_SIZE))
 TERRAIN_SCALE = 5.0
 HEIGHT_SCALE = 30.0
 
+# Bufory terenu na GPU (wierzchołki + jeden pasek indeksów)
+terrain_vbo = None
+terrain_strip = None
+terrain_strip_vbo = None  # terrain_strip w GL_ELEMENT_ARRAY_BUFFER (przesłany raz)
+
+# Dyskowy cache terenu (cache_terenu.py) i piramida min/max wysokości
+TERRAIN_CHUNK = 8  # komórek na bok kawałka w piramidzie min/max
+use_cache = True
+terrain_minmax = None
+
+# Poziom morza (--sea-level, ułamek zakresu wysokości): klasy terenu uint8
+# liczone raz przy generowaniu, kolory z palety woda.PALETTE i jeden
+# półprzezroczysty czworokąt wody nad kafelkiem
+SEA_LEVEL = None
+terrain_classes = None
+class_vbo = None
+water_height = 0.0
+
+# Świat z kafelków: kamera ma pozycję w obrębie kafelka (float64), a numer
+# kafelka (int64) zmienia się przy przekroczeniu krawędzi. Teren jest
+# okresowy, więc kafelki sąsiednie w zasięgu widzenia to te same bufory
+# przesunięte o całe kafelki (najwyżej TILE_RING w każdą stronę).
+TILE_RING = 1
+world_origin = swiat.make_origin((MAP_SIZE - 1) * TERRAIN_SCALE)
+
+# Odrzucanie kawałków terenu zasłoniętych przez bliższe grzbiety (--occlusion):
+# horyzont liczony raz na widok dla wszystkich kafelków, a pasek indeksów
+# ułożony kawałkami (siatka.chunk_strip_indices), żeby ciąg widocznych
+# kawałków był jednym wywołaniem
+occlusion_culling = False
+
+# Szybki start: teren generuje się w tle, a okno od razu pokazuje niebo.
+# Wczytywanie cache i zapisy plików idą przez pulę wątków pętli (petla.py).
+app_loop = None
+terrain_future = None
+export_future = None
+
+# Przesyłanie buforów do GPU i odświeżanie minimapy jako zadania harmonogramu
+# z budżetem czasu na klatkę (--work-budget) zamiast pracy wprost w render()
+PRIORITY_TERRAIN = 0
+PRIORITY_MINIMAP = 1
+PRIORITY_MESSAGES = 2  # statystyki i komunikaty - gdy zostanie budżet
+scheduler = None
+launch_time = None  # chwila startu (perf_counter) do pomiaru pierwszej klatki
+max_frames = None  # --frames: zakończ po tylu klatkach lotu
+export_path = None  # --export: zapis siatki terenu do pliku po wygenerowaniu
+
+# Kompaktowy format wierzchołków (--compact-vertices): w buforze jest tylko
+# wysokość uint16, a pozycję (z numeru wierzchołka) i kolor odtwarza shader.
+# Fragmenty przechodzą przez stały potok, więc mgła działa bez zmian.
+COMPACT_VERTEX_SHADER = """
+#version 130
+in float height;  // wysokość znormalizowana do [0, 1]
+in float terrain_class;  // klasa z woda.py (gdy use_palette)
+uniform int cols;
+uniform float terrain_scale;
+uniform float height_min;
+uniform float height_range;
+uniform bool use_palette;
+uniform vec3 palette[5];
+
+void main()
+{
+    int i = gl_VertexID / cols;
+    int j = gl_VertexID - i * cols;
+    vec4 pos = vec4(float(i) * terrain_scale, height_min + height * height_range,
+                    float(j) * terrain_scale, 1.0);
+    vec4 eye = gl_ModelViewMatrix * pos;
+    gl_Position = gl_ProjectionMatrix * eye;
+    if (use_palette)
+        gl_FrontColor = vec4(palette[int(terrain_class)], 1.0);
+    else
+        gl_FrontColor = vec4(0.1, 0.2 + height * 0.8, 0.1, 1.0);
+    gl_FogFragCoord = -eye.z;
+}
+"""
+compact_vertices = False
+terrain_program = None
+
+# Minimapa: pomniejszona, pokolorowana HEIGHTMAP jako tekstura rysowana
+# jednym czworokątem; odbudowywana tylko po zmianie terenu
+MINIMAP_RESOLUTION = 128  # tekseli na bok
+MINIMAP_SIZE = 180  # pikseli na ekranie
+MINIMAP_MARGIN = 10
+show_minimap = True
+minimap_texture = None
+minimap_version = -1
+terrain_version = 0  # zwiększany przy każdej zmianie terenu
+
 # Stałe kolizji z terenem
 MIN_FLIGHT_ALTITUDE = 5.0  # Minimalna wysokość "latania" nad ziemią
 MAX_FLIGHT_ALTITUDE = 200.0  # Maksymalna wysokość "latania" nad ziemią
 
+# Zasięg widzenia: mgła i dalsza płaszczyzna obcinania, regulowane tak,
+# żeby utrzymać docelowy czas klatki
+VIEW_DISTANCE_MIN = 100.0
+VIEW_DISTANCE_MAX = (MAP_SIZE * TERRAIN_SCALE) * 2
+FOG_START = 0.6  # początek mgły jako ułamek zasięgu widzenia
+FOG_COLOR = [0.2, 0.4, 0.8, 1.0]  # taki sam jak kolor tła
+view_distance = VIEW_DISTANCE_MAX
+view_controller = None
+viewport_aspect = 1.0
+viewport_width = 1
+viewport_height = 1
+
+# Podział ekranu (--views N): widok 0 to kamera sterowana z klawiatury,
+# pozostałe to kamery automatyczne krążące nad mapą. Wszystkie widoki
+# rysują te same bufory terenu z GPU, każdy z własnym odrzucaniem.
+VIEW_AUTOPILOT_ALTITUDE = 40.0  # wysokość lotu kamer automatycznych nad terenem
+VIEW_AUTOPILOT_TURN = 0.3  # stopni na klatkę
+VIEW_AUTOPILOT_PITCH = -15.0
+views = []
+
+# Statystyki klatki (wypisywane co sekundę z opcją --stats)
+frame_stats = {}
+show_stats = False
+last_frame_time = None
+last_stats_time = 0.0
+
+# Profilowanie alokacji i odśmiecania na etapach klatki (--profile)
+profiler = None
+alloc_budget = None  # --alloc-budget: bajtów na klatkę, po przekroczeniu kod wyjścia 1
+exit_code = 0
+
 # Zmienne kamery FPP (First Person Perspective)
 camera_pos = np.array([MAP_SIZE * TERRAIN_SCALE / 2, 50.0, MAP_SIZE * TERRAIN_SCALE / 2])
-camera_yaw = 0.0
-camera_pitch = 0.0
+# Orientacja jako kwaternion (kamera.py) obracany przyrostowo o ruch myszy
+camera_orientation = kamera.fly_orientation(0.0, 0.0)
 camera_speed = 5.0
 
 # Zmienne myszy
@@ -35,6 +181,31 @@ pix2angle = 0.1
 # Zmienne klawiatury
 keys = {}
 
+# Nagrywanie i odtwarzanie wejścia (powtarzalne przeloty testowe)
+# Znacznikiem czasu zdarzenia jest numer klatki - ruch kamery jest liczony
+# na klatkę (camera_speed), więc tylko taki zegar daje identyczny przelot.
+# W nagłówku są wszystkie parametry wpływające na teren, więc odtworzenie
+# nie zależy od opcji podanych przy --replay. Zmiana układu nagłówka
+# wymaga nowego znacznika - starsze nagrania są wtedy odrzucane.
+INPUT_LOG_MAGIC = b'LOT2'
+INPUT_LOG_OLD_MAGICS = (b'LOT1',)
+# magic, ziarno, pozycja kursora, generator, erozja (0 = brak, potem
+# indeks w EROSION_KINDS + 1), iteracje erozji, poziom morza (NaN = brak),
+# szorstkość
+INPUT_LOG_HEADER = struct.Struct('<4sqddBBIdd')
+SEED_RANGE = (-2 ** 63, 2 ** 63)  # pole ziarna to int64 ze znakiem
+EROSION_KINDS = sorted(erozja.KERNELS)
+INPUT_LOG_EVENT = struct.Struct('<IBdd')  # klatka, rodzaj zdarzenia, a, b
+EVENT_KEY = 0  # a = klawisz, b = akcja
+EVENT_MOUSE = 1  # a = x, b = y
+EVENT_END = 2  # koniec nagrania
+
+terrain_seed = None
+frame_index = 0
+record_file = None
+replay_events = None
+replay_pos = 0
+
 
 # GENEROWANIE TERENU (FRAKTAL PLAZMOWY)
 
@@ -79,11 +250,105 @@ def diamond_square_step(step, roughness):
 
 def generate_terrain():
     global HEIGHTMAP
+    if TERRAIN_GENERATOR != 'diamond_square':
+        # Generatory szumu próbkują dowolne współrzędne - okres MAP_SIZE - 1
+        # zachowuje zawijanie terenu pod kamerą
+        HEIGHTMAP = teren.make_heightmap(TERRAIN_GENERATOR, MAP_SIZE, terrain_seed,
+                                         period=MAP_SIZE - 1, roughness=TERRAIN_ROUGHNESS)
+        return
+
     set_height(0, 0, random.random())
     set_height(0, MAP_SIZE - 1, random.random())
     set_height(MAP_SIZE - 1, 0, random.random())
     set_height(MAP_SIZE - 1, MAP_SIZE - 1, random.random())
-    diamond_square_step(MAP_SIZE - 1, 1.0)  # Start rekursji
+    diamond_square_step(MAP_SIZE - 1, TERRAIN_ROUGHNESS)  # Start rekursji
+
+    # Ostatni wiersz i kolumna jako kopia pierwszych, żeby HEIGHTMAP można
+    # było używać bez get_height (np. w siatka.py)
+    teren.copy_border(HEIGHTMAP)
+
+
+# NAGRYWANIE I ODTWARZANIE WEJŚCIA
+
+def start_recording(path):
+    global record_file
+    record_file = open(path, 'wb')
+    record_file.write(INPUT_LOG_HEADER.pack(
+        INPUT_LOG_MAGIC, terrain_seed, mouse_x_pos_old, mouse_y_pos_old,
+        teren.GENERATOR_NAMES.index(TERRAIN_GENERATOR),
+        EROSION_KINDS.index(TERRAIN_EROSION) + 1 if TERRAIN_EROSION else 0, EROSION_ITERATIONS,
+        math.nan if SEA_LEVEL is None else SEA_LEVEL, TERRAIN_ROUGHNESS))
+
+
+def record_event(kind, a, b):
+    if record_file is not None:
+        record_file.write(INPUT_LOG_EVENT.pack(frame_index, kind, a, b))
+
+
+def stop_recording():
+    global record_file
+    if record_file is not None:
+        record_event(EVENT_END, 0.0, 0.0)
+        record_file.close()
+        record_file = None
+
+
+def load_replay(path):
+    # Zwraca (parametry terenu, pozycja kursora, lista zdarzeń) z pliku nagrania
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if data[:4] in INPUT_LOG_OLD_MAGICS:
+        raise ValueError("Nagranie w starym formacie (bez parametrów terenu) - nagraj je ponownie: " + path)
+    if len(data) < INPUT_LOG_HEADER.size or data[:4] != INPUT_LOG_MAGIC:
+        raise ValueError("Nieprawidłowy plik nagrania: " + path)
+
+    magic, seed, x0, y0, generator, erosion, iterations, sea_level, roughness = \
+        INPUT_LOG_HEADER.unpack_from(data, 0)
+    terrain = {
+        'seed': seed,
+        'generator': teren.GENERATOR_NAMES[generator],
+        'erosion': EROSION_KINDS[erosion - 1] if erosion else None,
+        'erosion_iterations': iterations,
+        'sea_level': None if math.isnan(sea_level) else sea_level,
+        'roughness': roughness,
+    }
+    events = list(INPUT_LOG_EVENT.iter_unpack(data[INPUT_LOG_HEADER.size:]))
+    return terrain, (x0, y0), events
+
+
+def apply_key(key, action):
+    if action == GLFW_PRESS:
+        keys[key] = True
+    if action == GLFW_RELEASE:
+        keys[key] = False
+
+
+def apply_mouse(x_pos, y_pos):
+    global delta_x, mouse_x_pos_old
+    global delta_y, mouse_y_pos_old
+
+    delta_x = x_pos - mouse_x_pos_old
+    mouse_x_pos_old = x_pos
+
+    delta_y = y_pos - mouse_y_pos_old
+    mouse_y_pos_old = y_pos
+
+
+def feed_replay_events():
+    # Podaje zdarzenia zapisane dla bieżącej klatki (w miejscu glfwPollEvents)
+    global replay_pos
+
+    while replay_pos < len(replay_events) and replay_events[replay_pos][0] <= frame_index:
+        _, kind, a, b = replay_events[replay_pos]
+        replay_pos += 1
+
+        if kind == EVENT_KEY:
+            apply_key(int(a), int(b))
+        elif kind == EVENT_MOUSE:
+            apply_mouse(a, b)
+        elif kind == EVENT_END:
+            glfwSetWindowShouldClose(glfwGetCurrentContext(), GLFW_TRUE)
 
 
 def get_interpolated_height(cam_x, cam_z):
@@ -118,22 +383,130 @@ def get_interpolated_height(cam_x, cam_z):
     return current_terrain_height_raw * HEIGHT_SCALE
 
 
-def startup():
+def startup(args):
     global mouse_x_pos_old, mouse_y_pos_old
+    global terrain_seed, replay_events, TERRAIN_GENERATOR, TERRAIN_EROSION, EROSION_ITERATIONS
+    global view_controller, show_stats, compact_vertices, use_cache, occlusion_culling
+    global app_loop, terrain_future, max_frames, views, export_path
+    global profiler, alloc_budget, SEA_LEVEL, TERRAIN_ROUGHNESS, scheduler
 
-    glClearColor(0.2, 0.4, 0.8, 1.0)
+    glClearColor(*FOG_COLOR)
     glEnable(GL_DEPTH_TEST)
 
+    glEnable(GL_FOG)
+    glFogi(GL_FOG_MODE, GL_LINEAR)
+    glFogfv(GL_FOG_COLOR, FOG_COLOR)
+    apply_fog()
+
+    view_controller = widocznosc.make_view_controller(1.0 / args.target_fps,
+                                                      VIEW_DISTANCE_MIN, VIEW_DISTANCE_MAX)
+    show_stats = args.stats
+    compact_vertices = args.compact_vertices
+    occlusion_culling = args.occlusion
+
     glfwSetInputMode(glfwGetCurrentContext(), GLFW_CURSOR, GLFW_CURSOR_DISABLED)
     mouse_x_pos_old, mouse_y_pos_old = glfwGetCursorPos(glfwGetCurrentContext())
 
-    print("Generowanie terenu fraktalnego...")
-    generate_terrain()
-    print("Gotowe. Sterowanie: W, A, S, D, Spacja (góra), Ctrl (dół)")
+    TERRAIN_GENERATOR = args.generator
+    TERRAIN_EROSION = args.erosion
+    SEA_LEVEL = args.sea_level
+    EROSION_ITERATIONS = args.erosion_iterations
+    if args.replay:
+        # Parametry terenu z nagrania zastępują opcje wiersza poleceń
+        terrain, (mouse_x_pos_old, mouse_y_pos_old), replay_events = load_replay(args.replay)
+        terrain_seed = terrain['seed']
+        TERRAIN_GENERATOR = terrain['generator']
+        TERRAIN_EROSION = terrain['erosion']
+        EROSION_ITERATIONS = terrain['erosion_iterations']
+        SEA_LEVEL = terrain['sea_level']
+        TERRAIN_ROUGHNESS = terrain['roughness']
+        print("Odtwarzanie przelotu:", args.replay, "(ziarno", terrain_seed, ")")
+    elif args.seed is not None:
+        terrain_seed = args.seed
+    else:
+        terrain_seed = random.randrange(2 ** 32)
+
+    use_cache = not args.no_cache
+    if args.cache_dir:
+        cache_terenu.cache_dir = args.cache_dir
+
+    max_frames = args.frames
+    export_path = args.export
+    if args.profile or args.alloc_budget is not None:
+        profiler = profilowanie.make_profiler()
+        profilowanie.start(profiler)
+    if args.alloc_budget is not None:
+        alloc_budget = args.alloc_budget * 1024
+    views = make_views(args.views)
+
+    # Generowanie (albo wczytanie z cache) w wątku w tle - pętla okna
+    # działa dalej, a bufory GPU powstają w finish_terrain w wątku głównym
+    app_loop = petla.make_loop(1.0 / args.target_fps)
+    scheduler = harmonogram.make_scheduler(args.work_budget / 1000.0)
+    terrain_future = petla.submit_io(app_loop, load_terrain)
+
+    if args.record:
+        start_recording(args.record)
+        print("Nagrywanie przelotu do pliku:", args.record, "(ziarno", terrain_seed, ")")
+
+
+def finish_terrain():
+    # Zadanie harmonogramu (generator) dodawane, gdy wątek ładujący skończył;
+    # bufory powstają krokami w kolejnych klatkach w ramach budżetu
+    global terrain_version, export_future
+    terrain_future.result()
+    yield from build_terrain_buffers()
+    terrain_version += 1
+
+    if export_path:
+        # Zapis pliku w tle - lot zaczyna się od razu
+        export_future = petla.submit_io(app_loop, export_terrain)
+        harmonogram.submit(scheduler, 'komunikat', PRIORITY_MESSAGES, report_export())
+
+    if launch_time is not None:
+        print("Teren gotowy po {:.0f} ms".format((time.perf_counter() - launch_time) * 1000.0))
+    print("Gotowe. Sterowanie: W, A, S, D, Spacja (góra), Ctrl (dół), M (minimapa)")
+
+
+def export_terrain():
+    # W wątku puli; zwraca rozmiar pliku
+    return eksport.export(export_path, eksport.terrain_mesh(HEIGHTMAP, TERRAIN_SCALE, HEIGHT_SCALE))
+
+
+def report_export():
+    # Zadanie harmonogramu: jeden krok na klatkę do końca zapisu w tle,
+    # potem komunikat w wątku głównym
+    while not export_future.done():
+        yield
+    print("Zapisano siatkę terenu: {} ({:.1f} MB)".format(export_path, export_future.result() / 2 ** 20))
 
 
 def shutdown():
-    pass
+    global exit_code
+    stop_recording()
+    if profiler is not None:
+        profilowanie.stop(profiler)
+        profilowanie.report(profiler)
+        if alloc_budget is not None:
+            ok, median = profilowanie.check_budget(profiler, alloc_budget)
+            print("Budżet alokacji {:.0f} kB/klatkę: mediana {:.1f} kB - {}".format(
+                alloc_budget / 1024, median / 1024, "OK" if ok else "PRZEKROCZONY"))
+            if not ok:
+                exit_code = 1
+    if app_loop is not None:
+        # Oczekujące zapisy (eksport), a potem wypisy kończą się przed wyjściem
+        petla.close(app_loop)
+        harmonogram.flush(scheduler)
+    if terrain_vbo is not None:
+        terrain_vbo.delete()
+    if terrain_strip_vbo is not None:
+        terrain_strip_vbo.delete()
+    if class_vbo is not None:
+        class_vbo.delete()
+    if terrain_program is not None:
+        glDeleteProgram(terrain_program)
+    if minimap_texture is not None:
+        glDeleteTextures([minimap_texture])
 
 
 def axes():
@@ -141,70 +514,507 @@ def axes():
     pass
 
 
-def draw_terrain():
-    # Rysuje teren na podstawie HEIGHTMAP
+def apply_projection(aspect=None):
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
 
-    min_h = np.min(HEIGHTMAP)
-    max_h = np.max(HEIGHTMAP)
-    h_range = max_h - min_h
-    if h_range == 0:
-        h_range = 1.0
+    # Dalsza płaszczyzna na końcu mgły - dalej i tak widać tylko kolor mgły
+    gluPerspective(70, viewport_aspect if aspect is None else aspect, 0.1, view_distance)
 
-    for i in range(MAP_SIZE - 1):
-        glBegin(GL_TRIANGLE_STRIP)
-        for j in range(MAP_SIZE):
-            # Wierzchołek 1 (i, j)
-            y1_raw = get_height(i, j)
-            x1 = i * TERRAIN_SCALE
-            y1 = y1_raw * HEIGHT_SCALE
-            z1 = j * TERRAIN_SCALE
+    glMatrixMode(GL_MODELVIEW)
 
-            # Normalizuj wysokość do [0, 1] dla koloru
-            color_val = (y1_raw - min_h) / h_range
-            glColor3f(0.1, 0.2 + color_val * 0.8, 0.1)  # Od ciemnej do jasnej zieleni
-            glVertex3f(x1, y1, z1)
 
-            # Wierzchołek 2 (i+1, j)
-            y2_raw = get_height(i + 1, j)
-            x2 = (i + 1) * TERRAIN_SCALE
-            y2 = y2_raw * HEIGHT_SCALE
-            z2 = j * TERRAIN_SCALE
+def apply_fog():
+    glFogf(GL_FOG_START, view_distance * FOG_START)
+    glFogf(GL_FOG_END, view_distance)
+
+
+def update_view_distance(time):
+    # Regulator zasięgu widzenia na podstawie czasu poprzedniej klatki
+    global view_distance, last_frame_time
+
+    if last_frame_time is not None:
+        frame_time = time - last_frame_time
+        new_distance = widocznosc.update_view_controller(view_controller, frame_time)
+        if new_distance != view_distance:
+            view_distance = new_distance
+            apply_projection()
+            apply_fog()
+
+        frame_stats['frame_time'] = frame_time
+        frame_stats['view_distance'] = view_distance
+        frame_stats['view_decision'] = view_controller['decision']
+    last_frame_time = time
+
+
+def print_stats(stats):
+    # Wywoływane jako praca odroczona z kopią statystyk klatki
+    print("klatka: {:.1f} ms, zasięg: {:.0f} ({}), wiersze terenu: {}, wywołania: {}".format(
+        stats['frame_time'] * 1000.0, stats['view_distance'],
+        stats['view_decision'], stats['terrain_rows'], stats['draw_calls']))
+    print("  świat: kafelek ({}, {}), pozycja ({:.1f}, {:.1f})".format(*stats['tile'], *stats['world']))
+    if occlusion_culling:
+        print("  zasłonięte kawałki: {} z {}".format(stats['culled_chunks'], stats['chunks']))
+    if len(stats['views']) > 1:
+        for k, (triangles, cost) in enumerate(stats['views']):
+            print("  widok {}: {} trójkątów, {:.2f} ms".format(k, triangles, cost * 1000.0))
+    queue = stats['scheduler']
+    if queue['depth'] or queue['depth_max']:
+        print("  zadania: w kolejce {} (maks. {}), praca p99 {:.2f} ms".format(
+            queue['depth'], queue['depth_max'], queue['work_p99'] * 1000.0))
+
+
+def cached_product(product, build, **params):
+    # Produkt terenu z dyskowego cache; klucz obejmuje generator, ziarno,
+    # rozmiar i szorstkość mapy oraz dodatkowe parametry produktu
+    if not use_cache:
+        return build()
+    if TERRAIN_EROSION:
+        params = dict(params, erosion=TERRAIN_EROSION, erosion_iterations=EROSION_ITERATIONS)
+    key = cache_terenu.cache_key(TERRAIN_GENERATOR, terrain_seed, map_size=MAP_SIZE,
+                                 roughness=TERRAIN_ROUGHNESS, **params)
+    return cache_terenu.get_or_build(key, product, build)
+
+
+def load_terrain():
+    # Przy ciepłym starcie mapa jest wczytywana leniwie (memmap) z cache
+    global HEIGHTMAP, terrain_minmax, terrain_classes, water_height
+
+    def build():
+        global HEIGHTMAP
+        print("Generowanie terenu fraktalnego...")
+        random.seed(terrain_seed)
+        generate_terrain()
+        if TERRAIN_EROSION:
+            print("Erozja terenu ({}, {} iteracji)...".format(TERRAIN_EROSION, EROSION_ITERATIONS))
+            HEIGHTMAP, _ = erozja.erode(HEIGHTMAP, TERRAIN_EROSION, EROSION_ITERATIONS,
+                                        workers=os.cpu_count() or 1)
+        return HEIGHTMAP
+
+    HEIGHTMAP = cached_product('heightmap', build)
+
+    packed = cached_product('minmax', lambda: widocznosc.pack_pyramid(
+        widocznosc.minmax_pyramid(HEIGHTMAP, TERRAIN_CHUNK)), chunk=TERRAIN_CHUNK)
+    terrain_minmax = widocznosc.unpack_pyramid(packed, MAP_SIZE, TERRAIN_CHUNK)
+
+    if SEA_LEVEL is not None:
+        terrain_classes = cached_product('classes', lambda: woda.classify(
+            HEIGHTMAP, SEA_LEVEL, TERRAIN_SCALE, HEIGHT_SCALE), sea_level=SEA_LEVEL,
+            terrain_scale=TERRAIN_SCALE, height_scale=HEIGHT_SCALE)
+        water_height = woda.sea_height(HEIGHTMAP, SEA_LEVEL) * HEIGHT_SCALE
+
+
+def compile_terrain_program():
+    shader = glCreateShader(GL_VERTEX_SHADER)
+    glShaderSource(shader, COMPACT_VERTEX_SHADER)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        raise RuntimeError(glGetShaderInfoLog(shader))
+
+    program = glCreateProgram()
+    glAttachShader(program, shader)
+    glBindAttribLocation(program, 0, "height")
+    glBindAttribLocation(program, 1, "terrain_class")
+    glLinkProgram(program)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        raise RuntimeError(glGetProgramInfoLog(program))
+    glDeleteShader(shader)
+    return program
+
+
+def build_terrain_buffers():
+    # Pozycje, kolory i normalne liczone raz (w puli wątków) zamiast
+    # wywołań glVertex3f/glColor3f dla każdego wierzchołka w każdej klatce
+    # Generator: każde yield kończy krok zadania harmonogramu
+    global terrain_vbo, terrain_strip, terrain_strip_vbo, terrain_program, class_vbo
+
+    if occlusion_culling:
+        terrain_strip = cached_product('chunk_strip', lambda: siatka.chunk_strip_indices(
+            MAP_SIZE, MAP_SIZE, TERRAIN_CHUNK), chunk=TERRAIN_CHUNK)
+    else:
+        terrain_strip = cached_product('strip', lambda: siatka.grid_strip_indices(MAP_SIZE, MAP_SIZE))
+    yield
+    # Indeksy trafiają do GPU raz; draw_tile podaje tylko przesunięcia w buforze
+    terrain_strip_vbo = vbo.VBO(terrain_strip, target=GL_ELEMENT_ARRAY_BUFFER)
+    yield
+
+    if compact_vertices:
+        heights = cached_product('heights_u16', lambda: siatka.quantize_heights(HEIGHTMAP)[0])
+        min_h = float(np.min(HEIGHTMAP))
+        h_range = float(np.max(HEIGHTMAP)) - min_h or 1.0
+        yield
+        terrain_vbo = vbo.VBO(heights)
+        terrain_program = compile_terrain_program()
+        yield
+
+        glUseProgram(terrain_program)
+        glUniform1i(glGetUniformLocation(terrain_program, "cols"), MAP_SIZE)
+        glUniform1f(glGetUniformLocation(terrain_program, "terrain_scale"), TERRAIN_SCALE)
+        glUniform1f(glGetUniformLocation(terrain_program, "height_min"), min_h * HEIGHT_SCALE)
+        glUniform1f(glGetUniformLocation(terrain_program, "height_range"), h_range * HEIGHT_SCALE)
+        glUniform1i(glGetUniformLocation(terrain_program, "use_palette"), terrain_classes is not None)
+        if terrain_classes is not None:
+            # Klasa jako drugi atrybut: 1 bajt na wierzchołek
+            class_vbo = vbo.VBO(np.ascontiguousarray(terrain_classes))
+            glUniform3fv(glGetUniformLocation(terrain_program, "palette"), len(woda.PALETTE), woda.PALETTE)
+        glUseProgram(0)
+        return
 
-            color_val_2 = (y2_raw - min_h) / h_range
-            glColor3f(0.1, 0.2 + color_val_2 * 0.8, 0.1)
-            glVertex3f(x2, y2, z2)
-        glEnd()
+    vertices = cached_product('vertices', lambda: siatka.build_vertex_buffer(
+        HEIGHTMAP, TERRAIN_SCALE, HEIGHT_SCALE, classes=terrain_classes, palette=woda.PALETTE),
+        terrain_scale=TERRAIN_SCALE, height_scale=HEIGHT_SCALE, sea_level=SEA_LEVEL)
+    yield
+    terrain_vbo = vbo.VBO(vertices)
+
+
+def draw_terrain(pos):
+    # Kafelek kamery i sąsiednie kafelki w zasięgu widzenia, każdy z tych
+    # samych buforów przesunięty o całe kafelki względem kafelka kamery.
+    # Zwraca sumy z draw_tile i listę narysowanych kafelków (di, dj).
+    world_size = world_origin['tile_size']
+    tiles = swiat.neighbour_tiles(pos, view_distance, world_size, TILE_RING)
+
+    # Zasłonięte kawałki: jeden horyzont dla wszystkich kafelków widoku,
+    # w oknie kawałków w zasięgu widzenia (poza nim teren jest w mgle)
+    visible = window = None
+    culled = 0
+    if occlusion_culling:
+        n = terrain_minmax[0].shape[0]
+        di_span = [di for di, _ in tiles]
+        dj_span = [dj for _, dj in tiles]
+        window = (widocznosc.chunk_window(pos[0], view_distance, TERRAIN_CHUNK, TERRAIN_SCALE,
+                                          min(di_span) * n, (max(di_span) + 1) * n)
+                  + widocznosc.chunk_window(pos[2], view_distance, TERRAIN_CHUNK, TERRAIN_SCALE,
+                                            min(dj_span) * n, (max(dj_span) + 1) * n))
+        visible = widocznosc.horizon_cull(HEIGHTMAP, terrain_minmax[0], pos, TERRAIN_CHUNK,
+                                          TERRAIN_SCALE, HEIGHT_SCALE, view_distance, window=window)
+        culled = int(visible.size - np.count_nonzero(visible))
+
+    rows = triangles = calls = 0
+    for di, dj in tiles:
+        offset = np.array([di * world_size, 0.0, dj * world_size])
+        mask = None
+        if visible is not None:
+            mask = widocznosc.tile_visibility(visible, window, di, dj, n)
+        glPushMatrix()
+        glTranslatef(offset[0], 0.0, offset[2])
+        tile_rows, tile_triangles, tile_calls = draw_tile(pos - offset, mask)
+        glPopMatrix()
+        rows += tile_rows
+        triangles += tile_triangles
+        calls += tile_calls
+    return rows, triangles, calls, culled, tiles
+
+
+def draw_tile(pos, visible=None):
+    # Rysuje teren z bufora wierzchołków zbudowanego z HEIGHTMAP widziany
+    # z pozycji pos (względem rogu kafelka, może leżeć poza nim); visible to
+    # maska kawałków do narysowania przy --occlusion.
+    # Zwraca (liczba wierszy, liczba trójkątów, wywołania).
+
+    # Teren dalej niż zasięg widzenia jest całkowicie w mgle - pomijamy go
+    i_lo, i_hi = widocznosc.visible_range(pos[0], view_distance, TERRAIN_SCALE, MAP_SIZE - 1)
+    j_lo, j_hi = widocznosc.visible_range(pos[2], view_distance, TERRAIN_SCALE, MAP_SIZE)
+    if visible is not None:
+        # Ciągi widocznych kawałków paska ułożonego kawałkami; krótkie
+        # przerwy zasłoniętych są rysowane, żeby nie dzielić wywołań
+        calls = siatka.chunk_draw_calls(visible, TERRAIN_CHUNK, widocznosc.MERGE_GAP)
+        triangles = siatka.chunk_call_triangles(calls, TERRAIN_CHUNK)
+    else:
+        # Fragmenty pasków wierszy obejmujące tylko widoczne kolumny; sąsiednie
+        # wiersze widoczne na całą szerokość są jednym wywołaniem
+        ranges = [(i, j_lo, j_hi) for i in range(i_lo, i_hi)] if j_hi - j_lo >= 2 else []
+        calls = siatka.strip_draw_calls(ranges, MAP_SIZE)
+        triangles = sum(2 * (j1 - j0) - 2 for _, j0, j1 in ranges)
+
+    terrain_vbo.bind()
+    if terrain_program is not None:
+        glUseProgram(terrain_program)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 1, GL_UNSIGNED_SHORT, GL_TRUE, 0, terrain_vbo)
+        if class_vbo is not None:
+            class_vbo.bind()
+            glEnableVertexAttribArray(1)
+            glVertexAttribPointer(1, 1, GL_UNSIGNED_BYTE, GL_FALSE, 0, class_vbo)
+    else:
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, siatka.VERTEX_STRIDE, terrain_vbo)
+        glColorPointer(3, GL_FLOAT, siatka.VERTEX_STRIDE, terrain_vbo + siatka.COLOR_OFFSET)
+
+    terrain_strip_vbo.bind()
+    for first, count in calls:
+        glDrawElements(GL_TRIANGLE_STRIP, count, GL_UNSIGNED_INT,
+                       terrain_strip_vbo + first * terrain_strip.itemsize)
+    terrain_strip_vbo.unbind()
+
+    if terrain_program is not None:
+        if class_vbo is not None:
+            glDisableVertexAttribArray(1)
+            class_vbo.unbind()
+        glDisableVertexAttribArray(0)
+        glUseProgram(0)
+    else:
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+    terrain_vbo.unbind()
+
+    return i_hi - i_lo, triangles, len(calls)
+
+
+def draw_water(tiles):
+    # Jeden półprzezroczysty czworokąt na poziomie morza nad każdym
+    # narysowanym kafelkiem; bez zapisu głębokości, żeby teren pod wodą
+    # pozostał widoczny
+    world_size = world_origin['tile_size']
+    y = water_height
+
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glDepthMask(GL_FALSE)
+    glColor4f(*woda.WATER_COLOR)
+    glBegin(GL_QUADS)
+    for di, dj in tiles:
+        x0, z0 = di * world_size, dj * world_size
+        glVertex3f(x0, y, z0)
+        glVertex3f(x0, y, z0 + world_size)
+        glVertex3f(x0 + world_size, y, z0 + world_size)
+        glVertex3f(x0 + world_size, y, z0)
+    glEnd()
+    glDepthMask(GL_TRUE)
+    glDisable(GL_BLEND)
+
+
+def make_views(count):
+    # Kamery automatyczne rozstawione na okręgu wokół środka mapy,
+    # każda leci stycznie do niego (stan w słownikach, jak regulator zasięgu)
+    world_size = (MAP_SIZE - 1) * TERRAIN_SCALE
+    result = []
+    for k in range(1, count):
+        angle = 360.0 * k / count
+        angle_rad = math.radians(angle)
+        result.append({
+            'pos': np.array([world_size * (0.5 + 0.25 * math.cos(angle_rad)), 0.0,
+                             world_size * (0.5 + 0.25 * math.sin(angle_rad))]),
+            'orientation': kamera.fly_orientation(angle + 90.0, VIEW_AUTOPILOT_PITCH),
+        })
+    return result
+
+
+def fly_autopilot(view):
+    # Ruch liczony na klatkę, jak kamery gracza - nagrania zostają powtarzalne
+    world_size = (MAP_SIZE - 1) * TERRAIN_SCALE
+    view['orientation'] = kamera.fly_turn(view['orientation'], VIEW_AUTOPILOT_TURN, 0.0)
+    # Lot poziomy w kierunku kursu
+    forward = kamera.fly_forward(view['orientation'])
+    horizontal = math.hypot(forward[0], forward[2])
+    pos = view['pos']
+    pos[0] = (pos[0] + forward[0] / horizontal * camera_speed) % world_size
+    pos[2] = (pos[2] + forward[2] / horizontal * camera_speed) % world_size
+    pos[1] = get_interpolated_height(pos[0], pos[2]) + VIEW_AUTOPILOT_ALTITUDE
+
+
+def view_rects(count, width, height):
+    # Siatka prostokątów (x, y, szerokość, wysokość) w pikselach okna;
+    # widok 0 w lewym górnym rogu (y w OpenGL rośnie w górę)
+    cols = int(math.ceil(math.sqrt(count)))
+    rows = int(math.ceil(count / cols))
+    w = max(1, width // cols)
+    h = max(1, height // rows)
+    return [((k % cols) * w, height - (k // cols + 1) * h, w, h) for k in range(count)]
+
+
+def draw_views(cameras):
+    # Każdy widok: własny glViewport, rzut i odrzucanie; bufory terenu wspólne.
+    # Koszt widoku (trójkąty, czas wywołań) trafia do frame_stats['views'].
+    split = len(cameras) > 1
+    rects = view_rects(len(cameras), viewport_width, viewport_height)
+    costs = []
+    total_rows = 0
+    draw_calls = 0
+    culled_chunks = 0
+    chunks = 0
+
+    for (pos, forward), (x, y, w, h) in zip(cameras, rects):
+        start = time.perf_counter()
+        if split:
+            glViewport(x, y, w, h)
+            apply_projection(w / h)
+
+        glLoadIdentity()
+        look_at = pos + forward
+        gluLookAt(pos[0], pos[1], pos[2],
+                  look_at[0], look_at[1], look_at[2],
+                  0.0, 1.0, 0.0)
+
+        axes()
+        rows, triangles, calls, culled, tiles = draw_terrain(pos)
+        if SEA_LEVEL is not None:
+            draw_water(tiles)
+        total_rows += rows
+        draw_calls += calls
+        culled_chunks += culled
+        chunks += len(tiles) * terrain_minmax[0].shape[0] ** 2
+        costs.append((triangles, time.perf_counter() - start))
+
+    if split:
+        glViewport(0, 0, viewport_width, viewport_height)
+        apply_projection()
+
+    frame_stats['terrain_rows'] = total_rows
+    frame_stats['draw_calls'] = draw_calls
+    frame_stats['culled_chunks'] = culled_chunks
+    frame_stats['chunks'] = chunks
+    frame_stats['views'] = costs
+
+
+def minimap_image(heightmap, resolution, classes=None):
+    # Średnie wysokości w blokach mapy, pokolorowane jak teren -> RGB uint8;
+    # z klasami terenu kolor z palety dla pierwszego wierzchołka bloku
+    period = heightmap.shape[0] - 1
+    resolution = min(resolution, period)
+    step = period // resolution
+    if classes is not None:
+        return woda.PALETTE_U8[classes[:resolution * step:step, :resolution * step:step]]
+
+    blocks = np.asarray(heightmap[:resolution * step, :resolution * step])
+    heights = blocks.reshape(resolution, step, resolution, step).mean(axis=(1, 3))
+
+    min_h = np.min(heightmap)
+    h_range = np.max(heightmap) - min_h
+    if h_range == 0:
+        h_range = 1.0
+
+    image = np.empty((resolution, resolution, 3), dtype=np.uint8)
+    image[:, :, 0] = int(0.1 * 255)
+    image[:, :, 1] = ((0.2 + (heights - min_h) / h_range * 0.8) * 255).astype(np.uint8)
+    image[:, :, 2] = int(0.1 * 255)
+    return image
+
+
+def update_minimap():
+    # Tekstura minimapy powstaje tylko wtedy, gdy teren się zmienił; zadanie
+    # harmonogramu w dwóch krokach (obraz, przesłanie tekstury)
+    global minimap_texture, minimap_version
+
+    image = cached_product('minimap', lambda: minimap_image(HEIGHTMAP, MINIMAP_RESOLUTION, terrain_classes),
+                           resolution=MINIMAP_RESOLUTION, sea_level=SEA_LEVEL)
+    image = np.ascontiguousarray(image)
+    yield
+
+    if minimap_texture is None:
+        minimap_texture = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, minimap_texture)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, image.shape[1], image.shape[0], 0,
+                 GL_RGB, GL_UNSIGNED_BYTE, image)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    minimap_version = terrain_version
+
+
+def draw_minimap():
+    # Do czasu przesłania nowej tekstury widać poprzednią (albo nic)
+    if minimap_version != terrain_version and not harmonogram.pending(scheduler, 'minimapa'):
+        harmonogram.submit(scheduler, 'minimapa', PRIORITY_MINIMAP, update_minimap(), key='minimapa')
+    if minimap_texture is None:
+        return
+
+    # Rzut prostokątny w pikselach okna, bez mgły i bufora głębokości
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, viewport_width, 0, viewport_height, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_FOG)
+
+    # Widok z góry: X świata w prawo, Z świata w dół ekranu.
+    # Wiersze tekstury (t) to X, kolumny (s) to Z.
+    left = viewport_width - MINIMAP_SIZE - MINIMAP_MARGIN
+    top = viewport_height - MINIMAP_MARGIN
+    right = left + MINIMAP_SIZE
+    bottom = top - MINIMAP_SIZE
+
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, minimap_texture)
+    glColor3f(1.0, 1.0, 1.0)
+    glBegin(GL_QUADS)
+    glTexCoord2f(0.0, 0.0)
+    glVertex2f(left, top)
+    glTexCoord2f(0.0, 1.0)
+    glVertex2f(right, top)
+    glTexCoord2f(1.0, 1.0)
+    glVertex2f(right, bottom)
+    glTexCoord2f(1.0, 0.0)
+    glVertex2f(left, bottom)
+    glEnd()
+    glBindTexture(GL_TEXTURE_2D, 0)
+    glDisable(GL_TEXTURE_2D)
+
+    # Znaczniki kamer: trójkąty skierowane zgodnie z kursem
+    # (czerwony - kamera gracza, żółte - kamery automatyczne)
+    world_size = (MAP_SIZE - 1) * TERRAIN_SCALE
+    markers = [(camera_pos, camera_orientation, (1.0, 0.2, 0.2))]
+    markers += [(view['pos'], view['orientation'], (1.0, 0.9, 0.2)) for view in views]
+
+    glBegin(GL_TRIANGLES)
+    for pos, orientation, color in markers:
+        x = left + pos[0] / world_size * MINIMAP_SIZE
+        y = top - pos[2] / world_size * MINIMAP_SIZE
+        yaw_rad = math.radians(kamera.yaw_pitch(orientation)[0])
+        dx, dy = math.cos(yaw_rad), -math.sin(yaw_rad)
+
+        glColor3f(*color)
+        glVertex2f(x + dx * 8.0, y + dy * 8.0)
+        glVertex2f(x - dx * 4.0 - dy * 4.0, y - dy * 4.0 + dx * 4.0)
+        glVertex2f(x - dx * 4.0 + dy * 4.0, y - dy * 4.0 - dx * 4.0)
+    glEnd()
+
+    glEnable(GL_FOG)
+    glEnable(GL_DEPTH_TEST)
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
 
 
 def render(time):
-    global camera_pos, camera_yaw, camera_pitch
-    global delta_x, delta_y
+    global camera_pos, camera_orientation
+    global delta_x, delta_y, frame_index
+
+    if terrain_version == 0:
+        # Teren jeszcze się ładuje albo jego bufory są przesyłane - samo niebo,
+        # bez ruchu kamery (numer klatki stoi w miejscu, więc nagrania
+        # pozostają powtarzalne)
+        if terrain_future.done() and not harmonogram.pending(scheduler, 'teren'):
+            harmonogram.submit(scheduler, 'teren', PRIORITY_TERRAIN, finish_terrain(), key='teren')
+        # Klatka bez terenu prawie nic nie kosztuje - cały stały budżet
+        harmonogram.run(scheduler)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glFlush()
+        return
 
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glLoadIdentity()
+    profilowanie.begin_frame(profiler, 'regulator')
+    update_view_distance(time)
 
-    # Aktualizacja kątów kamery na podstawie myszy
-    camera_yaw += delta_x * pix2angle
-    camera_pitch -= delta_y * pix2angle
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
-    if camera_pitch > 89.0: camera_pitch = 89.0
-    if camera_pitch < -89.0: camera_pitch = -89.0
+    # Obrót orientacji kamery o ruch myszy (pitch ograniczony do +-89 stopni)
+    profilowanie.mark(profiler, 'kamera')
+    camera_orientation = kamera.fly_turn(camera_orientation, delta_x * pix2angle, -delta_y * pix2angle)
 
     # Obliczanie wektorów kierunkowych kamery
-    yaw_rad = math.radians(camera_yaw)
-    pitch_rad = math.radians(camera_pitch)
-
-    forward = np.array([
-        math.cos(yaw_rad) * math.cos(pitch_rad),
-        math.sin(pitch_rad),
-        math.sin(yaw_rad) * math.cos(pitch_rad)
-    ])
-    forward = forward / np.linalg.norm(forward)
+    forward = kamera.fly_forward(camera_orientation)
 
     right = np.cross(forward, np.array([0.0, 1.0, 0.0]))
     right = right / np.linalg.norm(right)
 
     # Aktualizacja pozycji kamery (sterowanie klawiszami)
+    old_pos = camera_pos.copy()
     if keys.get(GLFW_KEY_W):
         camera_pos += forward * camera_speed
     if keys.get(GLFW_KEY_S):
@@ -218,9 +1028,14 @@ def render(time):
     if keys.get(GLFW_KEY_LEFT_SHIFT):
         camera_pos[1] -= camera_speed
 
-    # Implementacja "nieskończonego" terenu (zawijanie X/Z)
-    camera_pos[0] = camera_pos[0] % ((MAP_SIZE - 1) * TERRAIN_SCALE)
-    camera_pos[2] = camera_pos[2] % ((MAP_SIZE - 1) * TERRAIN_SCALE)
+    # Kolizja ciągła: cały odcinek ruchu sprawdzany względem siatki terenu,
+    # przy kontakcie kamera ślizga się po zboczu zamiast przez nie przelecieć
+    camera_pos = kolizja.slide(HEIGHTMAP, old_pos, camera_pos, MIN_FLIGHT_ALTITUDE,
+                               TERRAIN_SCALE, HEIGHT_SCALE)
+
+    # Implementacja "nieskończonego" terenu: po wyjściu poza kafelek kamera
+    # wraca do [0, rozmiar kafelka), a zmienia się numer kafelka świata
+    swiat.rebase(world_origin, camera_pos)
 
     # Ograniczenie wysokości (Kolizja z ziemią)
     # 1. Pobierz wysokość terenu DOKŁADNIE pod kamerą
@@ -230,81 +1045,165 @@ def render(time):
     min_altitude = ground_height + MIN_FLIGHT_ALTITUDE
     max_altitude = ground_height + MAX_FLIGHT_ALTITUDE
 
-    # 3. Zastosuj ograniczenia (clamping)
+    # 3. Zastosuj ograniczenia (clamping) - po kolizji ciągłej dolne
+    #    ograniczenie działa już tylko jako zabezpieczenie
     if camera_pos[1] < min_altitude:
         camera_pos[1] = min_altitude
 
     if camera_pos[1] > max_altitude:
         camera_pos[1] = max_altitude
 
-    look_at = camera_pos + forward
+    profilowanie.mark(profiler, 'rysowanie')
+    cameras = [(camera_pos, forward)]
+    for view in views:
+        fly_autopilot(view)
+        cameras.append((view['pos'], kamera.fly_forward(view['orientation'])))
 
-    gluLookAt(camera_pos[0], camera_pos[1], camera_pos[2],
-              look_at[0], look_at[1], look_at[2],
-              0.0, 1.0, 0.0)
+    draw_views(cameras)
+    if show_minimap:
+        profilowanie.mark(profiler, 'minimapa')
+        draw_minimap()
 
-    axes()
-    draw_terrain()
+    # Zadania tylko w czasie, który został do końca okresu klatki; klatka
+    # po terminie ich nie wykonuje (poza zadaniem czekającym za długo)
+    profilowanie.mark(profiler, 'zadania')
+    harmonogram.run(scheduler, petla.frame_budget(app_loop, scheduler['budget']))
 
     glFlush()
+    profilowanie.end_frame(profiler)
+
+    if show_stats:
+        queue_stats(time)
 
     # Reset delty myszy po klatce
     delta_x = 0
     delta_y = 0
+    frame_index += 1
+
+
+def queue_stats(time):
+    global last_stats_time
+    if time - last_stats_time < 1.0 or 'frame_time' not in frame_stats:
+        return
+    last_stats_time = time
+    stats = dict(frame_stats, scheduler=harmonogram.metrics(scheduler),
+                 tile=tuple(world_origin['tile']), world=swiat.world_position(world_origin, camera_pos))
+    harmonogram.submit(scheduler, 'statystyki', PRIORITY_MESSAGES, lambda: print_stats(stats))
 
 
 def update_viewport(window, width, height):
-    global pix2angle
+    global pix2angle, viewport_aspect, viewport_width, viewport_height
 
     if height == 0:
         height = 1
     if width == 0:
         width = 1
 
-    glMatrixMode(GL_PROJECTION)
-    glLoadIdentity()
-
-    gluPerspective(70, width / height, 0.1, (MAP_SIZE * TERRAIN_SCALE) * 2)
+    viewport_width = width
+    viewport_height = height
+    viewport_aspect = width / height
+    apply_projection()
 
     glViewport(0, 0, width, height)
-    glMatrixMode(GL_MODELVIEW)
     glLoadIdentity()
 
 
 def keyboard_key_callback(window, key, scancode, action, mods):
-    global keys
-    if action == GLFW_PRESS:
-        keys[key] = True
-        if key == GLFW_KEY_ESCAPE:
-            glfwSetWindowShouldClose(window, GLFW_TRUE)
-    if action == GLFW_RELEASE:
-        keys[key] = False
+    global show_minimap
 
+    if action == GLFW_PRESS and key == GLFW_KEY_ESCAPE:
+        glfwSetWindowShouldClose(window, GLFW_TRUE)
 
-def mouse_motion_callback(window, x_pos, y_pos):
-    global delta_x, mouse_x_pos_old
-    global delta_y, mouse_y_pos_old
+    # Przełączanie minimapy klawiszem "M" (nie wpływa na lot)
+    if action == GLFW_PRESS and key == GLFW_KEY_M:
+        show_minimap = not show_minimap
 
-    delta_x = x_pos - mouse_x_pos_old
-    mouse_x_pos_old = x_pos
+    # Podczas odtwarzania sterowanie na żywo jest ignorowane
+    if replay_events is not None:
+        return
 
-    delta_y = y_pos - mouse_y_pos_old
-    mouse_y_pos_old = y_pos
+    if action in (GLFW_PRESS, GLFW_RELEASE):
+        record_event(EVENT_KEY, key, action)
+    apply_key(key, action)
+
+
+def mouse_motion_callback(window, x_pos, y_pos):
+    if replay_events is not None:
+        return
+
+    record_event(EVENT_MOUSE, x_pos, y_pos)
+    apply_mouse(x_pos, y_pos)
 
 
 def mouse_button_callback(window, button, action, mods):
     pass
 
 
-def main():
+def seed_arg(text):
+    seed = int(text)
+    if not SEED_RANGE[0] <= seed < SEED_RANGE[1]:
+        raise argparse.ArgumentTypeError("ziarno poza zakresem int64: " + text)
+    return seed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lot nad terenem fraktalnym")
+    parser.add_argument('--record', metavar='PLIK',
+                        help="nagrywa zdarzenia klawiatury i myszy do pliku binarnego")
+    parser.add_argument('--replay', metavar='PLIK',
+                        help="odtwarza nagrany przelot (razem z ziarnem i parametrami terenu)")
+    parser.add_argument('--seed', type=seed_arg,
+                        help="ziarno generatora terenu (liczba całkowita 64-bitowa)")
+    parser.add_argument('--generator', choices=teren.GENERATOR_NAMES, default=TERRAIN_GENERATOR,
+                        help="silnik generowania mapy wysokości")
+    parser.add_argument('--erosion', choices=EROSION_KINDS,
+                        help="erozja mapy wysokości po wygenerowaniu")
+    parser.add_argument('--erosion-iterations', type=int, default=EROSION_ITERATIONS, metavar='N',
+                        help="liczba iteracji erozji")
+    parser.add_argument('--sea-level', type=float, metavar='U',
+                        help="poziom morza jako ułamek zakresu wysokości (0-1): woda i kolory klas terenu")
+    parser.add_argument('--work-budget', type=float, default=harmonogram.WORK_BUDGET * 1000.0, metavar='MS',
+                        help="czas na klatkę dla zadań w tle: przesyłanie buforów, odświeżanie minimapy")
+    parser.add_argument('--target-fps', type=float, default=30.0,
+                        help="docelowa liczba klatek na sekundę dla regulatora zasięgu widzenia")
+    parser.add_argument('--stats', action='store_true',
+                        help="wypisuje co sekundę statystyki klatki")
+    parser.add_argument('--occlusion', action='store_true',
+                        help="pomija kawałki terenu zasłonięte przez bliższe grzbiety")
+    parser.add_argument('--compact-vertices', action='store_true',
+                        help="bufor terenu z samą wysokością uint16 (wymaga GLSL 1.30)")
+    parser.add_argument('--debug-gl', action='store_true',
+                        help="włącza kontrolę błędów PyOpenGL (patrz tryb_gl.py)")
+    parser.add_argument('--views', type=int, default=1, metavar='N',
+                        help="dzieli okno na N widoków (kamera gracza + N-1 kamer automatycznych)")
+    parser.add_argument('--export', metavar='PLIK',
+                        help="zapisuje siatkę terenu do pliku .glb, .ply albo .obj")
+    parser.add_argument('--profile', action='store_true',
+                        help="mierzy alokacje, pamięć i pauzy odśmiecacza na etapach klatki")
+    parser.add_argument('--alloc-budget', type=int, metavar='KB',
+                        help="z --frames: kod wyjścia 1, gdy alokacje na klatkę przekroczą budżet")
+    parser.add_argument('--frames', type=int, metavar='N',
+                        help="kończy program po N klatkach lotu (pomiary)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="zawsze generuje teren od nowa, bez dyskowego cache")
+    parser.add_argument('--cache-dir', metavar='KATALOG',
+                        help="katalog cache terenu (domyślnie " + cache_terenu.CACHE_DIR + ")")
+    return parser.parse_args()
+
+
+def create_window():
     if not glfwInit():
         sys.exit(-1)
 
-    window = glfwCreateWindow(800, 600, "Lab 4 (Ocena 5.0) - Lot nad terenem", None, None)
+    window = glfwCreateWindow(800, 600, WINDOW_TITLE, None, None)
     if not window:
         glfwTerminate()
         sys.exit(-1)
+    return window
 
+
+def run(window, args):
+    # Pętla programu dla gotowego okna (tworzonego też przez uruchom.py)
     glfwMakeContextCurrent(window)
     glfwSetFramebufferSizeCallback(window, update_viewport)
     glfwSetKeyCallback(window, keyboard_key_callback)
@@ -315,15 +1214,46 @@ def main():
     width, height = glfwGetFramebufferSize(window)
     update_viewport(window, width, height)
 
-    startup()
-    while not glfwWindowShouldClose(window):
+    startup(args)
+    run_frames(window)
+    shutdown()
+
+    glfwTerminate()
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def run_frames(window):
+    # Pętla klatek (petla.run); praca odroczona między render() a
+    # glfwSwapBuffers, wyniki pracy w tle odbiera render()
+    state = {'first_frame': True}
+
+    def frame():
         render(glfwGetTime())
+
+    def present():
         glfwSwapBuffers(window)
+        if state['first_frame'] and launch_time is not None:
+            print("Pierwsza klatka po {:.0f} ms".format((time.perf_counter() - launch_time) * 1000.0))
+        state['first_frame'] = False
+
+    def poll():
         glfwPollEvents()
-    shutdown()
+        if replay_events is not None:
+            feed_replay_events()
+        if max_frames is not None and frame_index >= max_frames:
+            glfwSetWindowShouldClose(window, GLFW_TRUE)
 
-    glfwTerminate()
+    petla.run(app_loop, frame, present, poll, lambda: glfwWindowShouldClose(window))
+
+
+def main():
+    global launch_time
+    launch_time = time.perf_counter()
+
+    args = parse_args()
+    run(create_window(), args)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()